@@ -1,4 +1,6 @@
-from .face_detection import FaceDetector
+from .face_detection import FaceDetector, FaceDetectorPool, RegionMask
 from .color_extraction import ColorExtractor
 from .tone_classifier import ToneClassifier
 from .seasonal_palette import SeasonalPaletteClassifier
+from .preview import PreviewRenderer
+from .pipeline import AnalysisPipeline, PipelineResult, StageTimer
@@ -0,0 +1,325 @@
+"""
+Offline bulk analysis: score a directory or manifest of images.
+
+    python -m analysis.bulk PHOTOS_DIR_OR_MANIFEST -o results.jsonl
+        [--format jsonl|csv] [--workers N] [--chunk-size 64] [--max-dim 1280]
+        [--color-mode mean|dominant]
+
+Runs ``AnalysisPipeline`` on a process pool, reading files straight from
+disk (no HTTP, no base64).  Each process holds one landmarker and works
+through chunks of paths; results come back in input order and are appended
+to the output one chunk at a time.
+
+Progress is checkpointed next to the output (``<output>.checkpoint``) after
+every chunk, as the number of inputs done and the output size at that point.
+Re-running the same command resumes: the output is truncated back to the
+checkpoint (dropping any partly written chunk) and finished inputs are
+skipped.  The checkpoint also records the output format, ``--max-dim`` and
+``--color-mode``; resuming with different ones is refused, as is resuming
+when the output is shorter than the checkpoint says (deleted or replaced).
+Inputs are read in a stable order (a directory is walked sorted, a manifest
+is used as is), which is what makes the count meaningful.
+
+A manifest is a text file with one image path per line; relative paths are
+resolved against the manifest's directory.
+"""
+
+import argparse
+import csv
+import io
+import json
+import multiprocessing
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Iterator
+
+import cv2
+
+from .color_extraction import MODES as COLOR_MODES, ColorExtractor
+from .face_detection import FaceDetectorPool
+from .pipeline import AnalysisError, AnalysisPipeline, DecodeError, NoFaceError
+
+IMAGE_SUFFIXES = (".jpg", ".jpeg", ".png")
+
+# One output row per input, in this column order for CSV.
+FIELDS = (
+    "path", "status", "detail", "season", "undertone", "depth", "contrast",
+    "skin_hex", "skin_l", "skin_a", "skin_b", "ms",
+)
+
+# Seconds between progress lines on stderr.
+PROGRESS_INTERVAL = 10.0
+
+# This process's pipeline, created by ``_init_worker``.
+_pipeline: AnalysisPipeline | None = None
+
+
+# ── Inputs ────────────────────────────────────────────────────
+
+def iter_inputs(source: str) -> Iterator[str]:
+    """Image paths under directory *source*, or listed in manifest *source*."""
+    root = Path(source)
+    if root.is_dir():
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames.sort()
+            for name in sorted(filenames):
+                if name.lower().endswith(IMAGE_SUFFIXES):
+                    yield os.path.join(dirpath, name)
+        return
+    with open(root, encoding="utf-8") as manifest:
+        for line in manifest:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                yield str(root.parent / line) if not os.path.isabs(line) else line
+
+
+def _chunks(paths: Iterator[str], size: int) -> Iterator[list[str]]:
+    chunk = []
+    for path in paths:
+        chunk.append(path)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# ── Worker process ────────────────────────────────────────────
+
+def _init_worker(max_dim: int, color_mode: str):
+    global _pipeline
+    # One process per core: OpenCV's own thread pool would only oversubscribe.
+    cv2.setNumThreads(1)
+    _pipeline = AnalysisPipeline(
+        FaceDetectorPool(1), ColorExtractor(mode=color_mode), max_dim=max_dim
+    )
+
+
+def analyze_path(path: str) -> dict:
+    """One output row for the image at *path*; failures become a status."""
+    row = dict.fromkeys(FIELDS)
+    row["path"] = path
+    started = time.perf_counter()
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+        result = _pipeline.run(data)
+    except OSError as e:
+        row.update(status="unreadable", detail=e.strerror or str(e))
+    except DecodeError as e:
+        row.update(status="decode_error", detail=e.detail)
+    except NoFaceError as e:
+        row.update(status="no_face", detail=e.detail)
+    except AnalysisError as e:
+        row.update(status="error", detail=e.detail)
+    except Exception as e:
+        # Recorded like any other failure, so the checkpoint moves past it
+        # and a resumed run does not stop on the same file again.
+        row.update(status="error", detail=f"{type(e).__name__}: {e}")
+    else:
+        # "lab" is the 8-bit OpenCV encoding the API reports.
+        skin_l, skin_a, skin_b = result.colors["overall"]["lab"]
+        row.update(
+            status="ok",
+            season=result.palette.season,
+            undertone=result.tone["undertone"]["classification"],
+            depth=result.tone["depth"]["level"],
+            contrast=result.tone["contrast"]["level"],
+            skin_hex=result.colors["overall"]["hex"],
+            skin_l=skin_l,
+            skin_a=skin_a,
+            skin_b=skin_b,
+        )
+    row["ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return row
+
+
+def _analyze_chunk(paths: list[str]) -> list[dict]:
+    return [analyze_path(path) for path in paths]
+
+
+# ── Output and checkpoint ─────────────────────────────────────
+
+def _encode_rows(rows: list[dict], fmt: str, header: bool) -> bytes:
+    if fmt == "jsonl":
+        return "".join(
+            json.dumps(row, ensure_ascii=False, separators=(",", ":")) + "\n" for row in rows
+        ).encode("utf-8")
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=FIELDS, lineterminator="\n")
+    if header:
+        writer.writeheader()
+    writer.writerows(rows)
+    return buffer.getvalue().encode("utf-8")
+
+
+def _load_checkpoint(path: str, source: str, settings: dict) -> dict:
+    """
+    Saved progress for *source*, or a fresh start.
+
+    Refuses to resume a run made with other output *settings*, which would
+    mix two kinds of rows in one file.
+    """
+    try:
+        with open(path, encoding="utf-8") as f:
+            checkpoint = json.load(f)
+    except FileNotFoundError:
+        return {"source": source, "settings": settings, "done": 0, "output_bytes": 0}
+    if checkpoint.get("source") != source:
+        raise SystemExit(
+            f"{path} belongs to a run over {checkpoint.get('source')!r}; "
+            "delete it or choose another output"
+        )
+    saved = checkpoint.get("settings") or {}
+    if saved != settings:
+        changed = ", ".join(
+            f"{name} {saved.get(name)!r} -> {value!r}"
+            for name, value in settings.items()
+            if saved.get(name) != value
+        )
+        raise SystemExit(
+            f"{path} was written with other settings ({changed}); "
+            "re-run with the original options or choose another output"
+        )
+    return checkpoint
+
+
+def _save_checkpoint(path: str, checkpoint: dict):
+    """Replace the checkpoint atomically."""
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+# ── Driver ────────────────────────────────────────────────────
+
+def run(
+    source: str,
+    output: str,
+    fmt: str = "jsonl",
+    workers: int = 0,
+    chunk_size: int = 64,
+    max_dim: int = 1280,
+    color_mode: str = "mean",
+) -> dict:
+    """
+    Analyse every image in *source* into *output*, resuming a previous run.
+
+    Args:
+        source: Directory to walk or manifest file.
+        output: JSONL or CSV file to append results to.
+        fmt: ``"jsonl"`` or ``"csv"``.
+        workers: Worker processes; 0 uses one per usable CPU.
+        chunk_size: Images per task and per checkpointed write.
+        max_dim: Longest side images are decoded to (the API's default).
+        color_mode: ``ColorExtractor`` mode for the overall skin colour.
+
+    Returns:
+        Summary counters, including images/sec overall and per worker.
+    """
+    source = os.path.abspath(source)
+    checkpoint_path = output + ".checkpoint"
+    if not os.path.exists(checkpoint_path) and os.path.exists(output) and os.path.getsize(output):
+        raise SystemExit(f"{output} exists but has no checkpoint; refusing to overwrite it")
+    settings = {"format": fmt, "max_dim": max_dim, "color_mode": color_mode}
+    checkpoint = _load_checkpoint(checkpoint_path, source, settings)
+    skip = checkpoint["done"]
+    written = os.path.getsize(output) if os.path.exists(output) else 0
+    if written < checkpoint["output_bytes"]:
+        # Resuming would skip inputs whose rows are no longer in the output.
+        raise SystemExit(
+            f"{output} has {written} bytes but {checkpoint_path} expects "
+            f"{checkpoint['output_bytes']}; delete the checkpoint to start over"
+        )
+    if not workers:
+        workers = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count()
+
+    paths = iter_inputs(source)
+    for _ in range(skip):
+        if next(paths, None) is None:
+            break
+
+    counts: dict[str, int] = {}
+    processed = 0
+    started = last_report = time.perf_counter()
+    context = multiprocessing.get_context("spawn")
+    with open(output, "ab") as out, context.Pool(workers, _init_worker, (max_dim, color_mode)) as pool:
+        # Drop whatever a previous run wrote after its last checkpoint.
+        out.truncate(checkpoint["output_bytes"])
+        out.seek(checkpoint["output_bytes"])
+        _save_checkpoint(checkpoint_path, checkpoint)
+        for rows in pool.imap(_analyze_chunk, _chunks(paths, chunk_size)):
+            out.write(_encode_rows(rows, fmt, header=out.tell() == 0))
+            out.flush()
+            os.fsync(out.fileno())
+            checkpoint["done"] += len(rows)
+            checkpoint["output_bytes"] = out.tell()
+            _save_checkpoint(checkpoint_path, checkpoint)
+
+            processed += len(rows)
+            for row in rows:
+                counts[row["status"]] = counts.get(row["status"], 0) + 1
+            now = time.perf_counter()
+            if now - last_report >= PROGRESS_INTERVAL:
+                rate = processed / (now - started)
+                print(
+                    f"{checkpoint['done']} done, {rate:.1f} images/s "
+                    f"({rate / workers:.1f} per worker)",
+                    file=sys.stderr,
+                )
+                last_report = now
+
+    elapsed = time.perf_counter() - started
+    rate = processed / elapsed if elapsed > 0 else 0.0
+    return {
+        "processed": processed,
+        "resumed_from": skip,
+        "statuses": counts,
+        "workers": workers,
+        "seconds": round(elapsed, 1),
+        "images_per_sec": round(rate, 2),
+        "images_per_sec_per_worker": round(rate / workers, 2),
+    }
+
+
+def _positive_int(value: str) -> int:
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+
+def _non_negative_int(value: str) -> int:
+    number = int(value)
+    if number < 0:
+        raise argparse.ArgumentTypeError(f"must be 0 or more, got {number}")
+    return number
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("source", help="directory of images or manifest file (one path per line)")
+    parser.add_argument("-o", "--output", required=True, help="results file (appended; resumable)")
+    parser.add_argument("--format", choices=("jsonl", "csv"), default=None,
+                        help="output format (default: from the output suffix, else jsonl)")
+    parser.add_argument("--workers", type=_non_negative_int, default=0, help="worker processes (default: one per CPU)")
+    parser.add_argument("--chunk-size", type=_positive_int, default=64, help="images per task and checkpoint")
+    parser.add_argument("--max-dim", type=int, default=1280, help="longest side images are decoded to")
+    parser.add_argument("--color-mode", choices=COLOR_MODES, default="mean",
+                        help="overall skin colour: filtered mean or dominant LAB cluster")
+    args = parser.parse_args()
+    fmt = args.format or ("csv" if args.output.lower().endswith(".csv") else "jsonl")
+
+    summary = run(
+        args.source, args.output, fmt, args.workers, args.chunk_size, args.max_dim, args.color_mode
+    )
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
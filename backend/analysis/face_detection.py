@@ -1,9 +1,20 @@
 """
 Face detection and landmark extraction using MediaPipe Face Landmarker (Tasks API).
 Isolates facial regions (forehead, cheeks, jawline, neck) for color sampling.
+
+Regions are stored as ``RegionMask`` objects: a small mask covering only the
+region's bounding box plus its offset in the frame, so memory and per-pixel
+work scale with the face rather than with the whole image.
 """
 
 import os
+import queue
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass
+from typing import Iterator
+
 import cv2
 import numpy as np
 import mediapipe as mp
@@ -16,6 +27,80 @@ VisionRunningMode = mp.tasks.vision.RunningMode
 MODEL_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "face_landmarker.task")
 
 
+@dataclass
+class RegionMask:
+    """Binary mask for one facial region, cropped to its bounding box."""
+
+    x: int
+    y: int
+    mask: np.ndarray  # uint8, 255 inside the region, shape (height, width)
+
+    @classmethod
+    def from_polygon(cls, pts: np.ndarray, frame_shape: tuple) -> "RegionMask":
+        """Rasterise a convex polygon into a mask clipped to the frame."""
+        pts = np.asarray(pts, dtype=np.int32).reshape(-1, 1, 2)
+        frame_h, frame_w = frame_shape[:2]
+        x, y, w, h = cv2.boundingRect(pts)
+        x0, y0 = max(x, 0), max(y, 0)
+        x1, y1 = min(x + w, frame_w), min(y + h, frame_h)
+        if x1 <= x0 or y1 <= y0:
+            return cls(x0, y0, np.zeros((0, 0), dtype=np.uint8))
+
+        mask = np.zeros((y1 - y0, x1 - x0), dtype=np.uint8)
+        cv2.fillConvexPoly(mask, pts - np.array([x0, y0], dtype=np.int32), 255)
+        return cls(x0, y0, mask)
+
+    @property
+    def height(self) -> int:
+        return self.mask.shape[0]
+
+    @property
+    def width(self) -> int:
+        return self.mask.shape[1]
+
+    @property
+    def bbox(self) -> tuple[int, int, int, int]:
+        """(x_min, y_min, x_max, y_max) in frame coordinates, max exclusive."""
+        return (self.x, self.y, self.x + self.width, self.y + self.height)
+
+    @property
+    def is_empty(self) -> bool:
+        return self.mask.size == 0 or not self.mask.any()
+
+    def window(self, image: np.ndarray) -> np.ndarray:
+        """View of *image* covering this region's bounding box."""
+        return image[self.y:self.y + self.height, self.x:self.x + self.width]
+
+    def intersect(self, other: "RegionMask") -> "RegionMask":
+        """Pixel-wise AND of two regions, cropped to their overlapping boxes."""
+        x0, y0 = max(self.x, other.x), max(self.y, other.y)
+        x1 = min(self.x + self.width, other.x + other.width)
+        y1 = min(self.y + self.height, other.y + other.height)
+        if x1 <= x0 or y1 <= y0:
+            return RegionMask(x0, y0, np.zeros((0, 0), dtype=np.uint8))
+
+        a = self.mask[y0 - self.y:y1 - self.y, x0 - self.x:x1 - self.x]
+        b = other.mask[y0 - other.y:y1 - other.y, x0 - other.x:x1 - other.x]
+        return RegionMask(x0, y0, cv2.bitwise_and(a, b))
+
+    def translate(self, dx: int, dy: int) -> "RegionMask":
+        """Same region with its offset moved by (dx, dy); the mask is shared."""
+        return RegionMask(self.x + dx, self.y + dy, self.mask)
+
+    def pixels(self, image: np.ndarray) -> np.ndarray:
+        """Pixels of *image* inside the region, in row-major order."""
+        if self.mask.size == 0:
+            return image[:0, 0]
+        return self.window(image)[self.mask > 0]
+
+    def to_full(self, shape: tuple) -> np.ndarray:
+        """Expand to a full-frame mask (for debugging and visualisation)."""
+        full = np.zeros(shape[:2], dtype=np.uint8)
+        if self.mask.size:
+            self.window(full)[:] = self.mask
+        return full
+
+
 class FaceDetector:
     """Detect faces and extract facial region masks using MediaPipe Face Landmarker."""
 
@@ -33,32 +118,67 @@ class FaceDetector:
         172, 58, 132, 93, 234, 127, 162, 21, 54, 103, 67, 109
     ]
 
-    def __init__(self):
+    def __init__(self, video: bool = False):
+        """
+        Args:
+            video: Create the landmarker in VIDEO running mode, which tracks
+                the face from one frame to the next instead of re-detecting
+                it.  Frames must then be passed in order with increasing
+                timestamps, and the detector serves a single stream.
+        """
+        self.video = video
         options = FaceLandmarkerOptions(
             base_options=BaseOptions(model_asset_path=MODEL_PATH),
-            running_mode=VisionRunningMode.IMAGE,
+            running_mode=VisionRunningMode.VIDEO if video else VisionRunningMode.IMAGE,
             num_faces=1,
             min_face_detection_confidence=0.5,
             min_face_presence_confidence=0.5,
         )
         self.landmarker = FaceLandmarker.create_from_options(options)
 
-    def detect(self, image: np.ndarray) -> dict | None:
+    def detect(
+        self,
+        image: np.ndarray,
+        timestamp_ms: int | None = None,
+        roi: tuple[int, int, int, int] | None = None,
+    ) -> dict | None:
         """
         Detect face landmarks and extract region masks.
 
         Args:
             image: BGR image as numpy array.
+            timestamp_ms: Frame timestamp; required in video mode, where it
+                must increase with every call.
+            roi: (x_min, y_min, x_max, y_max) window to search instead of the
+                whole frame, e.g. from ``search_window``.  Only the window is
+                converted and landmarked, and a small face fills more of the
+                landmarker's fixed-size input.  Results are still in
+                full-frame coordinates.
 
         Returns:
-            Dict with 'landmarks', 'regions', 'face_mask', and 'bbox', or None if no face.
+            Dict with 'landmarks', 'regions' (name -> RegionMask), 'face_mask'
+            (RegionMask), and 'bbox', or None if no face.
         """
         h, w, _ = image.shape
-        rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        x0 = y0 = 0
+        view = image
+        if roi is not None:
+            x0, y0 = max(0, roi[0]), max(0, roi[1])
+            x1, y1 = min(w, roi[2]), min(h, roi[3])
+            if x1 <= x0 or y1 <= y0:
+                return None
+            view = image[y0:y1, x0:x1]
+        view_h, view_w = view.shape[:2]
+        rgb_image = cv2.cvtColor(view, cv2.COLOR_BGR2RGB)
 
         # Convert to MediaPipe Image
         mp_image = mp.Image(image_format=mp.ImageFormat.SRGB, data=rgb_image)
-        results = self.landmarker.detect(mp_image)
+        if self.video:
+            if timestamp_ms is None:
+                raise ValueError("timestamp_ms is required in video mode")
+            results = self.landmarker.detect_for_video(mp_image, timestamp_ms)
+        else:
+            results = self.landmarker.detect(mp_image)
 
         if not results.face_landmarks or len(results.face_landmarks) == 0:
             return None
@@ -66,7 +186,7 @@ class FaceDetector:
         face_lms = results.face_landmarks[0]
         landmarks = []
         for lm in face_lms:
-            landmarks.append((int(lm.x * w), int(lm.y * h)))
+            landmarks.append((int(lm.x * view_w) + x0, int(lm.y * view_h) + y0))
 
         landmarks = np.array(landmarks)
 
@@ -95,28 +215,21 @@ class FaceDetector:
 
     def _create_polygon_mask(
         self, landmarks: np.ndarray, indices: list, shape: tuple
-    ) -> np.ndarray:
+    ) -> RegionMask:
         """Create a filled polygon mask from landmark indices."""
-        mask = np.zeros(shape[:2], dtype=np.uint8)
-        pts = landmarks[indices].reshape(-1, 1, 2)
-        cv2.fillConvexPoly(mask, pts, 255)
-        return mask
+        return RegionMask.from_polygon(landmarks[indices], shape)
 
     def _create_region_mask(
         self, landmarks: np.ndarray, indices: list, shape: tuple
-    ) -> np.ndarray:
+    ) -> RegionMask:
         """Create a region mask by making a convex hull of points with padding."""
-        mask = np.zeros(shape[:2], dtype=np.uint8)
-        pts = landmarks[indices]
-        hull = cv2.convexHull(pts)
-        cv2.fillConvexPoly(mask, hull, 255)
-        return mask
+        hull = cv2.convexHull(landmarks[indices].astype(np.int32))
+        return RegionMask.from_polygon(hull, shape)
 
     def _create_neck_region(
         self, landmarks: np.ndarray, shape: tuple
-    ) -> np.ndarray:
+    ) -> RegionMask:
         """Estimate neck region below the chin."""
-        mask = np.zeros(shape[:2], dtype=np.uint8)
         h, w = shape[:2]
 
         chin_pts = landmarks[self.NECK_INDICES]
@@ -139,10 +252,142 @@ class FaceDetector:
             [neck_right, neck_top],
             [neck_right, neck_bottom],
             [neck_left, neck_bottom],
-        ]).reshape(-1, 1, 2)
+        ])
 
-        cv2.fillConvexPoly(mask, pts, 255)
-        return mask
+        return RegionMask.from_polygon(pts, shape)
 
     def close(self):
         self.landmarker.close()
+
+
+def search_window(
+    bbox: tuple[int, int, int, int],
+    shape: tuple,
+    margin: float = 0.6,
+    current: tuple[int, int, int, int] | None = None,
+) -> tuple[int, int, int, int]:
+    """
+    Window to search for a face last seen at *bbox* (a ``detect`` result).
+
+    The face box is grown by *margin* times its larger side in every
+    direction and clipped to the frame.  *current* is kept while the face
+    still sits well inside it and fills a fair part of it, so a moving face
+    does not shift the window every frame.
+    """
+    h, w = shape[:2]
+    x_min, y_min, x_max, y_max = bbox
+    pad = int(margin * max(x_max - x_min, y_max - y_min))
+    if current is not None:
+        cx0, cy0, cx1, cy1 = current
+        slack = pad // 2
+        # Sides clipped at the frame edge cannot move further out anyway.
+        inside = (
+            (x_min - slack >= cx0 or cx0 == 0) and (y_min - slack >= cy0 or cy0 == 0)
+            and (x_max + slack <= cx1 or cx1 == w) and (y_max + slack <= cy1 or cy1 == h)
+        )
+        if inside and (x_max - x_min) * 4 >= cx1 - cx0:
+            return current
+    return (max(0, x_min - pad), max(0, y_min - pad), min(w, x_max + pad), min(h, y_max + pad))
+
+
+class FaceDetectorPool:
+    """
+    Fixed-size pool of FaceDetector instances.
+
+    MediaPipe task objects must not be called concurrently, so each request
+    checks a detector out for the duration of ``detect`` and returns it
+    afterwards.  Wait time and busy time are tracked so the pool can be sized
+    against the available cores.
+    """
+
+    def __init__(self, size: int = 1):
+        self.size = max(1, size)
+        self._idle: queue.Queue[FaceDetector] = queue.Queue()
+        self._detectors = [FaceDetector() for _ in range(self.size)]
+        for detector in self._detectors:
+            self._idle.put(detector)
+
+        self._lock = threading.Lock()
+        self._created_at = time.perf_counter()
+        self._in_use = 0
+        self._checkouts = 0
+        self._timeouts = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._busy_total = 0.0
+
+    @contextmanager
+    def acquire(self, timeout: float | None = None) -> Iterator[FaceDetector]:
+        """
+        Check out a detector, blocking until one is free.
+
+        Args:
+            timeout: Seconds to wait before giving up, or None to wait forever.
+
+        Raises:
+            TimeoutError: No detector became free within *timeout*.
+        """
+        requested = time.perf_counter()
+        try:
+            detector = self._idle.get(timeout=timeout)
+        except queue.Empty:
+            with self._lock:
+                self._timeouts += 1
+            raise TimeoutError(f"No face detector free after {timeout}s")
+
+        acquired = time.perf_counter()
+        waited = acquired - requested
+        with self._lock:
+            self._in_use += 1
+            self._checkouts += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+        try:
+            yield detector
+        finally:
+            busy = time.perf_counter() - acquired
+            with self._lock:
+                self._in_use -= 1
+                self._busy_total += busy
+            self._idle.put(detector)
+
+    def warm_up(self, image: np.ndarray) -> int:
+        """
+        Run one detection on every detector in the pool.
+
+        A landmarker's first inference pays for graph and delegate setup, so
+        doing it here keeps that cost away from the first requests.  All
+        detectors are checked out together, which guarantees each one is hit.
+
+        Returns:
+            How many detectors found a face in *image*.
+        """
+        with ExitStack() as stack:
+            detectors = [stack.enter_context(self.acquire()) for _ in range(self.size)]
+            return sum(detector.detect(image) is not None for detector in detectors)
+
+    def stats(self) -> dict:
+        """
+        Snapshot of pool usage.
+
+        ``utilisation`` is the fraction of total detector-time spent checked
+        out since the pool was created; values near 1.0 mean requests are
+        queueing for detectors and the pool (or core count) is too small.
+        """
+        with self._lock:
+            elapsed = time.perf_counter() - self._created_at
+            checkouts = self._checkouts
+            return {
+                "size": self.size,
+                "in_use": self._in_use,
+                "checkouts": checkouts,
+                "timeouts": self._timeouts,
+                "wait_ms_avg": round(1000 * self._wait_total / checkouts, 3) if checkouts else 0.0,
+                "wait_ms_max": round(1000 * self._wait_max, 3),
+                "utilisation": round(self._busy_total / (self.size * elapsed), 4) if elapsed > 0 else 0.0,
+            }
+
+    def close(self):
+        for detector in self._detectors:
+            detector.close()
+        self._detectors.clear()
@@ -0,0 +1,102 @@
+"""
+Image decoding with decode-time downscaling.
+
+Large phone JPEGs are decoded directly at 1/2, 1/4 or 1/8 scale using
+libjpeg's DCT scaling (``cv2.IMREAD_REDUCED_COLOR_*``), chosen from the
+dimensions in the file header, so a 12 MP upload never has to be fully
+decompressed just to be resized down to the analysis resolution.
+"""
+
+import io
+
+import cv2
+import numpy as np
+
+JPEG_SOI = b"\xff\xd8"
+
+# Bytes handed to the header probe.  Enough for the frame header of nearly
+# every JPEG; one with more metadata in front of it is decoded at full size.
+PROBE_BYTES = 64 * 1024
+
+# Reduced-decode flags, largest reduction first.
+_REDUCED_FLAGS = (
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+)
+
+
+def probe_image(data: bytes | memoryview) -> tuple[str, int, int] | None:
+    """
+    Read format and size from the image header without decoding pixels.
+
+    Only the first ``PROBE_BYTES`` are looked at, so *data* (possibly a view
+    of shared memory) is never copied whole.
+
+    Returns:
+        (format, width, height), or None if the header is not recognised
+        or does not end within ``PROBE_BYTES``.
+
+    Raises:
+        ValueError: The header claims more pixels than PIL's decompression
+            bomb limit.
+    """
+    # Deferred: PIL is only needed here, and in process mode the API process
+    # never decodes anything.
+    from PIL import Image, UnidentifiedImageError
+
+    try:
+        with Image.open(io.BytesIO(bytes(data[:PROBE_BYTES]))) as img:
+            return img.format, img.width, img.height
+    except Image.DecompressionBombError as e:
+        raise ValueError(f"Image is too large: {e}") from e
+    except (UnidentifiedImageError, OSError, ValueError):
+        return None
+
+
+def reduction_factor(long_side: int, max_dim: int) -> int:
+    """Largest JPEG scale denominator that keeps the long side >= *max_dim*."""
+    if max_dim <= 0:
+        return 1
+    for factor, _ in _REDUCED_FLAGS:
+        if long_side // factor >= max_dim:
+            return factor
+    return 1
+
+
+def limit_resolution(image: np.ndarray, max_dim: int) -> np.ndarray:
+    """Downscale so the longest side is at most *max_dim* pixels."""
+    h, w = image.shape[:2]
+    if max_dim and max(h, w) > max_dim:
+        scale = max_dim / max(h, w)
+        image = cv2.resize(image, (int(w * scale), int(h * scale)))
+    return image
+
+
+def decode_image(data: bytes, max_dim: int = 0) -> np.ndarray:
+    """
+    Decode raw bytes into a BGR numpy image no larger than *max_dim*.
+
+    Args:
+        data: Encoded image bytes (any format OpenCV can read).
+        max_dim: Longest side of the result; 0 keeps the original size.
+
+    Raises:
+        ValueError: The bytes could not be decoded, or claim an image too
+            large to decode.
+    """
+    flag = cv2.IMREAD_COLOR
+    # Only JPEGs have reduced decodes, so nothing else needs its header read.
+    header = probe_image(data) if max_dim and data[:2] == JPEG_SOI else None
+    if header is not None and header[0] == "JPEG":
+        factor = reduction_factor(max(header[1], header[2]), max_dim)
+        flag = dict(_REDUCED_FLAGS).get(factor, cv2.IMREAD_COLOR)
+
+    try:
+        image = cv2.imdecode(np.frombuffer(data, np.uint8), flag)
+    except cv2.error as e:
+        # e.g. the header claims more pixels than OpenCV will allocate.
+        raise ValueError(f"Could not decode image: {e}") from e
+    if image is None:
+        raise ValueError("Could not decode image")
+    return limit_resolution(image, max_dim)
@@ -0,0 +1,221 @@
+"""
+Running colour estimate for live camera analysis.
+
+Consecutive frames of the same person differ mostly by sensor noise and small
+lighting changes.  ``LiveSession`` folds per-frame colours into an
+exponentially weighted estimate in CIELAB, tracks how far frames scatter
+around it, and declares the estimate converged once its uncertainty drops
+below a tolerance.  A converged session only needs an occasional frame to
+confirm that the subject has not changed.
+"""
+
+import math
+
+import cv2
+import numpy as np
+
+from .color_extraction import rgb_to_hex, rgb_to_hsv
+
+
+def _rgb_to_lab(rgb: np.ndarray) -> np.ndarray:
+    """(n, 3) RGB in 0-255 -> (n, 3) CIELAB (L 0-100, a/b signed)."""
+    scaled = np.asarray(rgb, dtype=np.float32).reshape(1, -1, 3) / 255.0
+    return cv2.cvtColor(scaled, cv2.COLOR_RGB2LAB).reshape(-1, 3).astype(float)
+
+
+def _lab_to_rgb(lab: np.ndarray) -> np.ndarray:
+    """(n, 3) CIELAB -> (n, 3) integer RGB in 0-255."""
+    rgb = cv2.cvtColor(np.asarray(lab, dtype=np.float32).reshape(1, -1, 3), cv2.COLOR_LAB2RGB)
+    return np.clip(np.rint(rgb.reshape(-1, 3) * 255), 0, 255).astype(int)
+
+
+def _lab_to_opencv(lab: np.ndarray) -> list:
+    """CIELAB -> the 8-bit OpenCV encoding ``ColorExtractor`` reports."""
+    l, a, b = lab
+    return [
+        int(np.clip(round(l * 255 / 100), 0, 255)),
+        int(np.clip(round(a + 128), 0, 255)),
+        int(np.clip(round(b + 128), 0, 255)),
+    ]
+
+
+class LiveSession:
+    """Exponentially weighted LAB estimate with convergence and confidence."""
+
+    def __init__(
+        self,
+        alpha: float = 0.3,
+        tolerance: float = 1.5,
+        min_frames: int = 5,
+        recheck_every: int = 15,
+        reset_threshold: float = 8.0,
+    ):
+        """
+        Args:
+            alpha: Weight of the newest frame (0 < alpha <= 1); 1 disables smoothing.
+            tolerance: Converged once the estimate's uncertainty is below this
+                many ΔE (CIE76) units.
+            min_frames: Frames required before the session can converge.
+            recheck_every: Once converged, analyse one frame in this many.
+            reset_threshold: A frame further than this ΔE from a converged
+                estimate (new person, new lighting) restarts the session.
+        """
+        if not 0 < alpha <= 1:
+            raise ValueError(f"alpha must be in (0, 1], got {alpha}")
+        self.alpha = alpha
+        self.tolerance = tolerance
+        self.min_frames = max(1, min_frames)
+        self.recheck_every = max(1, recheck_every)
+        self.reset_threshold = reset_threshold
+        self.resets = 0
+        self.reset()
+
+    def reset(self):
+        """Forget the estimate and start over."""
+        self.frames = 0
+        self.skipped = 0
+        self._since_check = 0
+        self._overall: np.ndarray | None = None
+        self._regions: dict[str, np.ndarray] = {}
+        self._pixel_counts: dict[str, int] = {}
+        self._scatter = 0.0  # EMA of squared ΔE between frames and the estimate
+
+    # ── State ─────────────────────────────────────────────────
+
+    @property
+    def uncertainty(self) -> float:
+        """
+        Expected ΔE between the estimate and the true colour.
+
+        For an EMA with weight alpha over samples of spread sigma, the
+        estimate's standard error is ``sigma * sqrt(alpha / (2 - alpha))``.
+        """
+        if self.frames < 2:
+            return math.inf
+        return math.sqrt(self._scatter * self.alpha / (2 - self.alpha))
+
+    @property
+    def converged(self) -> bool:
+        return self.frames >= self.min_frames and self.uncertainty <= self.tolerance
+
+    @property
+    def confidence(self) -> float:
+        """0-1: ramps up over the first frames and falls with uncertainty."""
+        if self.frames == 0:
+            return 0.0
+        warmup = min(1.0, self.frames / self.min_frames)
+        return round(warmup * min(1.0, self.tolerance / max(self.uncertainty, 1e-9)), 3)
+
+    def needs_frame(self) -> bool:
+        """Whether the next frame should be fully analysed."""
+        return not self.converged or self._since_check + 1 >= self.recheck_every
+
+    def skip(self):
+        """Record a frame the client sent but that was not analysed."""
+        self.skipped += 1
+        self._since_check += 1
+
+    def status(self) -> dict:
+        return {
+            "frames": self.frames,
+            "skipped": self.skipped,
+            "converged": self.converged,
+            "confidence": self.confidence,
+            "uncertainty": round(self.uncertainty, 3) if self.frames >= 2 else None,
+        }
+
+    def state(self) -> dict:
+        """The running estimate as JSON-serialisable data (settings excluded)."""
+        return {
+            "frames": self.frames,
+            "skipped": self.skipped,
+            "since_check": self._since_check,
+            "resets": self.resets,
+            "overall": self._overall.tolist() if self._overall is not None else None,
+            "regions": {name: lab.tolist() for name, lab in self._regions.items()},
+            "pixel_counts": self._pixel_counts,
+            "scatter": self._scatter,
+        }
+
+    def restore(self, state: dict):
+        """
+        Continue from a ``state()`` snapshot.
+
+        Raises:
+            KeyError, TypeError, ValueError: *state* is not such a snapshot.
+        """
+        self.frames = int(state["frames"])
+        self.skipped = int(state["skipped"])
+        self._since_check = int(state["since_check"])
+        self.resets = int(state["resets"])
+        overall = state["overall"]
+        self._overall = np.array(overall, dtype=float).reshape(3) if overall is not None else None
+        self._regions = {
+            name: np.array(lab, dtype=float).reshape(3) for name, lab in state["regions"].items()
+        }
+        self._pixel_counts = {name: int(count) for name, count in state["pixel_counts"].items()}
+        self._scatter = float(state["scatter"])
+
+    # ── Updates ───────────────────────────────────────────────
+
+    def update(self, color_data: dict) -> dict:
+        """
+        Fold one frame's ``ColorExtractor.extract`` output into the estimate.
+
+        Returns:
+            Color data in the same shape as *color_data*, holding the smoothed
+            values.  Regions missing from this frame keep their last estimate.
+        """
+        names = list(color_data["regions"])
+        rgb = [color_data["overall"]["rgb"]] + [color_data["regions"][n]["rgb"] for n in names]
+        lab = _rgb_to_lab(np.array(rgb))
+        sample, region_samples = lab[0], dict(zip(names, lab[1:]))
+
+        if self._overall is not None:
+            distance = float(np.linalg.norm(sample - self._overall))
+            if self.converged and distance > self.reset_threshold:
+                self.resets += 1
+                self.reset()
+
+        self.frames += 1
+        self._since_check = 0
+        if self._overall is None:
+            self._overall = sample
+        else:
+            distance_sq = float(np.sum((sample - self._overall) ** 2))
+            self._scatter = (
+                distance_sq if self.frames == 2
+                else self.alpha * distance_sq + (1 - self.alpha) * self._scatter
+            )
+            self._overall = self.alpha * sample + (1 - self.alpha) * self._overall
+
+        for name, value in region_samples.items():
+            current = self._regions.get(name)
+            self._regions[name] = value if current is None else (
+                self.alpha * value + (1 - self.alpha) * current
+            )
+            self._pixel_counts[name] = color_data["regions"][name]["pixel_count"]
+
+        return self.estimate()
+
+    def estimate(self) -> dict:
+        """The current estimate, shaped like ``ColorExtractor.extract`` output."""
+        names = list(self._regions)
+        rgb = _lab_to_rgb(np.array([self._overall] + [self._regions[n] for n in names]))
+
+        regions = {
+            name: {
+                "rgb": rgb[i + 1].tolist(),
+                "hex": rgb_to_hex(rgb[i + 1]),
+                "pixel_count": self._pixel_counts[name],
+            }
+            for i, name in enumerate(names)
+        }
+        overall_rgb = rgb[0].tolist()
+        overall = {
+            "rgb": overall_rgb,
+            "lab": _lab_to_opencv(self._overall),
+            "hex": rgb_to_hex(rgb[0]),
+            "hsv": rgb_to_hsv(overall_rgb),
+        }
+        return {"regions": regions, "overall": overall}
@@ -0,0 +1,243 @@
+"""
+The analysis pipeline as one object with explicit, timed stages.
+
+    decode -> detect -> extract -> classify -> [preview]
+
+``AnalysisPipeline`` composes a ``FaceDetector`` (or a pool of them) with the
+stateless ``ColorExtractor``, ``ToneClassifier``, ``SeasonalPaletteClassifier``
+and ``PreviewRenderer``.  Each stage is a method with typed inputs and
+outputs, so callers that need only part of the sequence (live frames stop
+after extraction) reuse the same code as a full analysis.  ``run`` /
+``run_async`` execute everything and report the wall time of every stage.
+
+Nothing here knows about HTTP, caching or response serialisation; those are
+layered on top by the caller.
+"""
+
+import asyncio
+import functools
+import time
+from concurrent.futures import Executor
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from typing import ContextManager
+
+import numpy as np
+
+from .color_extraction import ColorExtractor
+from .face_detection import FaceDetector, FaceDetectorPool, RegionMask
+from .image_decode import decode_image
+from .preview import PreviewRenderer
+from .seasonal_palette import PaletteEntry, SeasonalPaletteClassifier
+from .tone_classifier import ToneClassifier
+
+
+class AnalysisError(Exception):
+    """Analysis could not produce a result for an otherwise valid request."""
+
+    def __init__(self, detail: str):
+        super().__init__(detail)
+        self.detail = detail
+
+
+class DecodeError(AnalysisError):
+    """The uploaded bytes are not a decodable image."""
+
+
+class NoFaceError(AnalysisError):
+    """MediaPipe found no face in the image."""
+
+
+class StageTimer:
+    """Accumulate wall time per pipeline stage between successive ``lap`` calls."""
+
+    def __init__(self):
+        self.timings: dict[str, float] = {}
+        self._last = time.perf_counter()
+
+    def lap(self, stage: str):
+        """Charge the time since the previous lap to *stage*."""
+        now = time.perf_counter()
+        self.timings[stage] = self.timings.get(stage, 0.0) + now - self._last
+        self._last = now
+
+
+@dataclass
+class Face:
+    """Output of the detect stage, in full-frame coordinates."""
+
+    landmarks: np.ndarray
+    regions: dict[str, RegionMask]
+    face_mask: RegionMask
+    bbox: tuple[int, int, int, int]
+
+
+@dataclass
+class PipelineResult:
+    """Everything the pipeline produced for one image."""
+
+    image: np.ndarray
+    face: Face
+    colors: dict
+    tone: dict
+    palette: PaletteEntry
+    # Only set when the preview stage ran.
+    preview_jpeg: bytes | None = None
+    # Seconds per stage.
+    timings: dict[str, float] = field(default_factory=dict)
+
+
+class AnalysisPipeline:
+    """Decode, detect, extract, classify and optionally preview one image."""
+
+    def __init__(
+        self,
+        detectors: FaceDetectorPool | FaceDetector,
+        extractor: ColorExtractor | None = None,
+        tone_classifier: ToneClassifier | None = None,
+        palette_classifier: SeasonalPaletteClassifier | None = None,
+        preview_renderer: PreviewRenderer | None = None,
+        max_dim: int = 0,
+    ):
+        """
+        Args:
+            detectors: A pool, checked out once per detection, or a single
+                detector (e.g. a VIDEO-mode one) used by one caller at a time.
+                The pipeline does not close them.
+            extractor, tone_classifier, palette_classifier, preview_renderer:
+                Stage implementations; defaults are created when omitted.
+                All are stateless and can be shared between pipelines.
+            max_dim: Longest side images are decoded to; 0 keeps full size.
+        """
+        self.detectors = detectors
+        self.extractor = extractor or ColorExtractor()
+        self.tone_classifier = tone_classifier or ToneClassifier()
+        self.palette_classifier = palette_classifier or SeasonalPaletteClassifier()
+        self.preview_renderer = preview_renderer or PreviewRenderer()
+        self.max_dim = max_dim
+
+    # ── Stages ────────────────────────────────────────────────
+
+    def decode(self, data: bytes) -> np.ndarray:
+        """
+        Encoded JPEG / PNG bytes -> BGR image of at most ``max_dim``.
+
+        Raises:
+            DecodeError: The bytes could not be decoded.
+        """
+        try:
+            return decode_image(data, self.max_dim)
+        except ValueError:
+            raise DecodeError("Could not decode image")
+
+    def detect(
+        self,
+        image: np.ndarray,
+        roi: tuple[int, int, int, int] | None = None,
+        timestamp_ms: int | None = None,
+        timer: StageTimer | None = None,
+    ) -> Face | None:
+        """
+        Landmark the face in *image*.
+
+        Args:
+            roi: Search only this window (see ``FaceDetector.detect``).
+            timestamp_ms: Frame timestamp, for a VIDEO-mode detector.
+            timer: Time spent waiting for a pooled detector is charged to
+                ``detector_wait``; the caller laps the detection itself.
+
+        Returns:
+            The face, or None if there is none.
+        """
+        with self._checkout() as detector:
+            if timer is not None:
+                timer.lap("detector_wait")
+            face_data = detector.detect(image, timestamp_ms, roi=roi)
+        return Face(**face_data) if face_data is not None else None
+
+    def extract(self, image: np.ndarray, face: Face) -> dict:
+        """
+        Skin colours of *face*'s regions (``ColorExtractor.extract`` format).
+
+        Raises:
+            AnalysisError: No usable skin pixels.
+        """
+        colors = self.extractor.extract(image, face.regions, face.face_mask)
+        if "error" in colors:
+            raise AnalysisError(colors["error"])
+        return colors
+
+    def classify(self, colors: dict) -> tuple[dict, PaletteEntry]:
+        """Tone (undertone, depth, contrast) and seasonal palette for *colors*."""
+        tone = self.tone_classifier.classify(colors)
+        return tone, self.palette_classifier.lookup(tone)
+
+    def preview(self, image: np.ndarray, regions: dict[str, RegionMask]) -> bytes:
+        """Annotated JPEG of *regions* drawn on *image*."""
+        return self.preview_renderer.render(image, regions)
+
+    # ── Entry points ──────────────────────────────────────────
+
+    def analyze(
+        self, image: np.ndarray, preview: bool = False, timer: StageTimer | None = None
+    ) -> PipelineResult:
+        """
+        Run every stage after decoding on an already decoded image.
+
+        Args:
+            preview: Also render the annotated preview.
+            timer: Timer to lap the stages on, so a caller can time its own
+                steps around the pipeline in the same timeline.
+
+        Raises:
+            NoFaceError: No face was detected.
+            AnalysisError: Skin color could not be extracted.
+        """
+        timer = timer or StageTimer()
+        face = self.detect(image, timer=timer)
+        timer.lap("detect")
+        if face is None:
+            raise NoFaceError("No face detected")
+
+        colors = self.extract(image, face)
+        timer.lap("extract")
+
+        tone, palette = self.classify(colors)
+        timer.lap("classify")
+
+        result = PipelineResult(image, face, colors, tone, palette, timings=timer.timings)
+        if preview:
+            result.preview_jpeg = self.preview(image, face.regions)
+            timer.lap("preview")
+        return result
+
+    def run(self, data: bytes, preview: bool = False) -> PipelineResult:
+        """
+        Run the whole pipeline on encoded image bytes.
+
+        Raises:
+            DecodeError: The bytes could not be decoded.
+            NoFaceError, AnalysisError: As ``analyze``.
+        """
+        timer = StageTimer()
+        image = self.decode(data)
+        timer.lap("decode")
+        return self.analyze(image, preview, timer)
+
+    async def run_async(
+        self, data: bytes, preview: bool = False, executor: Executor | None = None
+    ) -> PipelineResult:
+        """
+        ``run`` on a thread of *executor* (the loop's default if None).
+
+        The pipeline holds landmarkers, so *executor* must run threads in
+        this process; process-based callers submit a module-level function
+        that uses the worker's own pipeline instead.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, functools.partial(self.run, data, preview))
+
+    def _checkout(self) -> ContextManager[FaceDetector]:
+        if isinstance(self.detectors, FaceDetectorPool):
+            return self.detectors.acquire()
+        return nullcontext(self.detectors)
@@ -0,0 +1,127 @@
+"""
+Annotated preview rendering.
+Tints every detected facial region in a single pass and JPEG-encodes the
+result, cropped to the face and downscaled to a bounded size.
+"""
+
+import cv2
+import numpy as np
+
+from .face_detection import RegionMask
+
+# Overlay colour per region, in the image's BGR channel order.
+REGION_COLORS = {
+    "forehead": (255, 182, 193),
+    "left_cheek": (173, 216, 230),
+    "right_cheek": (173, 216, 230),
+    "jawline": (144, 238, 144),
+    "neck": (255, 218, 185),
+}
+DEFAULT_COLOR = (200, 200, 200)
+
+
+class PreviewRenderer:
+    """Composite all region colours with one label map and one blend."""
+
+    def __init__(
+        self,
+        quality: int = 85,
+        max_dim: int = 640,
+        crop: bool = True,
+        margin: float = 0.25,
+        alpha: float = 0.3,
+    ):
+        """
+        Args:
+            quality: JPEG quality (0-100).
+            max_dim: Longest side of the encoded preview; 0 keeps full size.
+            crop: Encode only the face area instead of the whole frame.
+            margin: Extra border around the regions when cropping, as a
+                fraction of the regions' bounding box size.
+            alpha: Overlay opacity.
+        """
+        self.quality = quality
+        self.max_dim = max_dim
+        self.crop = crop
+        self.margin = margin
+        self.alpha = alpha
+
+    def crop_to_face(
+        self, image: np.ndarray, regions: dict[str, RegionMask]
+    ) -> tuple[np.ndarray, dict[str, RegionMask]]:
+        """
+        Cut the preview area out of *image* and re-base the regions onto it.
+
+        Rendering the returned crop gives the same preview as rendering the
+        full frame, so callers can keep just the crop around for later.
+        """
+        x0, y0, x1, y1 = self._preview_box(image.shape, regions)
+        crop = image[y0:y1, x0:x1].copy()
+        shifted = {name: mask.translate(-x0, -y0) for name, mask in regions.items()}
+        return crop, shifted
+
+    def render(self, image: np.ndarray, regions: dict[str, RegionMask]) -> bytes:
+        """
+        Draw detected regions on the image and return it JPEG-encoded.
+
+        Args:
+            image: BGR frame the regions were detected on.
+            regions: Dict of region_name -> RegionMask in frame coordinates.
+
+        Returns:
+            JPEG bytes.
+        """
+        x0, y0, x1, y1 = self._preview_box(image.shape, regions)
+        preview = image[y0:y1, x0:x1].copy()
+
+        drawn = [(name, mask) for name, mask in regions.items() if not mask.is_empty]
+        if drawn:
+            # Label map and blend cover only the regions' union box.
+            ux0 = min(mask.x for _, mask in drawn)
+            uy0 = min(mask.y for _, mask in drawn)
+            ux1 = max(mask.bbox[2] for _, mask in drawn)
+            uy1 = max(mask.bbox[3] for _, mask in drawn)
+            face = preview[uy0 - y0:uy1 - y0, ux0 - x0:ux1 - x0]
+
+            # One label per pixel; later regions are drawn on top of earlier ones.
+            labels = np.zeros(face.shape[:2], dtype=np.uint8)
+            lut = np.zeros((256, 1, 3), dtype=np.uint8)
+            for index, (name, mask) in enumerate(drawn, start=1):
+                lut[index, 0] = REGION_COLORS.get(name, DEFAULT_COLOR)
+                local = mask.translate(-ux0, -uy0)
+                np.copyto(local.window(labels), index, where=local.mask > 0)
+
+            overlay = cv2.LUT(cv2.merge((labels, labels, labels)), lut.reshape(1, 256, 3))
+            blended = cv2.addWeighted(overlay, self.alpha, face, 1 - self.alpha, 0)
+            np.copyto(face, blended, where=(labels > 0)[..., None])
+
+        h, w = preview.shape[:2]
+        if self.max_dim and max(h, w) > self.max_dim:
+            scale = self.max_dim / max(h, w)
+            size = (max(1, int(w * scale)), max(1, int(h * scale)))
+            preview = cv2.resize(preview, size, interpolation=cv2.INTER_AREA)
+
+        _, buf = cv2.imencode(".jpg", preview, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        return buf.tobytes()
+
+    def _preview_box(
+        self, shape: tuple, regions: dict[str, RegionMask]
+    ) -> tuple[int, int, int, int]:
+        """Area to encode: the regions' union box plus margin, or the full frame."""
+        h, w = shape[:2]
+        boxes = [mask.bbox for mask in regions.values() if not mask.is_empty]
+        if not self.crop or not boxes:
+            return (0, 0, w, h)
+
+        x0 = min(b[0] for b in boxes)
+        y0 = min(b[1] for b in boxes)
+        x1 = max(b[2] for b in boxes)
+        y1 = max(b[3] for b in boxes)
+        pad_x = int((x1 - x0) * self.margin)
+        pad_y = int((y1 - y0) * self.margin)
+        return (
+            max(0, x0 - pad_x),
+            max(0, y0 - pad_y),
+            min(w, x1 + pad_x),
+            min(h, y1 + pad_y),
+        )
@@ -2,8 +2,17 @@
 Seasonal color palette classifier.
 Maps undertone + depth + contrast to one of 12 seasonal palettes
 and provides comprehensive style recommendations.
+
+The result only depends on (undertone, depth, contrast), so all 27
+combinations are resolved once at import into ``SEASON_TABLE``.  Each entry
+carries the ready-made response dict and its pre-serialised JSON fragment, so
+classification is a dictionary lookup and the palette part of an API response
+can be spliced in as bytes.
 """
 
+import json
+from dataclasses import dataclass
+
 
 # ──────────────────────────────────────────────────────────────
 #  Full palette data for all 12 seasons
@@ -313,6 +322,34 @@ PALETTE_DATA = {
 }
 
 
+UNDERTONES = ("warm", "cool", "neutral")
+DEPTHS = ("light", "medium", "deep")
+CONTRASTS = ("low", "medium", "high")
+
+# Response field -> PALETTE_DATA field, in API response order.
+RESPONSE_FIELDS = {
+    "season_description": "description",
+    "best_colors": "best_colors",
+    "worst_colors": "worst_colors",
+    "clothing_suggestions": "clothing",
+    "jewelry_tone": "jewelry",
+    "hair_color_suggestions": "hair_colors",
+    "makeup_palette": "makeup",
+}
+
+
+@dataclass(frozen=True)
+class PaletteEntry:
+    """Precomputed classification result for one (undertone, depth, contrast)."""
+
+    season: str
+    # Shared between requests — treat as read-only.
+    result: dict
+    # '"season":...,"makeup_palette":{...}' — the palette members of the
+    # response's "analysis" object, without surrounding braces.
+    json_fragment: bytes
+
+
 class SeasonalPaletteClassifier:
     """Classify into one of 12 seasonal color palettes."""
 
@@ -327,14 +364,22 @@ class SeasonalPaletteClassifier:
         Returns:
             Dict with season, palette details, and recommendations.
         """
-        undertone = tone_data["undertone"]["classification"]
-        depth = tone_data["depth"]["level"]
-        contrast = tone_data["contrast"]["level"]
+        return self.lookup(tone_data).result
+
+    def lookup(self, tone_data: dict) -> PaletteEntry:
+        """Return the precomputed table entry for *tone_data*."""
+        key = (
+            tone_data["undertone"]["classification"],
+            tone_data["depth"]["level"],
+            tone_data["contrast"]["level"],
+        )
+        return SEASON_TABLE[key]
 
+    def _build_entry(self, undertone: str, depth: str, contrast: str) -> PaletteEntry:
         season = self._determine_season(undertone, depth, contrast)
         palette = PALETTE_DATA[season]
 
-        return {
+        result = {
             "season": season,
             "description": palette["description"],
             "best_colors": palette["best_colors"],
@@ -345,6 +390,16 @@ class SeasonalPaletteClassifier:
             "makeup_palette": palette["makeup"],
         }
 
+        response_part = {"season": season}
+        for field, source in RESPONSE_FIELDS.items():
+            response_part[field] = palette[source]
+        # Same encoding as FastAPI's JSONResponse; strip the outer braces.
+        encoded = json.dumps(
+            response_part, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+        ).encode("utf-8")
+
+        return PaletteEntry(season=season, result=result, json_fragment=encoded[1:-1])
+
     def _determine_season(self, undertone: str, depth: str, contrast: str) -> str:
         """
         Map undertone + depth + contrast to a specific season.
@@ -434,3 +489,16 @@ class SeasonalPaletteClassifier:
         # Pick the season with the highest score
         best_season = max(scores, key=scores.get)
         return best_season
+
+
+def _build_season_table() -> dict[tuple[str, str, str], PaletteEntry]:
+    classifier = SeasonalPaletteClassifier()
+    return {
+        (undertone, depth, contrast): classifier._build_entry(undertone, depth, contrast)
+        for undertone in UNDERTONES
+        for depth in DEPTHS
+        for contrast in CONTRASTS
+    }
+
+
+SEASON_TABLE = _build_season_table()
@@ -0,0 +1,5 @@
+"""
+Performance benchmarks for the ToneSense analysis pipeline.
+
+Run from the ``backend/`` directory, e.g. ``python -m benchmarks.bench_color_extraction``.
+"""
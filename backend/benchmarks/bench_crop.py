@@ -0,0 +1,70 @@
+"""
+Benchmark: whole-frame vs windowed (crop-first) landmarking.
+
+Draws synthetic faces filling a shrinking fraction of the frame height and,
+for each, times ``FaceDetector.detect`` on the whole frame and on the
+``search_window`` around the face, as live sessions do with the previous
+frame's face.  Also counts how many seeds each path finds a face for: the
+landmarker's detector sees a downscaled whole frame, so small faces are
+only found inside a window.
+
+    python -m benchmarks.bench_crop [--repeat 10] [--seeds 5] [--size 1280x960]
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from analysis.face_detection import FaceDetector, search_window
+from benchmarks.synthetic import load_landmarks, make_landmark_face
+
+FACE_FRACTIONS = (0.5, 0.3, 0.2, 0.12, 0.08, 0.05)
+
+
+def _time_ms(fn, repeat: int) -> float:
+    """Median wall time of *fn* in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return float(np.median(samples))
+
+
+def _true_bbox(width: int, height: int, face_fraction: float) -> tuple[int, int, int, int]:
+    """Bounding box of the face ``make_landmark_face`` draws."""
+    points = load_landmarks() * face_fraction * min(width, height) + (width / 2, height / 2)
+    (x_min, y_min), (x_max, y_max) = points.min(axis=0), points.max(axis=0)
+    return int(x_min), int(y_min), int(x_max), int(y_max)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=10, help="timed runs per case")
+    parser.add_argument("--seeds", type=int, default=5, help="faces drawn per fraction")
+    parser.add_argument("--size", default="1280x960", help="frame size WIDTHxHEIGHT")
+    args = parser.parse_args()
+    width, height = (int(v) for v in args.size.split("x"))
+
+    detector = FaceDetector()
+    print(f"{'face / frame':>12} {'window':>11} {'full ms':>8} {'window ms':>10} {'full found':>11} {'window found':>13}")
+    try:
+        for fraction in FACE_FRACTIONS:
+            window = search_window(_true_bbox(width, height, fraction), (height, width))
+            images = [make_landmark_face(width, height, seed=s, face_fraction=fraction) for s in range(args.seeds)]
+            full_found = sum(detector.detect(img) is not None for img in images)
+            window_found = sum(detector.detect(img, roi=window) is not None for img in images)
+            full_ms = _time_ms(lambda: detector.detect(images[0]), args.repeat)
+            window_ms = _time_ms(lambda: detector.detect(images[0], roi=window), args.repeat)
+            size = f"{window[2] - window[0]}x{window[3] - window[1]}"
+            print(
+                f"{fraction:>12.2f} {size:>11} {full_ms:>8.1f} {window_ms:>10.1f} "
+                f"{full_found:>7}/{args.seeds:<3} {window_found:>9}/{args.seeds:<3}"
+            )
+    finally:
+        detector.close()
+
+
+if __name__ == "__main__":
+    main()
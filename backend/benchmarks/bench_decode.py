@@ -0,0 +1,63 @@
+"""
+Benchmark: decode-time JPEG downscaling vs. full decode + resize.
+
+Encodes synthetic frames at phone-camera resolutions and compares latency
+and decoded buffer size for both paths at the analysis resolution.
+
+    python -m benchmarks.bench_decode [--repeat 20] [--max-dim 1280]
+"""
+
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from analysis.image_decode import decode_image, limit_resolution, reduction_factor
+from benchmarks.synthetic import make_face_frame
+
+RESOLUTIONS = [(1920, 1080), (4032, 3024), (6000, 4000)]
+
+
+def full_decode(data: bytes, max_dim: int) -> np.ndarray:
+    """Original path: decode every pixel, then resize."""
+    image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+    return limit_resolution(image, max_dim)
+
+
+def _time_ms(fn, repeat: int) -> float:
+    """Median wall time of *fn* in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return float(np.median(samples))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20, help="timed runs per case")
+    parser.add_argument("--max-dim", type=int, default=1280, help="analysis resolution")
+    args = parser.parse_args()
+
+    print(f"{'source':>12} {'full ms':>8} {'reduced ms':>11} {'speedup':>8} {'full MB':>8} {'reduced MB':>11}")
+    for width, height in RESOLUTIONS:
+        image, _ = make_face_frame(width, height)
+        _, buf = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, 92])
+        data = buf.tobytes()
+
+        full_ms = _time_ms(lambda: full_decode(data, args.max_dim), args.repeat)
+        reduced_ms = _time_ms(lambda: decode_image(data, args.max_dim), args.repeat)
+        # Largest decoded buffer on each path, before the final resize.
+        factor = reduction_factor(max(width, height), args.max_dim)
+        full_mb = width * height * 3 / 2**20
+        reduced_mb = -(-width // factor) * -(-height // factor) * 3 / 2**20
+        print(
+            f"{width:>5}x{height:<6} {full_ms:>8.1f} {reduced_ms:>11.1f} "
+            f"{full_ms / reduced_ms:>7.1f}x {full_mb:>8.1f} {reduced_mb:>11.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
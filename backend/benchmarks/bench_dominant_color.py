@@ -0,0 +1,93 @@
+"""
+Benchmark: "mean" vs "dominant" overall skin colour (accuracy and cost).
+
+Renders synthetic faces of a known skin colour and disturbs them the way real
+photos do: a shadow over a third of the face, blusher on both cheeks, or
+many specular highlights.  For each case both ``ColorExtractor`` modes are
+run on the same pixels; accuracy is the ΔE (CIE76) between the reported
+overall colour and the true skin colour, and cost is the median time of a
+whole ``extract`` call.
+
+    python -m benchmarks.bench_dominant_color [--repeat 50] [--seeds 5] [--size 1280x960]
+"""
+
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from analysis.color_extraction import ColorExtractor
+from benchmarks.synthetic import SKIN_BGR, make_face_frame
+
+BLUSH_BGR = (150, 110, 230)
+SCENES = ("plain", "shadow", "blush", "highlights")
+
+
+def _lab(bgr) -> np.ndarray:
+    """One BGR colour -> float CIELAB."""
+    pixel = np.asarray(bgr, dtype=np.float32).reshape(1, 1, 3) / 255
+    return cv2.cvtColor(pixel, cv2.COLOR_BGR2LAB).reshape(3)
+
+
+def make_scene(scene: str, width: int, height: int, seed: int) -> tuple[np.ndarray, dict]:
+    """A ``make_face_frame`` face with *scene*'s disturbance applied."""
+    image, face = make_face_frame(width, height, seed=seed)
+    x0, y0, x1, y1 = face["face_mask"].bbox
+    if scene == "shadow":
+        third = x0 + (x1 - x0) // 3
+        image[y0:y1, x0:third] = (image[y0:y1, x0:third] * 0.6).astype(np.uint8)
+    elif scene == "blush":
+        for name in ("left_cheek", "right_cheek"):
+            cheek = face["regions"][name].to_full(image.shape[:2]).astype(bool)
+            image[cheek] = (image[cheek] * 0.5 + np.array(BLUSH_BGR) * 0.5).astype(np.uint8)
+    elif scene == "highlights":
+        rng = np.random.default_rng(seed)
+        for _ in range(60):
+            center = (int(rng.integers(x0, x1)), int(rng.integers(y0, y1)))
+            cv2.circle(image, center, max(1, (x1 - x0) // 30), (245, 245, 250), -1)
+    return image, face
+
+
+def _time_ms(fn, repeat: int) -> float:
+    """Median wall time of *fn* in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return float(np.median(samples))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=50, help="timed runs per case")
+    parser.add_argument("--seeds", type=int, default=5, help="faces rendered per scene")
+    parser.add_argument("--size", default="1280x960", help="frame size WIDTHxHEIGHT")
+    args = parser.parse_args()
+    width, height = (int(v) for v in args.size.split("x"))
+
+    extractors = {mode: ColorExtractor(mode=mode) for mode in ("mean", "dominant")}
+    truth = _lab(SKIN_BGR)
+    print(f"{'scene':<11} {'mean ΔE':>8} {'dominant ΔE':>12} {'mean ms':>8} {'dominant ms':>12}")
+    for scene in SCENES:
+        errors = {mode: [] for mode in extractors}
+        for seed in range(args.seeds):
+            image, face = make_scene(scene, width, height, seed)
+            for mode, extractor in extractors.items():
+                overall = extractor.extract(image, face["regions"], face["face_mask"])["overall"]
+                errors[mode].append(float(np.linalg.norm(_lab(overall["rgb"][::-1]) - truth)))
+        timings = {
+            mode: _time_ms(
+                lambda: extractor.extract(image, face["regions"], face["face_mask"]), args.repeat
+            )
+            for mode, extractor in extractors.items()
+        }
+        print(
+            f"{scene:<11} {np.mean(errors['mean']):>8.2f} {np.mean(errors['dominant']):>12.2f} "
+            f"{timings['mean']:>8.2f} {timings['dominant']:>12.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
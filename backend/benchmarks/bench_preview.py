@@ -0,0 +1,66 @@
+"""
+Benchmark: single-pass PreviewRenderer vs. the per-region copy-and-blend loop.
+
+Reports latency and encoded size at several resolutions.
+
+    python -m benchmarks.bench_preview [--repeat 30]
+"""
+
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from analysis.preview import REGION_COLORS, DEFAULT_COLOR, PreviewRenderer
+from benchmarks.synthetic import make_face_frame
+
+RESOLUTIONS = [(640, 480), (1280, 960), (2560, 1920)]
+
+
+def legacy_preview(image: np.ndarray, regions: dict) -> bytes:
+    """The original renderer: a full-frame copy and blend per region."""
+    preview = image.copy()
+    for region_name, mask in regions.items():
+        color = REGION_COLORS.get(region_name, DEFAULT_COLOR)
+        overlay = preview.copy()
+        mask.window(overlay)[mask.mask > 0] = color
+        cv2.addWeighted(overlay, 0.3, preview, 0.7, 0, preview)
+    _, buf = cv2.imencode(".jpg", preview, [cv2.IMWRITE_JPEG_QUALITY, 85])
+    return buf.tobytes()
+
+
+def _time_ms(fn, repeat: int) -> float:
+    """Median wall time of *fn* in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return float(np.median(samples))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=30, help="timed runs per case")
+    args = parser.parse_args()
+
+    renderers = {
+        "single-pass full": PreviewRenderer(quality=85, max_dim=0, crop=False),
+        "single-pass crop": PreviewRenderer(),
+    }
+    print(f"{'resolution':>12} {'renderer':>18} {'ms':>8} {'KB':>8}")
+    for width, height in RESOLUTIONS:
+        image, face = make_face_frame(width, height)
+        regions = face["regions"]
+        cases = {"legacy": lambda: legacy_preview(image, regions)}
+        for name, renderer in renderers.items():
+            cases[name] = lambda r=renderer: r.render(image, regions)
+        for name, fn in cases.items():
+            ms = _time_ms(fn, args.repeat)
+            size_kb = len(fn()) / 1024
+            print(f"{width:>5}x{height:<6} {name:>18} {ms:>8.2f} {size_kb:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Benchmark: cold start — import time and time to first fast response.
+
+Every measurement runs in a fresh interpreter, so nothing is already imported
+or initialised.  Reports the median import time of ``main`` with the modules
+that cost the most (from ``python -X importtime``), then how long starting
+the executor, warming it up and the first analysis take, with and without
+the warm-up.
+
+    python -m benchmarks.bench_startup [--runs 5] [--top 12] [--budget-ms 900]
+
+Exits with status 1 when the median import time is over the budget.  The
+default allows ~50% over the ~600 ms measured on the single-core machine the
+committed benchmark baseline was recorded on (1.27 s before main deferred
+matplotlib.pyplot and sounddevice).
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# Starts the executor like the API's lifespan does and times the first
+# analysis of a photo-sized synthetic face.
+_START_SCRIPT = """
+import asyncio, json, sys, time
+started = time.perf_counter()
+import main, worker
+from benchmarks.synthetic import make_landmark_face
+import cv2
+
+warm = sys.argv[1] == "1"
+_, buf = cv2.imencode(".jpg", make_landmark_face(1280, 960, seed=1))
+
+async def run():
+    timings = {"import": time.perf_counter() - started}
+    t = time.perf_counter()
+    main.executor.start(warm=warm)
+    timings["start"] = time.perf_counter() - t
+    if warm:
+        t = time.perf_counter()
+        await main.executor.warm_up()
+        timings["warm_up"] = time.perf_counter() - t
+    t = time.perf_counter()
+    await main.executor.submit(worker.run_analysis, buf.tobytes(), "none", False)
+    timings["first_analysis"] = time.perf_counter() - t
+    main.executor.shutdown()
+    print(json.dumps({k: round(v * 1000, 1) for k, v in timings.items()}))
+
+asyncio.run(run())
+"""
+
+
+def import_profile() -> tuple[float, list[tuple[float, float, str]]]:
+    """
+    Import ``main`` in a fresh interpreter under ``-X importtime``.
+
+    Returns:
+        Total import time of ``main`` (ms) and ``(self ms, cumulative ms,
+        module)`` for every module imported.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+    )
+    modules = []
+    total = 0.0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules.append((int(self_us) / 1000, int(cumulative_us) / 1000, name.strip()))
+        if name.strip() == "main":
+            total = int(cumulative_us) / 1000
+    return total, modules
+
+
+def start_timings(warm: bool) -> dict:
+    """Run ``_START_SCRIPT`` in a fresh interpreter and return its timings (ms)."""
+    result = subprocess.run(
+        [sys.executable, "-c", _START_SCRIPT, "1" if warm else "0"],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per measurement")
+    parser.add_argument("--top", type=int, default=12, help="slowest modules to list")
+    parser.add_argument("--budget-ms", type=float, default=900.0, help="allowed median import time of main")
+    args = parser.parse_args()
+
+    profiles = [import_profile() for _ in range(args.runs)]
+    import_ms = statistics.median(total for total, _ in profiles)
+    print(f"import main: {import_ms:.0f} ms median of {args.runs} (budget {args.budget_ms:.0f} ms)")
+
+    # Slowest modules by their own import time, from the median run.
+    _, modules = sorted(profiles, key=lambda p: p[0])[len(profiles) // 2]
+    print(f"\n{'self ms':>8} {'cum ms':>8}  module")
+    for self_ms, cumulative_ms, name in sorted(modules, reverse=True)[:args.top]:
+        print(f"{self_ms:>8.1f} {cumulative_ms:>8.1f}  {name}")
+
+    print(f"\n{'':>10} {'import ms':>10} {'start ms':>9} {'warm-up ms':>11} {'1st analysis ms':>16}")
+    for warm in (False, True):
+        runs = [start_timings(warm) for _ in range(args.runs)]
+        median = {k: statistics.median(r[k] for r in runs) for k in runs[0]}
+        print(
+            f"{'warm' if warm else 'cold':>10} {median['import']:>10.0f} {median['start']:>9.0f} "
+            f"{median.get('warm_up', 0):>11.0f} {median['first_analysis']:>16.0f}"
+        )
+
+    if import_ms > args.budget_ms:
+        print(f"\nImport time over budget by {import_ms - args.budget_ms:.0f} ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
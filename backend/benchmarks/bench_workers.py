@@ -0,0 +1,114 @@
+"""
+Benchmark: memory of N API processes, pre-forked (serve.py) vs uvicorn --workers.
+
+Starts each launcher on a free local port, waits until ``/api/ready`` answers
+and the processes have settled, then sums RSS and PSS over the whole process
+tree.  PSS charges shared pages proportionally, so it is the figure that
+shows what copy-on-write sharing saves; RSS counts shared pages once per
+process.  Linux only (reads ``/proc``).
+
+    python -m benchmarks.bench_workers [--workers 1,2,4] [--settle 3]
+"""
+
+import argparse
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _tree(pid: int) -> list[int]:
+    """*pid* and all of its descendants."""
+    pids = [pid]
+    for tid in Path(f"/proc/{pid}/task").iterdir():
+        children = (tid / "children").read_text().split()
+        for child in children:
+            pids.extend(_tree(int(child)))
+    return pids
+
+
+def _memory_kb(pid: int) -> tuple[int, int]:
+    """(RSS, PSS) of one process in KiB."""
+    rss = pss = 0
+    for line in Path(f"/proc/{pid}/smaps_rollup").read_text().splitlines():
+        if line.startswith("Rss:"):
+            rss = int(line.split()[1])
+        elif line.startswith("Pss:"):
+            pss = int(line.split()[1])
+    return rss, pss
+
+
+def _wait_ready(port: int, processes: int, timeout: float = 120.0):
+    """Poll /api/ready until enough consecutive 200s that every process likely answered."""
+    deadline = time.monotonic() + timeout
+    streak = 0
+    while streak < 4 * processes:
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"not ready after {timeout}s")
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/api/ready", timeout=2):
+                streak += 1
+                continue
+        except (urllib.error.URLError, ConnectionError, TimeoutError):
+            streak = 0
+        time.sleep(0.1)
+
+
+def measure(command: list[str], port: int, processes: int, settle: float) -> dict:
+    proc = subprocess.Popen(
+        command, cwd=BACKEND_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        started = time.perf_counter()
+        _wait_ready(port, processes)
+        ready_s = time.perf_counter() - started
+        time.sleep(settle)
+        pids = _tree(proc.pid)
+        totals = [_memory_kb(pid) for pid in pids]
+        return {
+            "processes": len(pids),
+            "ready_s": round(ready_s, 2),
+            "rss_mb": round(sum(rss for rss, _ in totals) / 1024, 1),
+            "pss_mb": round(sum(pss for _, pss in totals) / 1024, 1),
+        }
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", default="1,2,4", help="comma-separated API process counts")
+    parser.add_argument("--settle", type=float, default=3.0, help="seconds to wait after ready")
+    args = parser.parse_args()
+
+    print(f"{'launcher':<10} {'N':>3} {'procs':>6} {'ready s':>8} {'RSS MB':>8} {'PSS MB':>8} {'PSS/N':>7}")
+    for n in [int(w) for w in args.workers.split(",") if w.strip()]:
+        launchers = {
+            "serve.py": lambda port: [sys.executable, "serve.py", "--workers", str(n), "--port", str(port)],
+            "uvicorn": lambda port: [
+                sys.executable, "-m", "uvicorn", "main:app", "--workers", str(n), "--port", str(port),
+            ],
+        }
+        for name, command in launchers.items():
+            port = _free_port()
+            result = measure(command(port), port, n, args.settle)
+            print(
+                f"{name:<10} {n:>3} {result['processes']:>6} {result['ready_s']:>8.1f} "
+                f"{result['rss_mb']:>8.1f} {result['pss_mb']:>8.1f} {result['pss_mb'] / n:>7.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+"""
+Reproducible benchmark suite for the analysis pipeline.
+
+Times every stage separately on synthetic face images at several resolutions
+(or on photos from ``--images``), then the HTTP endpoints end to end through an
+in-process ASGI client at increasing concurrency.  Reports p50 / p95 / p99
+latency and peak RSS, and compares p50s against a stored baseline.
+
+    python -m benchmarks.suite [--repeat 20] [--requests 48] [--concurrency 1,4,8]
+                               [--images DIR] [--baseline PATH]
+                               [--save-baseline] [--check] [--tolerance 0.25]
+
+The result cache is disabled so repeated images are analysed every time, and
+the executor queue is deepened so concurrency shows up as latency, not 503s.
+End-to-end runs need httpx (as does FastAPI's TestClient).
+"""
+
+import os
+
+# Must happen before config is imported: measure real work, not cache hits,
+# and queue concurrent requests rather than rejecting them with 503.
+os.environ.setdefault("TONESENSE_CACHE_SIZE", "0")
+os.environ.setdefault("TONESENSE_QUEUE_SIZE", "64")
+
+import argparse
+import asyncio
+import json
+import platform
+import resource
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+import config
+import worker
+from analysis.face_detection import FaceDetector
+from benchmarks.synthetic import make_face_frame, make_landmark_face
+
+RESOLUTIONS = [(640, 480), (1280, 960), (4032, 3024)]
+DEFAULT_BASELINE = Path(__file__).parent / "baseline.json"
+# Resolution of the images sent to the endpoints.
+ENDPOINT_RESOLUTION = (1280, 960)
+# Slowdowns smaller than this are timer noise, whatever the ratio.
+MIN_REGRESSION_MS = 0.1
+
+
+def percentiles(samples_ms: list[float]) -> dict:
+    """p50 / p95 / p99 / mean of latency samples, in milliseconds."""
+    values = np.asarray(samples_ms)
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        "p50": round(float(p50), 3),
+        "p95": round(float(p95), 3),
+        "p99": round(float(p99), 3),
+        "mean": round(float(values.mean()), 3),
+        "n": len(values),
+    }
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes.
+    return round(peak / (2**20 if sys.platform == "darwin" else 2**10), 1)
+
+
+def _samples(fn, repeat: int) -> list[float]:
+    fn()  # warm-up
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def _encode(image: np.ndarray) -> bytes:
+    _, buf = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, 90])
+    return buf.tobytes()
+
+
+def load_cases(images_dir: str | None) -> list[tuple[str, bytes]]:
+    """(label, encoded JPEG / PNG) pairs to run the stages on."""
+    if images_dir is None:
+        return [
+            (f"{w}x{h}", _encode(make_landmark_face(w, h, seed=i)))
+            for i, (w, h) in enumerate(RESOLUTIONS)
+        ]
+    paths = sorted(
+        p for p in Path(images_dir).iterdir()
+        if p.suffix.lower() in (".jpg", ".jpeg", ".png")
+    )
+    if not paths:
+        raise SystemExit(f"No JPEG / PNG files in {images_dir}")
+    return [(p.name, p.read_bytes()) for p in paths]
+
+
+# ── Stages ────────────────────────────────────────────────────
+
+def bench_stages(cases: list[tuple[str, bytes]], repeat: int) -> dict:
+    """Time each pipeline stage on every case."""
+    results = {}
+    detector = FaceDetector()
+    try:
+        for label, data in cases:
+            image = worker._pipeline().decode(data)
+            face = detector.detect(image)
+            if face is None:
+                # No face found: time the later stages on a synthetic layout.
+                print(f"  {label}: no face detected, using synthetic regions")
+                _, face = make_face_frame(image.shape[1], image.shape[0])
+            color_data = worker.color_extractor.extract(image, face["regions"], face["face_mask"])
+            tone_data = worker.tone_classifier.classify(color_data)
+
+            stages = {
+                "decode": lambda: worker._pipeline().decode(data),
+                "detect": lambda: detector.detect(image),
+                "extract": lambda: worker.color_extractor.extract(
+                    image, face["regions"], face["face_mask"]
+                ),
+                "tone": lambda: worker.tone_classifier.classify(color_data),
+                "palette": lambda: worker.palette_classifier.classify(tone_data, color_data),
+                "preview": lambda: worker.preview_renderer.render(image, face["regions"]),
+                "pipeline": lambda: worker.run_analysis(data, "inline"),
+            }
+            for stage, fn in stages.items():
+                try:
+                    results[f"stage/{stage}/{label}"] = percentiles(_samples(fn, repeat))
+                except worker.AnalysisError as e:
+                    print(f"  {label}: {stage} failed ({e.detail}), skipped")
+    finally:
+        detector.close()
+    return results
+
+
+# ── Endpoints ─────────────────────────────────────────────────
+
+async def _run_load(client, send, total: int, concurrency: int) -> tuple[list[float], dict, float]:
+    """
+    Issue *total* requests, at most *concurrency* at a time.
+
+    Returns:
+        Latencies of the 200 responses (ms), a count per status code, and
+        the wall time of the whole run (s).
+    """
+    slots = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+    statuses: dict[int, int] = {}
+
+    async def one(i: int):
+        async with slots:
+            start = time.perf_counter()
+            response = await send(client, i)
+            # Only successful requests count towards latency; 503s are fast.
+            if response.status_code == 200:
+                latencies.append((time.perf_counter() - start) * 1000)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    return latencies, statuses, time.perf_counter() - started
+
+
+async def bench_endpoints(total: int, concurrency_levels: list[int]) -> dict:
+    """Time the analysis endpoints through an in-process ASGI client."""
+    try:
+        import httpx
+    except ImportError:
+        print("  httpx is not installed; skipping endpoint benchmarks")
+        return {}
+    import main
+
+    width, height = ENDPOINT_RESOLUTION
+    frames = [_encode(make_landmark_face(width, height, seed=i)) for i in range(8)]
+
+    async def analyze(client, i):
+        files = {"file": (f"{i}.jpg", frames[i % len(frames)], "image/jpeg")}
+        return await client.post("/api/analyze?preview=none", files=files)
+
+    async def analyze_frame(client, i):
+        return await client.post(
+            "/api/analyze-frame?preview=none",
+            content=frames[i % len(frames)],
+            headers={"Content-Type": "image/jpeg"},
+        )
+
+    endpoints = {"analyze": analyze, "analyze-frame": analyze_frame}
+    results = {}
+    main.executor.start()
+    try:
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for name, send in endpoints.items():
+                await send(client, 0)  # warm-up
+                for concurrency in concurrency_levels:
+                    latencies, statuses, elapsed = await _run_load(client, send, total, concurrency)
+                    if not latencies:
+                        print(f"  {name} c{concurrency}: no successful responses {statuses}")
+                        continue
+                    entry = percentiles(latencies)
+                    entry["rps"] = round(len(latencies) / elapsed, 2)
+                    entry["statuses"] = {str(k): v for k, v in sorted(statuses.items())}
+                    results[f"endpoint/{name}/c{concurrency}"] = entry
+    finally:
+        main.executor.shutdown()
+    return results
+
+
+# ── Reporting ─────────────────────────────────────────────────
+
+def print_results(results: dict):
+    print(f"{'case':<40} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'ok rps':>8}  statuses")
+    for key, entry in results.items():
+        rps = f"{entry['rps']:>8.1f}" if "rps" in entry else f"{'':>8}"
+        statuses = " ".join(f"{k}:{v}" for k, v in entry.get("statuses", {}).items())
+        print(f"{key:<40} {entry['p50']:>9.2f} {entry['p95']:>9.2f} {entry['p99']:>9.2f} {rps}  {statuses}")
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Print p50 against the baseline; return the keys that regressed."""
+    previous = baseline.get("results", {})
+    regressions = []
+    print(f"\n{'case':<40} {'base p50':>9} {'now p50':>9} {'ratio':>7}")
+    for key, entry in results.items():
+        if key not in previous:
+            continue
+        before, now = previous[key]["p50"], entry["p50"]
+        ratio = now / before if before else float("inf")
+        flag = ""
+        if ratio > 1 + tolerance and now - before > MIN_REGRESSION_MS:
+            regressions.append(key)
+            flag = "  REGRESSION"
+        print(f"{key:<40} {before:>9.2f} {now:>9.2f} {ratio:>6.2f}x{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20, help="timed runs per stage")
+    parser.add_argument("--requests", type=int, default=48, help="requests per endpoint and concurrency level")
+    parser.add_argument("--concurrency", default="1,4,8", help="comma-separated concurrency levels")
+    parser.add_argument("--images", help="directory of face photos to use instead of synthetic frames")
+    parser.add_argument("--skip-endpoints", action="store_true", help="only time the stages")
+    parser.add_argument("--baseline", default=str(DEFAULT_BASELINE), help="baseline JSON to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--check", action="store_true", help="exit with status 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed p50 slowdown (0.25 = 25%%)")
+    parser.add_argument("--output", help="also write the results JSON here")
+    args = parser.parse_args()
+
+    print(f"Stages ({args.repeat} runs each)")
+    results = bench_stages(load_cases(args.images), args.repeat)
+    stage_rss = peak_rss_mb()
+
+    if not args.skip_endpoints:
+        levels = [int(c) for c in args.concurrency.split(",") if c.strip()]
+        print(f"Endpoints ({args.requests} requests per level, executor {config.EXECUTOR_MODE} x {config.EXECUTOR_WORKERS})")
+        results.update(asyncio.run(bench_endpoints(args.requests, levels)))
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "executor": f"{config.EXECUTOR_MODE} x {config.EXECUTOR_WORKERS}",
+            "images": args.images or "synthetic",
+        },
+        "peak_rss_mb": {"stages": stage_rss, "total": peak_rss_mb()},
+        "results": results,
+    }
+    print()
+    print_results(results)
+    print(f"\nPeak RSS: {report['peak_rss_mb']['stages']} MB after stages, {report['peak_rss_mb']['total']} MB total")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2) + "\n")
+
+    baseline_path = Path(args.baseline)
+    if args.save_baseline:
+        baseline_path.write_text(json.dumps(report, indent=2) + "\n")
+        print(f"Baseline written to {baseline_path}")
+        return
+
+    if baseline_path.exists():
+        regressions = compare(results, json.loads(baseline_path.read_text()), args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} case(s) slower than baseline by more than {args.tolerance:.0%}")
+            if args.check:
+                sys.exit(1)
+    else:
+        print(f"\nNo baseline at {baseline_path}; run with --save-baseline to create one")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Deterministic synthetic face frames for benchmarking.
+
+``make_face_frame`` draws a plain skin ellipse that MediaPipe does not
+recognise as a face, so it also returns region masks laid out like the
+detector's, letting the stages after detection be timed on realistic pixel
+counts.  ``make_landmark_face`` draws eyes, brows, nose and lips from a stored
+set of landmarks (``fixtures/face_landmarks.json``); MediaPipe does detect
+those, so they can drive the full pipeline and the HTTP endpoints.
+"""
+
+import json
+from functools import lru_cache
+from pathlib import Path
+
+import cv2
+import mediapipe as mp
+import numpy as np
+
+from analysis.face_detection import FaceDetector, RegionMask
+
+SKIN_BGR = (140, 168, 198)
+LANDMARK_FIXTURE = Path(__file__).parent / "fixtures" / "face_landmarks.json"
+
+# (connection set, BGR colour, thickness as a fraction of face height)
+_FEATURES = (
+    ("FACE_LANDMARKS_LEFT_EYEBROW", (50, 60, 70), 0.012),
+    ("FACE_LANDMARKS_RIGHT_EYEBROW", (50, 60, 70), 0.012),
+    ("FACE_LANDMARKS_LEFT_EYE", (40, 40, 40), 0.008),
+    ("FACE_LANDMARKS_RIGHT_EYE", (40, 40, 40), 0.008),
+    ("FACE_LANDMARKS_NOSE", (110, 130, 160), 0.004),
+    ("FACE_LANDMARKS_LIPS", (90, 90, 170), 0.008),
+)
+
+
+def make_face_frame(width: int, height: int, seed: int = 0) -> tuple[np.ndarray, dict]:
+    """
+    Render a skin-toned face ellipse with shading, noise and highlights.
+
+    Args:
+        width: Frame width in pixels.
+        height: Frame height in pixels.
+        seed: Seed for the pixel noise.
+
+    Returns:
+        (BGR image, face dict shaped like ``FaceDetector.detect`` output)
+    """
+    rng = np.random.default_rng(seed)
+    image = np.full((height, width, 3), (60, 70, 80), dtype=np.uint8)
+
+    # Face occupies roughly the middle third of the frame.
+    cx, cy = width // 2, int(height * 0.45)
+    ax, ay = max(8, width // 7), max(10, height // 4)
+    cv2.ellipse(image, (cx, cy), (ax, ay), 0, 0, 360, SKIN_BGR, -1)
+    cv2.rectangle(
+        image,
+        (cx - ax // 2, cy + ay - ay // 8),
+        (cx + ax // 2, min(height - 1, cy + ay + ay // 2)),
+        SKIN_BGR,
+        -1,
+    )
+
+    noise = rng.normal(0, 8, image.shape)
+    image = np.clip(image.astype(np.float32) + noise, 0, 255).astype(np.uint8)
+
+    # Shadow along one side and a few specular highlights as outliers.
+    shadow = image[cy - ay:cy + ay, cx - ax:cx - ax // 2]
+    shadow[:] = (shadow * 0.55).astype(np.uint8)
+    for _ in range(12):
+        hx = int(rng.integers(cx - ax // 2, cx + ax // 2))
+        hy = int(rng.integers(cy - ay // 2, cy + ay // 2))
+        cv2.circle(image, (hx, hy), max(1, ax // 25), (250, 250, 250), -1)
+
+    def poly(points):
+        pts = np.array([(cx + px * ax, cy + py * ay) for px, py in points])
+        return RegionMask.from_polygon(pts, image.shape)
+
+    regions = {
+        "forehead": poly([(-0.6, -0.85), (0.6, -0.85), (0.65, -0.45), (-0.65, -0.45)]),
+        "left_cheek": poly([(-0.8, -0.1), (-0.3, -0.1), (-0.3, 0.35), (-0.75, 0.4)]),
+        "right_cheek": poly([(0.3, -0.1), (0.8, -0.1), (0.75, 0.4), (0.3, 0.35)]),
+        "jawline": poly([(-0.8, 0.3), (0.8, 0.3), (0.4, 0.95), (-0.4, 0.95)]),
+        "neck": poly([(-0.35, 1.0), (0.35, 1.0), (0.35, 1.4), (-0.35, 1.4)]),
+    }
+    oval = cv2.ellipse2Poly((cx, cy), (ax, ay), 0, 0, 360, 10)
+    face_mask = RegionMask.from_polygon(oval, image.shape)
+    x0, y0, x1, y1 = face_mask.bbox
+
+    return image, {
+        "landmarks": oval,
+        "regions": regions,
+        "face_mask": face_mask,
+        "bbox": (x0, y0, x1 - 1, y1 - 1),
+    }
+
+
+@lru_cache(maxsize=1)
+def load_landmarks() -> np.ndarray:
+    """Fixture landmarks, centred on the face box and scaled by its height."""
+    with open(LANDMARK_FIXTURE) as f:
+        return np.array(json.load(f)["points"], dtype=np.float64)
+
+
+def make_landmark_face(
+    width: int, height: int, seed: int = 0, face_fraction: float = 0.5
+) -> np.ndarray:
+    """
+    Render a face MediaPipe can detect, from the fixture landmarks.
+
+    Args:
+        width: Frame width in pixels.
+        height: Frame height in pixels.
+        seed: Seed for the pixel noise and skin tone jitter.
+        face_fraction: Face height relative to the shorter frame side.
+
+    Returns:
+        BGR image.
+    """
+    rng = np.random.default_rng(seed)
+    size = face_fraction * min(width, height)
+    points = load_landmarks() * size + (width / 2, height / 2)
+    pts = np.rint(points).astype(np.int32)
+
+    image = np.full((height, width, 3), (70, 80, 90), dtype=np.uint8)
+    skin = tuple(int(c) for c in np.clip(np.array(SKIN_BGR) + rng.integers(-20, 21, 3), 0, 255))
+    cv2.fillPoly(image, [pts[FaceDetector.FACE_OVAL_INDICES]], skin)
+
+    connections = mp.tasks.vision.FaceLandmarksConnections
+    for name, color, thickness in _FEATURES:
+        line_width = max(1, int(round(thickness * size)))
+        for c in getattr(connections, name):
+            cv2.line(image, tuple(pts[c.start]), tuple(pts[c.end]), color, line_width, cv2.LINE_AA)
+
+    noise = rng.normal(0, 4, image.shape)
+    return np.clip(image.astype(np.float32) + noise, 0, 255).astype(np.uint8)
@@ -0,0 +1,243 @@
+"""
+Content-addressed cache for analysis results.
+
+Results are keyed by a hash of the decoded, resized image, so re-submitting
+the same photo (retries, refreshes, several tabs) skips detection entirely.
+The in-process store is an LRU bounded by entry count and TTL; an optional
+on-disk store lets results survive restarts and be shared by worker processes.
+Expired files are swept out by the processes writing to the directory.
+Values are written to disk by a ``DiskCodec`` (npz archives or JSON, never
+pickle), so a file planted in the cache directory can at worst be rejected
+as corrupt, not executed.
+"""
+
+import hashlib
+import io
+import logging
+import os
+import tempfile
+import threading
+import time
+import zipfile
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable
+
+import numpy as np
+
+logger = logging.getLogger("tonesense.cache")
+
+# Seconds between sweeps of expired disk entries (or the TTL, if shorter).
+DISK_PRUNE_INTERVAL = 300
+# Entries are written to a temporary file first, then renamed into place.
+TMP_SUFFIX = ".tmp"
+
+
+def image_key(image: np.ndarray) -> str:
+    """Hash of the pixel data and geometry of a decoded image."""
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(repr(image.shape).encode())
+    digest.update(np.ascontiguousarray(image).data)
+    return digest.hexdigest()
+
+
+@dataclass(frozen=True)
+class DiskCodec:
+    """How a cache's values are written to and read back from disk."""
+
+    encode: Callable[[Any], bytes]
+    # Raises ValueError or KeyError on data it cannot read back.
+    decode: Callable[[bytes], Any]
+    suffix: str = ".npz"
+
+
+def pack_arrays(arrays: dict[str, np.ndarray]) -> bytes:
+    """Serialise named arrays as an uncompressed npz archive."""
+    buffer = io.BytesIO()
+    np.savez(buffer, **arrays)
+    return buffer.getvalue()
+
+
+def unpack_arrays(data: bytes) -> dict[str, np.ndarray]:
+    """Inverse of ``pack_arrays``; object arrays are refused, not unpickled."""
+    try:
+        archive = np.load(io.BytesIO(data), allow_pickle=False)
+        if not isinstance(archive, np.lib.npyio.NpzFile):
+            raise ValueError("not an npz archive")
+        with archive:
+            return {name: archive[name] for name in archive.files}
+    except (OSError, EOFError, zipfile.BadZipFile) as e:
+        raise ValueError(f"Not an array archive: {e}") from e
+
+
+class ResultCache:
+    """Thread-safe LRU + TTL cache of analysis results."""
+
+    def __init__(
+        self,
+        max_entries: int = 256,
+        ttl_seconds: float = 3600,
+        disk_dir: str | os.PathLike | None = None,
+        codec: DiskCodec | None = None,
+        memory: bool = True,
+    ):
+        """
+        Args:
+            disk_dir: Also keep entries as files here; requires *codec*.
+            codec: Serialisation for the disk tier.
+            memory: Keep entries in memory too.  Turn off for a disk-backed
+                cache whose entries other processes update, so every
+                ``get`` sees the latest copy.
+        """
+        if disk_dir and codec is None:
+            raise ValueError("A disk-backed ResultCache needs a codec")
+        self.codec = codec
+        self.memory = memory or not disk_dir
+        self.max_entries = max(0, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        if self.disk_dir is not None:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._next_prune = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def get(self, key: str) -> Any | None:
+        """Return the cached result for *key*, or None on a miss."""
+        if not self.enabled:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key) if self.memory else None
+            if entry is not None:
+                stored_at, value = entry
+                if now - stored_at <= self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return value
+                del self._entries[key]
+
+        value = self._disk_get(key)
+        with self._lock:
+            if value is None:
+                self._misses += 1
+                return None
+            self._disk_hits += 1
+            if self.memory:
+                self._store(key, value, now)
+        return value
+
+    def put(self, key: str, value: Any):
+        """Store *value* under *key*, evicting the least recently used entries."""
+        if not self.enabled:
+            return
+        if self.memory:
+            with self._lock:
+                self._store(key, value, time.monotonic())
+        self._disk_put(key, value)
+        self._prune_disk()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._hits + self._disk_hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "disk": str(self.disk_dir) if self.disk_dir else None,
+                "hits": self._hits,
+                "disk_hits": self._disk_hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "hit_rate": round((self._hits + self._disk_hits) / lookups, 4) if lookups else 0.0,
+            }
+
+    # ── Internals ─────────────────────────────────────────────
+
+    def _store(self, key: str, value: Any, stored_at: float):
+        """Insert under the lock held by the caller."""
+        self._entries[key] = (stored_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._evictions += 1
+
+    def _disk_path(self, key: str) -> Path:
+        # Keys may come from clients (live session ids): never a path as is.
+        name = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return self.disk_dir / f"{name}{self.codec.suffix}"
+
+    def _disk_get(self, key: str) -> Any | None:
+        if self.disk_dir is None:
+            return None
+        path = self._disk_path(key)
+        try:
+            if time.time() - path.stat().st_mtime > self.ttl_seconds:
+                path.unlink(missing_ok=True)
+                return None
+            return self.codec.decode(path.read_bytes())
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError):
+            logger.warning("Discarding unreadable cache entry %s", path, exc_info=True)
+            path.unlink(missing_ok=True)
+            return None
+
+    def _disk_put(self, key: str, value: Any):
+        if self.disk_dir is None:
+            return
+        # Write-then-rename so concurrent readers never see a partial file.
+        tmp = None
+        try:
+            data = self.codec.encode(value)
+            fd, tmp = tempfile.mkstemp(dir=self.disk_dir, suffix=TMP_SUFFIX)
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, self._disk_path(key))
+        except OSError:
+            logger.warning("Could not write cache entry %s", key, exc_info=True)
+            if tmp is not None:
+                try:
+                    os.unlink(tmp)
+                except OSError:
+                    pass
+
+    def _prune_disk(self):
+        """
+        Delete expired disk entries, at most once per sweep interval.
+
+        Temporary files as old as an expired entry are left over from a
+        process that died mid-write and go too.
+        """
+        if self.disk_dir is None:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if now < self._next_prune:
+                return
+            self._next_prune = now + min(DISK_PRUNE_INTERVAL, self.ttl_seconds)
+        cutoff = time.time() - self.ttl_seconds
+        try:
+            for suffix in (self.codec.suffix, TMP_SUFFIX):
+                for path in self.disk_dir.glob(f"*{suffix}"):
+                    try:
+                        if path.stat().st_mtime < cutoff:
+                            path.unlink(missing_ok=True)
+                    except FileNotFoundError:
+                        pass
+        except OSError:
+            logger.warning("Could not prune %s", self.disk_dir, exc_info=True)
@@ -0,0 +1,155 @@
+"""
+Runtime configuration for the ToneSense API.
+
+All settings are read once from environment variables at import time so the
+same image can be tuned per deployment without code changes.
+"""
+
+import os
+
+
+def _env_int(name: str, default: int) -> int:
+    """Read a positive integer from the environment, falling back to *default*."""
+    value = os.environ.get(name)
+    if value is None or value.strip() == "":
+        return default
+    try:
+        parsed = int(value)
+    except ValueError:
+        raise ValueError(f"{name} must be an integer, got {value!r}")
+    if parsed < 0:
+        raise ValueError(f"{name} must be >= 0, got {parsed}")
+    return parsed
+
+
+def _env_float(name: str, default: float) -> float:
+    """Read a non-negative float from the environment, falling back to *default*."""
+    value = os.environ.get(name)
+    if value is None or value.strip() == "":
+        return default
+    try:
+        parsed = float(value)
+    except ValueError:
+        raise ValueError(f"{name} must be a number, got {value!r}")
+    if parsed < 0:
+        raise ValueError(f"{name} must be >= 0, got {parsed}")
+    return parsed
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    """Read a boolean flag ("1"/"0", "true"/"false", "yes"/"no")."""
+    value = os.environ.get(name)
+    if value is None or value.strip() == "":
+        return default
+    value = value.strip().lower()
+    if value in ("1", "true", "yes", "on"):
+        return True
+    if value in ("0", "false", "no", "off"):
+        return False
+    raise ValueError(f"{name} must be a boolean, got {value!r}")
+
+
+def _env_choice(name: str, default: str, choices: tuple[str, ...]) -> str:
+    """Read a string setting that must be one of *choices*."""
+    value = os.environ.get(name, default).strip().lower()
+    if value not in choices:
+        raise ValueError(f"{name} must be one of {', '.join(choices)}, got {value!r}")
+    return value
+
+
+def usable_cpus() -> list[int]:
+    """CPUs this process may run on (respects affinity masks and cpusets)."""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+# In a container limited with cpusets, os.cpu_count() reports the host's CPUs.
+CPU_COUNT = len(usable_cpus())
+
+# ── Image limits ──────────────────────────────────────────────
+MAX_UPLOAD_BYTES = _env_int("TONESENSE_MAX_UPLOAD_BYTES", 10 * 1024 * 1024)
+MAX_IMAGE_DIM = _env_int("TONESENSE_MAX_IMAGE_DIM", 1280)
+
+# ── Colour extraction ─────────────────────────────────────────
+# Overall skin colour: "mean" of brightness-filtered pixels, or the
+# "dominant" LAB cluster, which is robust to large shadows and makeup.
+COLOR_MODE = _env_choice("TONESENSE_COLOR_MODE", "mean", ("mean", "dominant"))
+
+# ── Analysis executor ─────────────────────────────────────────
+# "thread" shares the API process; "process" isolates each worker (and its
+# MediaPipe landmarker) in a separate interpreter so CPU work scales past the GIL.
+EXECUTOR_MODE = _env_choice("TONESENSE_EXECUTOR", "thread", ("thread", "process"))
+EXECUTOR_WORKERS = max(1, _env_int("TONESENSE_WORKERS", CPU_COUNT))
+# Requests allowed to wait for a free worker before we answer 503.
+EXECUTOR_QUEUE_SIZE = _env_int("TONESENSE_QUEUE_SIZE", 2 * EXECUTOR_WORKERS)
+# Landmarkers shared by thread workers; more than EXECUTOR_WORKERS is wasted.
+DETECTOR_POOL_SIZE = max(1, _env_int("TONESENSE_DETECTOR_POOL_SIZE", EXECUTOR_WORKERS))
+RETRY_AFTER_SECONDS = max(1, _env_int("TONESENSE_RETRY_AFTER", 2))
+# OpenCV threads per analysis process; 0 = the executor's default (the CPUs
+# divided among process workers; OpenCV's own default in thread mode).
+# serve.py sets it to each API process's share of the CPUs.
+CV_THREADS = _env_int("TONESENSE_CV_THREADS", 0)
+# Shared memory that carries uploads to process workers instead of pickling
+# them through a pipe; 0 disables.  Uploads that do not fit are pickled.
+SHARED_RING_MB = _env_int("TONESENSE_SHARED_RING_MB", 64)
+# Run a synthetic face through every worker at startup; /api/ready answers
+# 503 until that has finished.  Disable for faster restarts in development.
+WARMUP_ENABLED = _env_bool("TONESENSE_WARMUP", True)
+
+# ── Result cache ──────────────────────────────────────────────
+# Keyed by a hash of the decoded image; 0 entries disables the cache.
+CACHE_MAX_ENTRIES = _env_int("TONESENSE_CACHE_SIZE", 256)
+CACHE_TTL_SECONDS = _env_int("TONESENSE_CACHE_TTL", 3600)
+# Optional directory for a persistent store shared by all workers.
+CACHE_DIR = os.environ.get("TONESENSE_CACHE_DIR") or None
+
+# ── Annotated preview ─────────────────────────────────────────
+# Default delivery when a request does not ask for one: none | inline | url.
+PREVIEW_DEFAULT_MODE = _env_choice("TONESENSE_PREVIEW_MODE", "inline", ("none", "inline", "url"))
+# Previews awaiting their first GET in "url" mode.
+PREVIEW_STORE_SIZE = _env_int("TONESENSE_PREVIEW_STORE_SIZE", 64)
+PREVIEW_TTL_SECONDS = _env_int("TONESENSE_PREVIEW_TTL", 600)
+# Encode only the face area, at most this many pixels on the long side.
+PREVIEW_CROP = _env_bool("TONESENSE_PREVIEW_CROP", True)
+PREVIEW_MAX_DIM = _env_int("TONESENSE_PREVIEW_MAX_DIM", 640)
+PREVIEW_JPEG_QUALITY = min(100, _env_int("TONESENSE_PREVIEW_QUALITY", 80))
+
+# ── Batch analysis ────────────────────────────────────────────
+BATCH_MAX_IMAGES = max(1, _env_int("TONESENSE_BATCH_MAX_IMAGES", 100))
+# Bytes one batch may upload, and separately extract from its zip archives.
+BATCH_MAX_BYTES = _env_int("TONESENSE_BATCH_MAX_BYTES", 100 * 1024 * 1024)
+# Images handed to a worker per job.
+BATCH_CHUNK_SIZE = max(1, _env_int("TONESENSE_BATCH_CHUNK_SIZE", 4))
+
+# ── Live analysis (/api/stream and analyze-base64 sessions) ──
+# Each stream connection owns a landmarker and runs outside the executor.
+STREAM_MAX_CONNECTIONS = _env_int("TONESENSE_STREAM_MAX_CONNECTIONS", CPU_COUNT)
+# Frames are analysed at this resolution; live video needs less than stills.
+STREAM_MAX_DIM = _env_int("TONESENSE_STREAM_MAX_DIM", 640)
+# Weight of the newest frame in the running colour estimate (1 = no smoothing).
+LIVE_SMOOTHING = max(0.01, min(1.0, _env_float("TONESENSE_LIVE_SMOOTHING", 0.3)))
+# The estimate counts as converged once its uncertainty is under this ΔE
+# (after at least LIVE_MIN_FRAMES frames); from then on only one frame in
+# LIVE_RECHECK_FRAMES is analysed.
+LIVE_TOLERANCE = _env_float("TONESENSE_LIVE_TOLERANCE", 1.5)
+LIVE_MIN_FRAMES = max(1, _env_int("TONESENSE_LIVE_MIN_FRAMES", 5))
+LIVE_RECHECK_FRAMES = max(1, _env_int("TONESENSE_LIVE_RECHECK_FRAMES", 15))
+# analyze-base64 sessions kept between requests.
+LIVE_SESSION_MAX = _env_int("TONESENSE_LIVE_SESSIONS", 1024)
+LIVE_SESSION_TTL = _env_int("TONESENSE_LIVE_SESSION_TTL", 300)
+
+# ── State shared between API processes ────────────────────────
+# url-mode previews and analyze-base64 / analyze-frame sessions are kept in
+# this directory instead of in memory, so any of several API processes
+# (serve.py --workers N sets one up) can answer the next request.
+SHARED_STATE_DIR = os.environ.get("TONESENSE_SHARED_STATE_DIR") or None
+
+# ── Request profiling ─────────────────────────────────────────
+# Requests carrying "X-ToneSense-Profile: <token>" run under cProfile; unset
+# disables profiling.
+PROFILE_TOKEN = os.environ.get("TONESENSE_PROFILE_TOKEN") or None
+# Where .prof files are written (load with pstats / snakeviz); unset = none.
+PROFILE_DIR = os.environ.get("TONESENSE_PROFILE_DIR") or None
+# Functions listed in the response's profile summary.
+PROFILE_TOP_FUNCTIONS = _env_int("TONESENSE_PROFILE_TOP", 15)
@@ -0,0 +1,320 @@
+"""
+Bounded executor stage for CPU-bound analysis work.
+
+Route handlers hand work to ``AnalysisExecutor.submit`` instead of running
+MediaPipe / OpenCV on the event loop.  The executor admits at most
+``workers + queue_size`` jobs at once; beyond that ``QueueFullError`` is
+raised so the API can answer 503 with ``Retry-After`` instead of letting
+latency grow without bound.  Bulk callers may instead pass ``wait=True`` to
+queue for the next free slot.
+
+In process mode, large ``bytes`` arguments travel through a ``SharedRing``
+instead of being pickled, when one is configured.  A worker process that
+dies (OOM kill, crash in native code) breaks a ``ProcessPoolExecutor`` for
+good, so the pool and its ring are then rebuilt: jobs caught in the crash
+fail with ``WorkerLostError`` and new interactive jobs are turned away the
+same way until the new workers have warmed up.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable
+
+import config
+import worker
+from shared_ring import SharedBytes, SharedRing, call_with_shared
+
+logger = logging.getLogger("tonesense.executor")
+
+
+class QueueFullError(Exception):
+    """Raised when every worker is busy and the wait queue is full."""
+
+
+class WorkerLostError(QueueFullError):
+    """
+    A worker process died, failing the job, or the pool is still restarting.
+
+    Like ``QueueFullError`` this is temporary: the request can be retried.
+    """
+
+
+class AnalysisExecutor:
+    """Thread- or process-backed worker pool with a bounded admission queue."""
+
+    def __init__(
+        self,
+        mode: str = "thread",
+        workers: int = 1,
+        queue_size: int = 0,
+        detector_pool_size: int | None = None,
+        cv_threads: int = 0,
+        shared_ring_bytes: int = 0,
+    ):
+        """
+        Args:
+            cv_threads: OpenCV threads per worker process; 0 divides the
+                usable CPUs among the processes (process mode) or keeps
+                OpenCV's default (thread mode).
+            shared_ring_bytes: Size of the shared-memory ring that carries
+                upload bytes to worker processes; 0 pickles them instead.
+                Ignored in thread mode.
+        """
+        if mode not in ("thread", "process"):
+            raise ValueError(f"Unknown executor mode: {mode!r}")
+        self.mode = mode
+        self.workers = max(1, workers)
+        self.queue_size = max(0, queue_size)
+        # Threads share one detector pool; every process owns exactly one detector.
+        self.detector_pool_size = max(1, detector_pool_size or self.workers)
+        self.cv_threads = max(0, cv_threads)
+        self.shared_ring_bytes = max(0, shared_ring_bytes)
+        self._pool: Executor | None = None
+        self._ring: SharedRing | None = None
+        self._warm = False
+        self._pending = 0
+        self._waiters: deque[asyncio.Future] = deque()
+        # Set while a crashed process pool is being replaced and warmed up.
+        self._recovery: asyncio.Task | None = None
+        self.restarts = 0
+
+    @property
+    def capacity(self) -> int:
+        """Maximum number of jobs running or waiting at the same time."""
+        return self.workers + self.queue_size
+
+    @property
+    def pending(self) -> int:
+        """Jobs currently running or queued."""
+        return self._pending
+
+    @property
+    def recovering(self) -> bool:
+        """Whether a crashed process pool is being replaced."""
+        return self._recovery is not None
+
+    def start(self, warm: bool = False):
+        """
+        Spin up the worker pool and pre-create its landmarkers.
+
+        Args:
+            warm: Have each worker process run ``worker.warm_up`` as it
+                starts.  Thread workers are warmed by ``warm_up`` instead, so
+                that ``start`` itself stays quick.
+        """
+        if self._pool is not None:
+            return
+        self._warm = warm
+        if self.mode == "process":
+            self._start_processes()
+        else:
+            worker.init_worker(self.detector_pool_size, cv_threads=self.cv_threads)
+            self._pool = ThreadPoolExecutor(
+                max_workers=self.workers,
+                thread_name_prefix="tonesense-worker",
+            )
+        logger.info(
+            "Analysis executor started: %s × %d (queue %d)",
+            self.mode, self.workers, self.queue_size,
+        )
+
+    def _start_processes(self):
+        # Otherwise every process would start one OpenCV thread per CPU.
+        cv_threads = self.cv_threads or max(1, len(config.usable_cpus()) // self.workers)
+        # Spawn rather than fork: the API process may already hold threads
+        # (uvicorn, MediaPipe) that must not be duplicated mid-flight.
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=worker.init_worker,
+            initargs=(1, self._warm, cv_threads),
+        )
+        if self.shared_ring_bytes:
+            self._ring = SharedRing(self.shared_ring_bytes)
+
+    def shutdown(self):
+        """Wait for running jobs and release worker resources."""
+        if self._pool is None:
+            return
+        if self._recovery is not None:
+            self._recovery.cancel()
+            self._recovery = None
+        self._pool.shutdown(wait=True, cancel_futures=True)
+        self._pool = None
+        if self._ring is not None:
+            self._ring.close()
+            self._ring = None
+        if self.mode == "thread":
+            worker.close_workers()
+
+    async def warm_up(self) -> list[dict]:
+        """
+        Run ``worker.warm_up`` on the workers and return their reports.
+
+        Thread workers share one detector pool, warmed by a single job.
+        Process workers warm themselves while starting (see ``start``), so
+        rounds of one job per worker are sent until every process has
+        answered; a process that is still starting cannot take a job.
+        """
+        if self.mode == "thread":
+            return [await self.submit(worker.warm_up, wait=True)]
+        reports: dict[int, dict] = {}
+        while True:
+            for report in await asyncio.gather(
+                *(self.submit(worker.warm_up, wait=True) for _ in range(self.workers))
+            ):
+                reports[report["pid"]] = report
+            if len(reports) >= self.workers:
+                return list(reports.values())
+            await asyncio.sleep(0.05)
+
+    async def submit(self, fn: Callable[..., Any], *args: Any, wait: bool = False) -> Any:
+        """
+        Run ``fn(*args)`` on a worker and await its result.
+
+        Args:
+            wait: Wait for a free slot instead of failing when at capacity.
+
+        Raises:
+            QueueFullError: The executor is at capacity and *wait* is False.
+            WorkerLostError: The worker process running the job died, or
+                the pool is restarting after such a crash and *wait* is
+                False.
+        """
+        if self._pool is None:
+            raise RuntimeError("AnalysisExecutor has not been started")
+        if self._recovery is not None and not wait:
+            raise WorkerLostError("Analysis workers are restarting")
+        # Admission control happens on the event loop thread, so a plain
+        # counter is race-free.
+        if self._pending >= self.capacity:
+            if not wait:
+                raise QueueFullError(
+                    f"{self._pending} analyses in progress (capacity {self.capacity})"
+                )
+            await self._wait_for_slot()
+
+        loop = asyncio.get_running_loop()
+        self._pending += 1
+        pool, ring = self._pool, self._ring
+        shared: list[SharedBytes] = []
+        try:
+            if ring is not None:
+                args = tuple(self._share(ring, arg, shared) for arg in args)
+            if shared:
+                future = pool.submit(call_with_shared, fn, *args)
+            else:
+                future = pool.submit(fn, *args)
+        except BrokenProcessPool:
+            self._release(ring, shared)
+            self._replace_pool(pool)
+            raise WorkerLostError("An analysis worker died") from None
+        except BaseException:
+            self._release(ring, shared)
+            raise
+        # Free the slot (and ring space) when the job really finishes, even
+        # if the awaiting request is cancelled first.
+        future.add_done_callback(lambda _: self._release_threadsafe(loop, ring, shared))
+        try:
+            return await asyncio.wrap_future(future)
+        except BrokenProcessPool:
+            self._replace_pool(pool)
+            raise WorkerLostError("An analysis worker died") from None
+
+    def _replace_pool(self, broken: Executor):
+        """Start a new process pool (and ring) in place of *broken*, once."""
+        if broken is not self._pool:
+            return
+        logger.error("An analysis worker process died; restarting the pool")
+        self.restarts += 1
+        broken.shutdown(wait=False, cancel_futures=True)
+        # Jobs still holding blocks of the old ring are dead with the pool.
+        if self._ring is not None:
+            self._ring.close()
+            self._ring = None
+        self._start_processes()
+        self._recovery = asyncio.ensure_future(self._recover())
+
+    async def _recover(self):
+        """Warm the replacement workers, then admit interactive jobs again."""
+        try:
+            await self.warm_up()
+            logger.info("Analysis worker pool restarted")
+        except WorkerLostError:
+            # Died again while warming up; that crash started a new recovery.
+            return
+        except Exception:
+            logger.exception("Warm-up of the restarted worker pool failed")
+        if self._recovery is asyncio.current_task():
+            self._recovery = None
+
+    def _share(self, ring: SharedRing, arg: Any, shared: list[SharedBytes]) -> Any:
+        """Move *arg* (or the items of a list *arg*) into *ring* if worthwhile."""
+        if isinstance(arg, bytes):
+            ref = ring.put(arg)
+            if ref is None:
+                return arg
+            shared.append(ref)
+            return ref
+        if isinstance(arg, list) and arg and isinstance(arg[0], bytes):
+            return [self._share(ring, item, shared) for item in arg]
+        return arg
+
+    async def _wait_for_slot(self):
+        loop = asyncio.get_running_loop()
+        while self._pending >= self.capacity:
+            waiter = loop.create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                elif waiter.done() and not waiter.cancelled():
+                    # We were woken but will not use the slot; pass it on.
+                    self._wake_next()
+                raise
+
+    def _release(self, ring: SharedRing | None, shared: list[SharedBytes]):
+        self._pending -= 1
+        # The ring the job was given, which a pool restart may have replaced.
+        if ring is not None and ring is self._ring:
+            for ref in shared:
+                ring.release(ref)
+        self._wake_next()
+
+    def _wake_next(self):
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                break
+
+    def _release_threadsafe(
+        self, loop: asyncio.AbstractEventLoop, ring: SharedRing | None, shared: list[SharedBytes]
+    ):
+        try:
+            loop.call_soon_threadsafe(self._release, ring, shared)
+        except RuntimeError:
+            # Event loop already closed during shutdown.
+            pass
+
+    def stats(self) -> dict:
+        """Snapshot of executor sizing and load."""
+        return {
+            "mode": self.mode,
+            "workers": self.workers,
+            "queue_size": self.queue_size,
+            "pending": self._pending,
+            "restarts": self.restarts,
+            "recovering": self.recovering,
+            # Process workers keep their pools and caches private; only
+            # thread mode can report them from the API process.
+            "detector_pool": worker.pool_stats() if self.mode == "thread" else None,
+            "result_cache": worker.cache_stats() if self.mode == "thread" else None,
+            "shared_ring": self._ring.stats() if self._ring is not None else None,
+        }
@@ -0,0 +1,61 @@
+"""
+Deferred imports for the API server's cold start.
+
+``mediapipe.tasks`` imports its matplotlib drawing helpers and its microphone
+recorder eagerly although the API never draws or records; pyplot alone used
+to be half of the server's import time.  ``defer`` puts such a module in
+``sys.modules`` before anything imports it: a real module object created
+from the module's real spec, whose code only runs the first time one of its
+attributes is read.
+
+``importlib.util.LazyLoader`` is not enough here: the import system reads
+``__spec__`` of a module it finds in ``sys.modules``, and any attribute read
+makes a LazyLoader module execute, so the ``import`` statement in mediapipe
+would load it straight away.  Module ``__getattr__`` is only consulted for
+attributes the module does not have, and the spec attributes are set.
+
+This changes process-wide import behaviour, so only the server entry point
+calls it, before importing anything that pulls in mediapipe.
+"""
+
+import importlib.util
+import sys
+import threading
+
+
+def defer(name: str) -> bool:
+    """
+    Make a later ``import name`` cheap until the module is actually used.
+
+    Parent packages are imported normally; only *name* itself is deferred.
+
+    Returns:
+        Whether *name* was deferred (False if it is already imported or not
+        installed).
+    """
+    if name in sys.modules:
+        return False
+    try:
+        spec = importlib.util.find_spec(name)
+    except ImportError:
+        return False
+    if spec is None or spec.loader is None:
+        return False
+
+    module = importlib.util.module_from_spec(spec)
+    lock = threading.Lock()
+
+    def load(attr: str):
+        with lock:
+            if module.__dict__.get("__getattr__") is load:
+                del module.__getattr__
+                spec.loader.exec_module(module)
+        return getattr(module, attr)
+
+    module.__getattr__ = load
+    sys.modules[name] = module
+    parent, _, child = name.rpartition(".")
+    if parent:
+        # ``import a.b as c`` reads ``b`` off the parent package.
+        setattr(sys.modules[parent], child, module)
+    return True
@@ -2,45 +2,123 @@
 ToneSense API — FastAPI backend for AI-based facial color analysis.
 """
 
-import io
+import asyncio
 import base64
+import hmac
+import io
+import json
 import logging
+import zipfile
 from contextlib import asynccontextmanager
 from pathlib import Path
+from typing import Callable, Literal, TypeVar
 
-import cv2
-import numpy as np
-from PIL import Image
-from fastapi import FastAPI, File, UploadFile, HTTPException
+from fastapi import FastAPI, HTTPException, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, FileResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 
-from analysis.face_detection import FaceDetector
-from analysis.color_extraction import ColorExtractor
-from analysis.tone_classifier import ToneClassifier
-from analysis.seasonal_palette import SeasonalPaletteClassifier
+import lazy_imports
+
+# Before anything imports mediapipe: its drawing helpers and audio recorder
+# are never used by the API.
+lazy_imports.defer("matplotlib.pyplot")
+lazy_imports.defer("sounddevice")
+
+import config  # noqa: E402
+import metrics  # noqa: E402
+from executor import AnalysisExecutor, QueueFullError, WorkerLostError  # noqa: E402
+from cache import ResultCache  # noqa: E402
+from singleflight import SingleFlight, content_key  # noqa: E402
+from uploads import read_body, read_multipart_files, read_multipart_image, too_large  # noqa: E402
+from worker import (  # noqa: E402
+    AnalysisError, AnalysisOutput, DecodeError, NoFaceError,
+    LIVE_ANALYSIS_CODEC, PREVIEW_SOURCE_CODEC, LiveAnalysis, PreviewSource, StreamTracker,
+    extract_colors, profile_analysis, render_preview, run_analysis, run_batch,
+)
 
 logger = logging.getLogger("tonesense")
 
 STATIC_DIR = Path(__file__).parent / "static"
 
-# ── Shared singleton instances ────────────────────────────────
-face_detector: FaceDetector | None = None
-color_extractor = ColorExtractor()
-tone_classifier = ToneClassifier()
-palette_classifier = SeasonalPaletteClassifier()
+# ── Shared analysis executor ──────────────────────────────────
+executor = AnalysisExecutor(
+    mode=config.EXECUTOR_MODE,
+    workers=config.EXECUTOR_WORKERS,
+    queue_size=config.EXECUTOR_QUEUE_SIZE,
+    detector_pool_size=config.DETECTOR_POOL_SIZE,
+    cv_threads=config.CV_THREADS,
+    shared_ring_bytes=config.SHARED_RING_MB * 1024 * 1024,
+)
+
+# Identical uploads analysed concurrently (double submits, retries) share one job.
+inflight = SingleFlight()
+
+# Previews handed out as links ("url" mode), rendered on first GET.
+preview_store = ResultCache(
+    max_entries=config.PREVIEW_STORE_SIZE,
+    ttl_seconds=config.PREVIEW_TTL_SECONDS,
+    disk_dir=config.SHARED_STATE_DIR and Path(config.SHARED_STATE_DIR) / "previews",
+    codec=PREVIEW_SOURCE_CODEC,
+)
+
+PreviewMode = Literal["none", "inline", "url"]
+T = TypeVar("T")
+
+# Live sessions of /api/analyze-base64 callers, by client-chosen session id.
+# Another API process may have advanced a shared session since we last saw it,
+# so those are always read back from disk.
+live_sessions = ResultCache(
+    max_entries=config.LIVE_SESSION_MAX,
+    ttl_seconds=config.LIVE_SESSION_TTL,
+    disk_dir=config.SHARED_STATE_DIR and Path(config.SHARED_STATE_DIR) / "sessions",
+    codec=LIVE_ANALYSIS_CODEC,
+    memory=False,
+)
+MAX_SESSION_ID_LENGTH = 64
+
+PROFILE_HEADER = "X-ToneSense-Profile"
+
+# Open /api/stream connections; each holds its own landmarker.
+active_streams = 0
+
+# Entries pulled out of uploaded zip archives.
+BATCH_IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp", ".bmp")
+
+
+# Readiness reported by /api/ready: "warming_up" until every worker has run
+# the warm-up image, then "ready" (or "failed").
+readiness = {"status": "warming_up", "warm_up": None}
+
+
+async def _warm_up():
+    try:
+        reports = await executor.warm_up()
+    except Exception:
+        readiness["status"] = "failed"
+        logger.exception("Warm-up failed; /api/ready will keep answering 503")
+        return
+    readiness.update(status="ready", warm_up=reports)
+    logger.info("Ready: %d worker(s) warmed up", len(reports))
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Startup / shutdown lifecycle."""
-    global face_detector
-    logger.info("Initialising MediaPipe Face Mesh …")
-    face_detector = FaceDetector()
+    logger.info("Starting analysis workers (MediaPipe Face Landmarker) …")
+    executor.start(warm=config.WARMUP_ENABLED)
+    # Warm up in the background so the server accepts connections (and
+    # answers /api/health) meanwhile; /api/ready tells when it is done.
+    warm_up = None
+    if config.WARMUP_ENABLED:
+        warm_up = asyncio.create_task(_warm_up())
+    else:
+        readiness["status"] = "ready"
     yield
-    if face_detector:
-        face_detector.close()
+    if warm_up is not None:
+        warm_up.cancel()
+    executor.shutdown()
     logger.info("Shut down cleanly.")
 
 
@@ -60,38 +138,310 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# ── Metrics ───────────────────────────────────────────────────
+app.add_middleware(metrics.MetricsMiddleware)
+
 
 # ── Helpers ───────────────────────────────────────────────────
 
-def _read_image(data: bytes) -> np.ndarray:
-    """Decode raw bytes into a BGR numpy image."""
-    arr = np.frombuffer(data, np.uint8)
-    img = cv2.imdecode(arr, cv2.IMREAD_COLOR)
-    if img is None:
-        raise ValueError("Could not decode image")
-    return img
-
-
-def _create_annotated_preview(image: np.ndarray, face_data: dict) -> str:
-    """Draw detected regions on the image and return a base64 JPEG."""
-    preview = image.copy()
-    colors = {
-        "forehead": (255, 182, 193),
-        "left_cheek": (173, 216, 230),
-        "right_cheek": (173, 216, 230),
-        "jawline": (144, 238, 144),
-        "neck": (255, 218, 185),
-    }
-    for region_name, mask in face_data["regions"].items():
-        color = colors.get(region_name, (200, 200, 200))
-        overlay = preview.copy()
-        overlay[mask > 0] = color
-        cv2.addWeighted(overlay, 0.3, preview, 0.7, 0, preview)
+def _busy() -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail="Server is busy. Please try again shortly.",
+        headers={"Retry-After": str(config.RETRY_AFTER_SECONDS)},
+    )
+
+
+def _outcome(error: Exception) -> str:
+    """Label for ``tonesense_analyses_total``."""
+    if isinstance(error, WorkerLostError):
+        return "worker_lost"
+    if isinstance(error, QueueFullError):
+        return "busy"
+    if isinstance(error, DecodeError):
+        return "decode_error"
+    if isinstance(error, NoFaceError):
+        return "no_face"
+    if isinstance(error, AnalysisError):
+        return "analysis_error"
+    return "failed"
+
+
+def _http_error(error: Exception, decode_error: str, no_face_error: str) -> HTTPException:
+    """Map a worker failure to the HTTP error the client sees."""
+    if isinstance(error, QueueFullError):
+        return _busy()
+    if isinstance(error, DecodeError):
+        return HTTPException(status_code=400, detail=decode_error)
+    if isinstance(error, NoFaceError):
+        return HTTPException(status_code=422, detail=no_face_error)
+    return HTTPException(status_code=422, detail=error.detail)
+
+
+async def _preview_io(fn: Callable[..., T], *args) -> T:
+    """Call a ``preview_store`` method, off the event loop if it goes to disk."""
+    if preview_store.disk_dir is None:
+        return fn(*args)
+    return await run_in_threadpool(fn, *args)
+
+
+def _record_success(output: AnalysisOutput):
+    metrics.ANALYSES.inc(outcome="success")
+    metrics.CACHE_LOOKUPS.inc(result="hit" if output.cache_hit else "miss")
+    metrics.observe_stages(output.timings)
+
+
+def _profile_requested(request: Request) -> bool:
+    """
+    Whether the request asks for profiling via ``X-ToneSense-Profile``.
+
+    Raises:
+        HTTPException: 403 if the header is present but profiling is
+            disabled or the token does not match.
+    """
+    token = request.headers.get(PROFILE_HEADER)
+    if token is None:
+        return False
+    if not config.PROFILE_TOKEN or not hmac.compare_digest(
+        token.encode(), config.PROFILE_TOKEN.encode()
+    ):
+        raise HTTPException(status_code=403, detail="Profiling is not available")
+    return True
+
+
+def _server_timing(timings: dict[str, float]) -> str:
+    return ", ".join(f"{stage};dur={seconds * 1000:.3f}" for stage, seconds in timings.items())
+
+
+async def _analyze(
+    data: bytes,
+    preview: PreviewMode | None,
+    decode_error: str,
+    no_face_error: str,
+    profile: bool = False,
+) -> Response:
+    """
+    Run the analysis on a worker and map failures to HTTP errors.
+
+    Identical uploads in flight at the same time share one worker job.  The
+    job's timings and preview are recorded inside the shared call, so they
+    are kept exactly once even if the caller that started it goes away.
+    Profiled requests always run their own job.
+    """
+    preview = preview or config.PREVIEW_DEFAULT_MODE
+    metrics.UPLOAD_BYTES.observe(len(data))
+
+    async def analyze() -> AnalysisOutput:
+        job = profile_analysis if profile else run_analysis
+        output = await executor.submit(job, data, preview)
+        _record_success(output)
+        if output.preview_source is not None:
+            await _preview_io(preview_store.put, output.key, output.preview_source)
+        return output
+
+    try:
+        if profile:
+            output, shared = await analyze(), False
+        else:
+            output, shared = await inflight.do((await content_key(data), preview), analyze)
+    except (QueueFullError, AnalysisError) as e:
+        metrics.ANALYSES.inc(outcome=_outcome(e))
+        raise _http_error(e, decode_error, no_face_error)
+
+    if shared:
+        metrics.ANALYSES.inc(outcome="success")
+        metrics.COALESCED.inc()
+    headers = {"Server-Timing": _server_timing(output.timings)} if profile else None
+    return Response(content=output.body, media_type="application/json", headers=headers)
+
+
+def _live_session(session_id: str) -> LiveAnalysis:
+    """Look up (or start) the live session for *session_id*."""
+    if not 0 < len(session_id) <= MAX_SESSION_ID_LENGTH:
+        raise HTTPException(status_code=400, detail="Invalid session_id")
+    live = live_sessions.get(session_id)
+    if live is None:
+        live = LiveAnalysis()
+        live_sessions.put(session_id, live)
+    return live
+
+
+def _live_skip(session_id: str, live: LiveAnalysis) -> Response:
+    """Answer a frame of a converged session from its estimate."""
+    live.skip()
+    live_sessions.put(session_id, live)
+    return Response(content=live.response(), media_type="application/json")
+
+
+async def _analyze_live(
+    data: bytes, session_id: str, live: LiveAnalysis, decode_error: str
+) -> Response:
+    """Extract colours on a worker and fold them into a live session."""
+    metrics.UPLOAD_BYTES.observe(len(data))
+    try:
+        color_data, live.window = await executor.submit(extract_colors, data, live.window)
+    except (QueueFullError, AnalysisError) as e:
+        metrics.ANALYSES.inc(outcome=_outcome(e))
+        raise _http_error(e, decode_error, "No face detected in frame.")
+
+    metrics.ANALYSES.inc(outcome="success")
+    live.add(color_data)
+    live_sessions.put(session_id, live)
+    return Response(content=live.response(), media_type="application/json")
+
+
+# ── Batch helpers ─────────────────────────────────────────────
+
+def _too_large_detail() -> str:
+    return f"Image must be under {config.MAX_UPLOAD_BYTES // (1024 * 1024)} MB"
+
+
+def _unzip_images(
+    data: bytes, name: str, limit: int, budget: int
+) -> list[tuple[str, bytes | None, str | None]]:
+    """
+    Read the image entries of a zip archive.
+
+    Args:
+        limit: Most entries to accept.
+        budget: Most bytes to inflate; stops an archive from expanding far
+            beyond its upload size.
+
+    Returns:
+        ``(filename, data, error)`` triples; oversized entries carry an
+        error instead of data so they are reported without being inflated.
+    """
+    try:
+        archive = zipfile.ZipFile(io.BytesIO(data))
+    except zipfile.BadZipFile:
+        raise HTTPException(status_code=400, detail=f"{name} is not a valid zip archive")
+
+    items = []
+    with archive:
+        for info in archive.infolist():
+            filename = info.filename
+            basename = filename.rsplit("/", 1)[-1]
+            if (
+                info.is_dir()
+                or filename.startswith("__MACOSX/")
+                or basename.startswith(".")
+                or not basename.lower().endswith(BATCH_IMAGE_EXTENSIONS)
+            ):
+                continue
+            if len(items) >= limit:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"A batch may contain at most {config.BATCH_MAX_IMAGES} images",
+                )
+            if info.file_size > config.MAX_UPLOAD_BYTES:
+                items.append((filename, None, _too_large_detail()))
+                continue
+            # zipfile never inflates an entry past its declared file_size.
+            if info.file_size > budget:
+                raise too_large(config.BATCH_MAX_BYTES, "Extracted images")
+            budget -= info.file_size
+            items.append((filename, archive.read(info), None))
+    return items
+
+
+async def _collect_batch(
+    files: list[tuple[str, str, bytes]]
+) -> list[tuple[str, bytes | None, str | None]]:
+    """Flatten uploaded images and zip archives into ``(filename, data, error)``."""
+    items = []
+    budget = config.BATCH_MAX_BYTES
+    for filename, content_type, data in files:
+        name = filename or f"file-{len(items)}"
+        if data[:4] == b"PK\x03\x04" or name.lower().endswith(".zip"):
+            limit = config.BATCH_MAX_IMAGES - len(items)
+            extracted = await run_in_threadpool(_unzip_images, data, name, limit, budget)
+            budget -= sum(len(entry) for _, entry, _ in extracted if entry is not None)
+            items.extend(extracted)
+            continue
+        if len(items) >= config.BATCH_MAX_IMAGES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"A batch may contain at most {config.BATCH_MAX_IMAGES} images",
+            )
+        if not content_type.startswith("image/"):
+            items.append((name, None, "Not an image file"))
+        elif len(data) > config.MAX_UPLOAD_BYTES:
+            items.append((name, None, _too_large_detail()))
+        else:
+            items.append((name, data, None))
+    return items
+
+
+def _batch_entry(index: int, filename: str, result: AnalysisOutput | Exception | str) -> bytes:
+    """Serialise one image's outcome; successful bodies are spliced in as-is."""
+    head = b"".join((
+        b'{"index":', str(index).encode(),
+        b',"filename":', json.dumps(filename, ensure_ascii=False).encode("utf-8"),
+    ))
+    if isinstance(result, AnalysisOutput):
+        return b"".join((head, b',"status":200,"response":', result.body, b"}"))
+
+    if isinstance(result, str):
+        status, detail = 400, result
+    elif isinstance(result, DecodeError):
+        status, detail = 400, "Could not decode image"
+    elif isinstance(result, NoFaceError):
+        status, detail = 422, "No face detected."
+    elif isinstance(result, AnalysisError):
+        status, detail = 422, result.detail
+    elif isinstance(result, WorkerLostError):
+        status, detail = 503, "Analysis worker restarted; please retry"
+    else:
+        status, detail = 500, "Analysis failed"
+    tail = json.dumps({"status": status, "error": detail}, ensure_ascii=False)
+    return b"".join((head, b",", tail[1:].encode("utf-8")))
+
+
+async def _run_batch(items: list[tuple[str, bytes | None, str | None]], preview: str):
+    """
+    Analyse *items* in chunks and yield ``(index, result)`` as chunks finish.
 
-    # Encode to base64
-    _, buf = cv2.imencode(".jpg", preview, [cv2.IMWRITE_JPEG_QUALITY, 85])
-    b64 = base64.b64encode(buf.tobytes()).decode("utf-8")
-    return f"data:image/jpeg;base64,{b64}"
+    At most ``executor.workers`` chunks are in flight, so a large batch
+    keeps the admission queue open for interactive requests.  Leaving the
+    generator early cancels chunks that have not started yet.
+    """
+    runnable = []
+    for index, (_, data, error) in enumerate(items):
+        if error is not None:
+            yield index, error
+        else:
+            metrics.UPLOAD_BYTES.observe(len(data))
+            runnable.append((index, data))
+
+    size = config.BATCH_CHUNK_SIZE
+    chunks = [runnable[i:i + size] for i in range(0, len(runnable), size)]
+    slots = asyncio.Semaphore(executor.workers)
+
+    async def run_chunk(chunk):
+        async with slots:
+            try:
+                results = await executor.submit(
+                    run_batch, [data for _, data in chunk], preview, wait=True
+                )
+            except Exception as e:
+                logger.exception("Batch chunk failed")
+                results = [e] * len(chunk)
+        return [(index, result) for (index, _), result in zip(chunk, results)]
+
+    tasks = [asyncio.create_task(run_chunk(chunk)) for chunk in chunks]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            for index, result in await next_done:
+                if isinstance(result, AnalysisOutput):
+                    _record_success(result)
+                    if result.preview_source is not None:
+                        await _preview_io(preview_store.put, result.key, result.preview_source)
+                elif isinstance(result, Exception):
+                    metrics.ANALYSES.inc(outcome=_outcome(result))
+                yield index, result
+    finally:
+        for task in tasks:
+            task.cancel()
 
 
 # ── Routes ────────────────────────────────────────────────────
@@ -101,86 +451,130 @@ async def health_check():
     return {"status": "ok", "service": "ToneSense API"}
 
 
-@app.post("/api/analyze")
-async def analyze_image(file: UploadFile = File(...)):
+@app.get("/api/ready")
+async def ready_check():
+    """
+    Readiness probe: 200 once the workers are warmed up, 503 before.
+
+    Also 503 while a crashed worker process pool is being restarted.
+    """
+    status = "restarting" if executor.recovering else readiness["status"]
+    if status != "ready":
+        return JSONResponse(
+            {"status": status},
+            status_code=503,
+            headers={"Retry-After": str(config.RETRY_AFTER_SECONDS)},
+        )
+    return readiness
+
+
+@app.get("/api/stats")
+async def stats():
+    """Executor load, detector pool and cache figures."""
+    return {
+        "executor": executor.stats(),
+        "coalescing": inflight.stats(),
+        "preview_store": preview_store.stats(),
+        "live_sessions": live_sessions.stats(),
+        "active_streams": active_streams,
+    }
+
+
+# The body is parsed by read_multipart_image, so describe it for the docs.
+_UPLOAD_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "properties": {"file": {"type": "string", "format": "binary"}},
+                    "required": ["file"],
+                },
+            },
+        },
+    },
+}
+
+_BATCH_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "properties": {
+                        "files": {"type": "array", "items": {"type": "string", "format": "binary"}},
+                    },
+                    "required": ["files"],
+                },
+            },
+        },
+    },
+}
+
+
+@app.get("/api/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Prometheus text-format metrics: request counts, stage latencies, load."""
+    metrics.EXECUTOR_PENDING.set(executor.pending)
+    metrics.EXECUTOR_CAPACITY.set(executor.capacity)
+    metrics.ACTIVE_STREAMS.set(active_streams)
+    return Response(content=metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
+
+
+@app.post("/api/analyze", openapi_extra=_UPLOAD_BODY)
+async def analyze_image(request: Request, preview: PreviewMode | None = None):
     """
     Analyze an uploaded face image.
 
     Accepts JPEG / PNG.  Returns full analysis with seasonal palette,
     undertone, contrast, depth, and style recommendations.
-    """
-    if not file.content_type or not file.content_type.startswith("image/"):
-        raise HTTPException(status_code=400, detail="Please upload a valid image file")
 
-    data = await file.read()
-    if len(data) > 10 * 1024 * 1024:
-        raise HTTPException(status_code=400, detail="Image must be under 10 MB")
+    ``preview`` selects how the annotated preview is returned: ``none``,
+    ``inline`` (base64 data URI) or ``url`` (rendered on first GET).
 
-    try:
-        image = _read_image(data)
-    except ValueError:
-        raise HTTPException(status_code=400, detail="Could not decode image")
-
-    # Limit resolution for performance
-    max_dim = 1280
-    h, w = image.shape[:2]
-    if max(h, w) > max_dim:
-        scale = max_dim / max(h, w)
-        image = cv2.resize(image, (int(w * scale), int(h * scale)))
-
-    # 1. Face detection
-    face_data = face_detector.detect(image)
-    if face_data is None:
-        raise HTTPException(
-            status_code=422,
-            detail="No face detected. Please upload a clear, well-lit photo with your face visible.",
-        )
+    The upload is parsed as it streams in: non-image files are rejected
+    after their first bytes and oversized ones with 413 once they pass the
+    limit, without buffering the rest.
 
-    # 2. Color extraction
-    color_data = color_extractor.extract(
-        image, face_data["regions"], face_data["face_mask"]
-    )
-    if "error" in color_data:
-        raise HTTPException(status_code=422, detail=color_data["error"])
-
-    # 3. Tone classification
-    tone_data = tone_classifier.classify(color_data)
-
-    # 4. Seasonal palette
-    palette_result = palette_classifier.classify(tone_data, color_data)
-
-    # 5. Annotated preview
-    preview_b64 = _create_annotated_preview(image, face_data)
-
-    return JSONResponse(
-        content={
-            "success": True,
-            "analysis": {
-                "skin_color": color_data["overall"],
-                "regions": color_data["regions"],
-                "undertone": tone_data["undertone"],
-                "depth": tone_data["depth"],
-                "contrast": tone_data["contrast"],
-                "season": palette_result["season"],
-                "season_description": palette_result["description"],
-                "best_colors": palette_result["best_colors"],
-                "worst_colors": palette_result["worst_colors"],
-                "clothing_suggestions": palette_result["clothing_suggestions"],
-                "jewelry_tone": palette_result["jewelry_tone"],
-                "hair_color_suggestions": palette_result["hair_color_suggestions"],
-                "makeup_palette": palette_result["makeup_palette"],
-            },
-            "preview": preview_b64,
-        }
+    With ``X-ToneSense-Profile: <TONESENSE_PROFILE_TOKEN>`` the analysis
+    runs uncached under cProfile and the response gains a ``profile``
+    object and a ``Server-Timing`` header.
+    """
+    profile = _profile_requested(request)
+    _, data = await read_multipart_image(request, config.MAX_UPLOAD_BYTES)
+
+    return await _analyze(
+        data,
+        preview,
+        decode_error="Could not decode image",
+        no_face_error="No face detected. Please upload a clear, well-lit photo with your face visible.",
+        profile=profile,
     )
 
 
 @app.post("/api/analyze-base64")
-async def analyze_base64(body: dict):
+async def analyze_base64(request: Request, body: dict, preview: PreviewMode | None = None):
     """
     Analyze a base64-encoded image (for live camera frames).
-    Body: { "image": "data:image/jpeg;base64,..." }
+    Body: { "image": "data:image/jpeg;base64,...", "session_id": "..." }
+
+    With a ``session_id``, frames are folded into a running estimate and
+    the response carries a ``session`` object (``converged``,
+    ``confidence``).  Once converged, most frames are answered from the
+    estimate without being analysed, and clients may stop sending.
+    Session responses never include a preview.
     """
+    session_id = body.get("session_id")
+    live = None
+    if session_id is not None:
+        if not isinstance(session_id, str):
+            raise HTTPException(status_code=400, detail="Invalid session_id")
+        live = _live_session(session_id)
+        if not live.needs_frame():
+            return _live_skip(session_id, live)
+
     image_data = body.get("image", "")
     if not image_data:
         raise HTTPException(status_code=400, detail="No image data provided")
@@ -191,51 +585,195 @@ async def analyze_base64(body: dict):
 
     try:
         raw = base64.b64decode(image_data)
-        image = _read_image(raw)
     except Exception:
         raise HTTPException(status_code=400, detail="Invalid base64 image data")
 
-    # Limit resolution
-    max_dim = 1280
-    h, w = image.shape[:2]
-    if max(h, w) > max_dim:
-        scale = max_dim / max(h, w)
-        image = cv2.resize(image, (int(w * scale), int(h * scale)))
+    if live is not None:
+        return await _analyze_live(raw, session_id, live, "Invalid base64 image data")
 
-    face_data = face_detector.detect(image)
-    if face_data is None:
-        raise HTTPException(status_code=422, detail="No face detected in frame.")
+    return await _analyze(
+        raw,
+        preview,
+        decode_error="Invalid base64 image data",
+        no_face_error="No face detected in frame.",
+        profile=_profile_requested(request),
+    )
+
+
+@app.post("/api/analyze-frame")
+async def analyze_frame(
+    request: Request,
+    preview: PreviewMode | None = None,
+    session_id: str | None = None,
+):
+    """
+    Analyze a raw image body (``image/*`` or ``application/octet-stream``).
 
-    color_data = color_extractor.extract(
-        image, face_data["regions"], face_data["face_mask"]
+    The binary counterpart of ``/api/analyze-base64`` for camera frames:
+    the body goes to the decoder as-is, without JSON parsing or base64
+    decoding, and is rejected with 413 as soon as it exceeds the upload
+    limit.  ``session_id`` works as in ``/api/analyze-base64``.
+    """
+    content_type = request.headers.get("content-type", "").split(";", 1)[0].strip().lower()
+    if content_type != "application/octet-stream" and not content_type.startswith("image/"):
+        raise HTTPException(
+            status_code=415,
+            detail="Send the frame as image/* or application/octet-stream",
+        )
+
+    live = None
+    if session_id is not None:
+        live = _live_session(session_id)
+        if not live.needs_frame():
+            return _live_skip(session_id, live)
+
+    data = await read_body(request, config.MAX_UPLOAD_BYTES)
+    if not data:
+        raise HTTPException(status_code=400, detail="No image data provided")
+
+    if live is not None:
+        return await _analyze_live(data, session_id, live, "Could not decode image")
+
+    return await _analyze(
+        data,
+        preview,
+        decode_error="Could not decode image",
+        no_face_error="No face detected in frame.",
+        profile=_profile_requested(request),
     )
-    if "error" in color_data:
-        raise HTTPException(status_code=422, detail=color_data["error"])
-
-    tone_data = tone_classifier.classify(color_data)
-    palette_result = palette_classifier.classify(tone_data, color_data)
-    preview_b64 = _create_annotated_preview(image, face_data)
-
-    return JSONResponse(
-        content={
-            "success": True,
-            "analysis": {
-                "skin_color": color_data["overall"],
-                "regions": color_data["regions"],
-                "undertone": tone_data["undertone"],
-                "depth": tone_data["depth"],
-                "contrast": tone_data["contrast"],
-                "season": palette_result["season"],
-                "season_description": palette_result["description"],
-                "best_colors": palette_result["best_colors"],
-                "worst_colors": palette_result["worst_colors"],
-                "clothing_suggestions": palette_result["clothing_suggestions"],
-                "jewelry_tone": palette_result["jewelry_tone"],
-                "hair_color_suggestions": palette_result["hair_color_suggestions"],
-                "makeup_palette": palette_result["makeup_palette"],
-            },
-            "preview": preview_b64,
-        }
+
+
+@app.post("/api/analyze-batch", openapi_extra=_BATCH_BODY)
+async def analyze_batch(request: Request, preview: PreviewMode = "none", stream: bool = False):
+    """
+    Analyze many images in one request.
+
+    ``files`` may mix individual images and zip archives of images.  Every
+    image gets its own entry with ``index``, ``filename``, ``status`` and
+    either the single-image ``response`` or an ``error``, so one bad photo
+    does not fail the batch.
+
+    With ``stream=true`` the entries are sent as NDJSON in completion order;
+    otherwise one JSON document lists them in upload order.
+
+    The upload is streamed in and rejected with 413 once it passes
+    ``TONESENSE_BATCH_MAX_BYTES``; images extracted from archives share a
+    second budget of the same size.
+    """
+    files = await read_multipart_files(request, config.BATCH_MAX_BYTES)
+    items = await _collect_batch(files)
+    if not items:
+        raise HTTPException(status_code=400, detail="No images found in upload")
+
+    if stream:
+        async def ndjson():
+            async for index, result in _run_batch(items, preview):
+                yield _batch_entry(index, items[index][0], result) + b"\n"
+
+        return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+    entries: list[bytes] = [b""] * len(items)
+    succeeded = 0
+    async for index, result in _run_batch(items, preview):
+        entries[index] = _batch_entry(index, items[index][0], result)
+        succeeded += isinstance(result, AnalysisOutput)
+
+    body = b"".join((
+        b'{"success":true,"count":', str(len(items)).encode(),
+        b',"succeeded":', str(succeeded).encode(),
+        b',"results":[', b",".join(entries), b"]}",
+    ))
+    return Response(content=body, media_type="application/json")
+
+
+@app.websocket("/api/stream")
+async def stream(websocket: WebSocket):
+    """
+    Live camera analysis over a WebSocket.
+
+    The client sends binary JPEG / PNG frames; the server answers each
+    analysed frame with a JSON text message of type ``result`` (smoothed
+    analysis plus ``session`` convergence status), ``no_face`` or ``error``.  Frames that arrive while one is
+    being analysed replace each other, so only the newest is processed and
+    a slow connection never builds a backlog.
+    """
+    global active_streams
+    if active_streams >= config.STREAM_MAX_CONNECTIONS:
+        # 1013 = "try again later"
+        await websocket.close(code=1013)
+        return
+    active_streams += 1
+    try:
+        await websocket.accept()
+        tracker = await asyncio.to_thread(StreamTracker)
+        try:
+            await _serve_stream(websocket, tracker)
+        finally:
+            await asyncio.to_thread(tracker.close)
+    finally:
+        active_streams -= 1
+
+
+async def _serve_stream(websocket: WebSocket, tracker: StreamTracker):
+    latest: bytes | None = None
+    arrived = asyncio.Event()
+
+    async def receive_frames():
+        nonlocal latest
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return
+            frame = message.get("bytes")
+            if not frame or len(frame) > config.MAX_UPLOAD_BYTES:
+                continue
+            if latest is not None:
+                tracker.dropped += 1
+            latest = frame
+            arrived.set()
+
+    receiver = asyncio.create_task(receive_frames())
+    try:
+        while True:
+            waiter = asyncio.create_task(arrived.wait())
+            await asyncio.wait({receiver, waiter}, return_when=asyncio.FIRST_COMPLETED)
+            waiter.cancel()
+            if receiver.done():
+                return
+            if latest is None:
+                continue
+            frame, latest = latest, None
+            arrived.clear()
+            message = await asyncio.to_thread(tracker.process, frame)
+            await websocket.send_text(message.decode("utf-8"))
+    except WebSocketDisconnect:
+        pass
+    finally:
+        receiver.cancel()
+
+
+@app.get("/api/preview/{key}")
+async def get_preview(key: str):
+    """Annotated preview for a result analysed with ``preview=url``."""
+    source = await _preview_io(preview_store.get, key)
+    if source is None:
+        raise HTTPException(status_code=404, detail="Preview not found or expired")
+
+    jpeg = source.jpeg
+    if jpeg is None:
+        try:
+            jpeg = await executor.submit(render_preview, source)
+        except QueueFullError:
+            raise _busy()
+        # Keep only the encoded JPEG once rendered (for every API process).
+        # A new entry, not an update: a concurrent request may be rendering
+        # the cached one right now.
+        await _preview_io(preview_store.put, key, PreviewSource(None, source.regions, jpeg))
+
+    return Response(
+        content=jpeg,
+        media_type="image/jpeg",
+        headers={"Cache-Control": f"private, max-age={config.PREVIEW_TTL_SECONDS}"},
     )
 
 
@@ -0,0 +1,272 @@
+"""
+In-process metrics in the Prometheus text exposition format.
+
+A small subset of ``prometheus_client`` (labelled counters, gauges and
+fixed-bucket histograms) so the service needs no extra dependency.  Updates
+take one short per-metric lock; rendering happens only when ``/api/metrics``
+is scraped.
+
+The metrics live in the API process.  Process-mode workers time their stages
+themselves and return the timings with each result, which the API process
+then records here.
+"""
+
+import bisect
+import math
+import threading
+import time
+
+# Seconds; covers cache hits (sub-millisecond) up to overloaded requests.
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Bytes; camera frames are ~50-300 KB, phone photos 2-8 MB.
+SIZE_BUCKETS = (16e3, 64e3, 256e3, 512e3, 1e6, 2e6, 4e6, 8e6, 16e6)
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: dict[tuple, object] = {}
+
+    def _key(self, labels: dict) -> tuple:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _label_text(self, key: tuple, extra: tuple = ()) -> str:
+        pairs = list(zip(self.labelnames, key)) + list(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+    def render(self) -> list[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._render_sample(key, value))
+        return lines
+
+    def _render_sample(self, key: tuple, value) -> list[str]:
+        return [f"{self.name}{self._label_text(key)} {_format_value(value)}"]
+
+
+class Counter(_Metric):
+    """Monotonically increasing count."""
+
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(_Metric):
+    """Value that can go up and down."""
+
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    """Distribution over fixed upper-bound buckets, plus sum and count."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket counts (last one is +Inf), sum, count.
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def _render_sample(self, key: tuple, value) -> list[str]:
+        counts, total, count = value
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+            cumulative += bucket_count
+            labels = self._label_text(key, (("le", _format_value(bound)),))
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = self._label_text(key)
+        lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+        lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Registry:
+    """Ordered collection of metrics rendered together."""
+
+    def __init__(self):
+        self._metrics: list[_Metric] = []
+
+    def counter(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def _register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+REGISTRY = Registry()
+
+HTTP_REQUESTS = REGISTRY.counter(
+    "tonesense_http_requests_total",
+    "API requests by route, method and status code.",
+    ("route", "method", "status"),
+)
+HTTP_LATENCY = REGISTRY.histogram(
+    "tonesense_http_request_duration_seconds",
+    "API request latency by route, until the response is fully sent.",
+    ("route",),
+)
+HTTP_IN_FLIGHT = REGISTRY.gauge(
+    "tonesense_http_requests_in_flight",
+    "API requests currently being handled.",
+)
+ANALYSES = REGISTRY.counter(
+    "tonesense_analyses_total",
+    "Analysis outcomes: success, decode_error, no_face, analysis_error, busy.",
+    ("outcome",),
+)
+CACHE_LOOKUPS = REGISTRY.counter(
+    "tonesense_result_cache_lookups_total",
+    "Result cache lookups made by analyses, by result (hit / miss).",
+    ("result",),
+)
+COALESCED = REGISTRY.counter(
+    "tonesense_coalesced_requests_total",
+    "Analysis requests answered from an identical request already in flight.",
+)
+STAGE_LATENCY = REGISTRY.histogram(
+    "tonesense_stage_duration_seconds",
+    "Time spent in each analysis stage on the worker.",
+    ("stage",),
+)
+UPLOAD_BYTES = REGISTRY.histogram(
+    "tonesense_upload_bytes",
+    "Size of the encoded images submitted for analysis.",
+    buckets=SIZE_BUCKETS,
+)
+EXECUTOR_PENDING = REGISTRY.gauge(
+    "tonesense_executor_pending",
+    "Analyses running or queued on the executor.",
+)
+EXECUTOR_CAPACITY = REGISTRY.gauge(
+    "tonesense_executor_capacity",
+    "Maximum analyses running or queued before requests get 503.",
+)
+ACTIVE_STREAMS = REGISTRY.gauge(
+    "tonesense_active_streams",
+    "Open /api/stream WebSocket connections.",
+)
+
+
+def observe_stages(timings: dict[str, float]):
+    """Record per-stage durations (seconds) returned by a worker."""
+    for stage, seconds in timings.items():
+        STAGE_LATENCY.observe(seconds, stage=stage)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware counting and timing every ``/api`` HTTP request.
+
+    Requests are labelled with the matched route template (``/api/preview/{key}``,
+    not the concrete path) to keep label cardinality bounded.
+    """
+
+    def __init__(self, app, prefix: str = "/api"):
+        self.app = app
+        self.prefix = prefix
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.prefix):
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            route = scope.get("route")
+            route_path = getattr(route, "path", "unmatched")
+            HTTP_REQUESTS.inc(route=route_path, method=scope["method"], status=status)
+            HTTP_LATENCY.observe(time.perf_counter() - start, route=route_path)
@@ -0,0 +1,198 @@
+"""
+Pre-forking launcher: several API processes sharing one listening socket.
+
+``uvicorn --workers N`` spawns fresh interpreters, so every process imports
+MediaPipe, OpenCV and the app on its own.  Here the parent imports the app
+once, binds the socket and then forks, so the children share the imported
+code and data (palette tables included) copy-on-write.  MediaPipe graphs are
+not fork-safe, so each child still creates its own landmarkers.  Those map
+``face_landmarker.task`` read-only, which the parent has already read into
+the page cache, so the model's pages are shared too.
+
+Each child gets an equal share of the CPUs.  Its executor workers and OpenCV
+thread pool are sized to that share, and unless ``--no-pin`` is given the
+child is bound to those CPUs, which also confines the TFLite / XNNPACK
+threads that MediaPipe does not let us size.
+
+With several processes, consecutive requests of one client may land on
+different processes.  ``preview=url`` previews and ``analyze-base64`` /
+``analyze-frame`` sessions are therefore kept in a temporary directory that
+all children share (``TONESENSE_SHARED_STATE_DIR``; removed on exit) rather
+than in each child's memory.  An ``/api/stream`` WebSocket stays on the
+process that accepted it.
+
+    python serve.py [--workers N] [--host 0.0.0.0] [--port 8000] [--no-pin]
+
+Per-process settings (``TONESENSE_WORKERS``, ``TONESENSE_CV_THREADS``) that
+are set explicitly win over the computed shares.
+"""
+
+import argparse
+import gc
+import importlib
+import logging
+import os
+import shutil
+import signal
+import socket
+import sys
+import tempfile
+import time
+
+logger = logging.getLogger("tonesense.serve")
+
+# A child that exits this soon after starting is treated as a startup
+# failure rather than respawned.
+MIN_CHILD_UPTIME_SECONDS = 5.0
+
+
+def cpu_shares(cpus: list[int], processes: int) -> list[list[int]]:
+    """
+    Split *cpus* into *processes* contiguous, near-equal groups.
+
+    With more processes than CPUs, processes share CPUs round-robin.
+    """
+    if processes >= len(cpus):
+        return [[cpus[i % len(cpus)]] for i in range(processes)]
+    size, extra = divmod(len(cpus), processes)
+    shares, start = [], 0
+    for i in range(processes):
+        end = start + size + (1 if i < extra else 0)
+        shares.append(cpus[start:end])
+        start = end
+    return shares
+
+
+def _bind(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _preload_model(path: str):
+    """Pull the model bundle into the page cache the children will map."""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        if hasattr(os, "posix_fadvise"):
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+        else:
+            while os.read(fd, 1 << 20):
+                pass
+    finally:
+        os.close(fd)
+
+
+def _run_child(app, sock: socket.socket, cpus: list[int] | None, log_level: str):
+    """Body of a forked API process; never returns."""
+    import uvicorn
+
+    code = 0
+    try:
+        # Restore default handlers; uvicorn installs its own for a graceful exit.
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        if cpus is not None:
+            os.sched_setaffinity(0, cpus)
+        server = uvicorn.Server(uvicorn.Config(app, log_level=log_level))
+        server.run(sockets=[sock])
+    except BaseException:
+        logger.exception("API process %d failed", os.getpid())
+        code = 1
+    finally:
+        os._exit(code)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, default=0, help="API processes (default: one per usable CPU)")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--pin", action=argparse.BooleanOptionalAction, default=True,
+                        help="bind each process to its share of the CPUs")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+    logging.basicConfig(level=args.log_level.upper(), format="%(levelname)s:     %(message)s")
+
+    import config
+
+    cpus = config.usable_cpus()
+    processes = args.workers or len(cpus)
+    shares = cpu_shares(cpus, processes)
+    # Size each process for its share.  config reads the environment once,
+    # so it is read again below, before the app imports it.
+    per_process = max(1, len(cpus) // processes)
+    os.environ.setdefault("TONESENSE_WORKERS", str(per_process))
+    os.environ.setdefault("TONESENSE_CV_THREADS", str(per_process))
+    shared_dir = None
+    if processes > 1 and not os.environ.get("TONESENSE_SHARED_STATE_DIR"):
+        shared_dir = tempfile.mkdtemp(prefix="tonesense-shared-")
+        os.environ["TONESENSE_SHARED_STATE_DIR"] = shared_dir
+    importlib.reload(config)
+
+    import main as api
+    from analysis.face_detection import MODEL_PATH
+
+    _preload_model(MODEL_PATH)
+    sock = _bind(args.host, args.port)
+    # Keep the preloaded objects out of the collector so it does not touch
+    # (and un-share) their pages in the children.
+    gc.collect()
+    gc.freeze()
+
+    children: dict[int, tuple[int, float]] = {}
+    stopping = False
+
+    def spawn(index: int):
+        pid = os.fork()
+        if pid == 0:
+            _run_child(api.app, sock, shares[index] if args.pin else None, args.log_level)
+        children[pid] = (index, time.monotonic())
+        logger.info(
+            "API process %d started (CPUs %s)",
+            pid, ",".join(map(str, shares[index])) if args.pin else "all",
+        )
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    logger.info("Serving on %s:%d with %d API processes", args.host, args.port, processes)
+    for index in range(processes):
+        spawn(index)
+
+    exit_code = 0
+    while children:
+        pid, status = os.wait()
+        if pid not in children:
+            continue
+        index, started = children.pop(pid)
+        if stopping:
+            continue
+        uptime = time.monotonic() - started
+        logger.warning("API process %d exited (status %d) after %.1fs", pid, status, uptime)
+        if uptime < MIN_CHILD_UPTIME_SECONDS:
+            logger.error("API process failed during startup; shutting down")
+            exit_code = 1
+            stop(signal.SIGTERM, None)
+        else:
+            spawn(index)
+
+    sock.close()
+    if shared_dir is not None:
+        shutil.rmtree(shared_dir, ignore_errors=True)
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Shared-memory ring buffer for handing upload bytes to worker processes.
+
+In process mode every argument of a job is pickled and written through a
+pipe, which for a multi-megabyte phone photo costs more than the detection
+it feeds.  ``SharedRing`` is one ``multiprocessing.shared_memory`` segment,
+owned by the API process, into which each upload is copied once.  The job
+then carries only a ``SharedBytes`` reference; the worker maps the segment
+(once per process) and decodes straight from a view of it.
+
+Space is allocated in order around the ring and returned when the job that
+uses it finishes.  Jobs may finish out of order, so a finished block is only
+reclaimed once every block allocated before it has finished too.  When the
+ring has no room (or the payload is small enough that pickling is cheaper),
+``put`` returns None and the caller sends the bytes as usual.
+
+All ``SharedRing`` methods must be called from one thread (the event loop).
+"""
+
+from collections import deque
+from multiprocessing import shared_memory
+from typing import Any, Callable, NamedTuple
+
+# Below this, pickling through the pipe costs no more than the ring.
+MIN_SHARED_BYTES = 64 * 1024
+
+
+class SharedBytes(NamedTuple):
+    """Picklable reference to bytes stored in a ``SharedRing``."""
+
+    name: str
+    offset: int
+    length: int
+
+
+class SharedRing:
+    """Ring-allocated shared-memory segment for job payloads."""
+
+    def __init__(self, size: int):
+        """
+        Args:
+            size: Segment size in bytes; payloads larger than this are never
+                shared.
+        """
+        self._shm = shared_memory.SharedMemory(create=True, size=size)
+        self.size = size
+        self._head = 0
+        # [offset, length, released] per live block, oldest first.
+        self._blocks: deque[list] = deque()
+        self.shared = 0
+        self.fallbacks = 0
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    def put(self, data: bytes) -> SharedBytes | None:
+        """
+        Copy *data* into the ring.
+
+        Returns:
+            A reference to pass to the worker, or None if *data* is too small
+            to be worth sharing or there is no room; ``release`` the
+            reference once the worker is done with it.
+        """
+        length = len(data)
+        if length < MIN_SHARED_BYTES:
+            return None
+        offset = self._allocate(length)
+        if offset is None:
+            self.fallbacks += 1
+            return None
+        self._shm.buf[offset:offset + length] = data
+        self._blocks.append([offset, length, False])
+        self._head = offset + length
+        self.shared += 1
+        return SharedBytes(self._shm.name, offset, length)
+
+    def release(self, ref: SharedBytes):
+        """Return *ref*'s space; reclaimed once older blocks are released too."""
+        for block in self._blocks:
+            if block[0] == ref.offset:
+                block[2] = True
+                break
+        while self._blocks and self._blocks[0][2]:
+            self._blocks.popleft()
+        if not self._blocks:
+            self._head = 0
+
+    def stats(self) -> dict:
+        return {
+            "size": self.size,
+            "in_use": sum(length for _, length, _ in self._blocks),
+            "shared": self.shared,
+            "fallbacks": self.fallbacks,
+        }
+
+    def close(self):
+        """Destroy the segment; no job may still be using it."""
+        self._blocks.clear()
+        self._shm.close()
+        self._shm.unlink()
+
+    def _allocate(self, length: int) -> int | None:
+        """Offset of a free contiguous run of *length* bytes, or None."""
+        if not self._blocks:
+            return 0 if length <= self.size else None
+        tail = self._blocks[0][0]
+        if self._head > tail:
+            # Free space is [head, size) and, after wrapping, [0, tail).
+            if self._head + length <= self.size:
+                return self._head
+            return 0 if length <= tail else None
+        # Wrapped (or full): free space is [head, tail).
+        return self._head if self._head + length <= tail else None
+
+
+# ── Worker side ───────────────────────────────────────────────
+
+# Segments this worker process has mapped, by name.  Kept open for the life
+# of the process; the API process owns and unlinks them.
+_attached: dict[str, shared_memory.SharedMemory] = {}
+
+
+def _view(ref: SharedBytes) -> memoryview:
+    shm = _attached.get(ref.name)
+    if shm is None:
+        shm = _attached[ref.name] = shared_memory.SharedMemory(name=ref.name)
+    return shm.buf[ref.offset:ref.offset + ref.length]
+
+
+def _resolve(arg: Any) -> Any:
+    if isinstance(arg, SharedBytes):
+        return _view(arg)
+    if isinstance(arg, list):
+        return [_resolve(item) for item in arg]
+    return arg
+
+
+def call_with_shared(fn: Callable[..., Any], *args: Any) -> Any:
+    """
+    Run ``fn(*args)`` in a worker with ``SharedBytes`` arguments (also inside
+    lists) replaced by memoryviews of the ring.
+
+    The views are only valid until the job returns; *fn* must not keep them.
+    """
+    return fn(*(_resolve(arg) for arg in args))
@@ -0,0 +1,79 @@
+"""
+Single-flight coalescing of identical in-flight work.
+
+A double-submit, or a client retrying while its first request is still
+running, would otherwise analyse the same upload twice in parallel.
+``SingleFlight.do`` runs the work for the first caller with a given key
+and lets every caller that arrives with the same key before it finishes
+await that same result (or exception).
+
+The shared work runs in its own task behind ``asyncio.shield``, so a caller
+that disconnects only stops waiting: the others still get the result.
+Entries are dropped as soon as the work finishes, so this never serves a
+stale result and is independent of the result cache.
+
+Must only be used from the event loop thread.
+"""
+
+import asyncio
+import hashlib
+from typing import Awaitable, Callable, Hashable, TypeVar
+
+T = TypeVar("T")
+
+# Bodies at least this large are hashed off the event loop (hashlib
+# releases the GIL); ~1 ms of SHA-256 on typical hardware.
+THREADED_HASH_BYTES = 1024 * 1024
+
+
+async def content_key(data: bytes) -> str:
+    """SHA-256 of *data*, computed off the event loop for large bodies."""
+    if len(data) >= THREADED_HASH_BYTES:
+        return await asyncio.to_thread(lambda: hashlib.sha256(data).hexdigest())
+    return hashlib.sha256(data).hexdigest()
+
+
+class SingleFlight:
+    """At most one in-flight call per key; concurrent callers share it."""
+
+    def __init__(self):
+        self._calls: dict[Hashable, asyncio.Task] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> tuple[T, bool]:
+        """
+        Await ``fn()``, or the call already in flight for *key*.
+
+        Returns:
+            The result, and whether it was shared from another caller's call
+            (so the caller can skip per-computation bookkeeping).
+
+        Raises:
+            Whatever ``fn()`` raised, to every caller sharing it.
+        """
+        task = self._calls.get(key)
+        shared = task is not None
+        if shared:
+            self.coalesced += 1
+        else:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+            self.leaders += 1
+        return await asyncio.shield(task), shared
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": len(self._calls),
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+        }
+
+    def _finish(self, key: Hashable, task: asyncio.Task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Every caller may have gone away; retrieve the outcome so a failure
+        # is not reported as "exception was never retrieved".
+        if not task.cancelled():
+            task.exception()
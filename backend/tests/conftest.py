@@ -0,0 +1,10 @@
+import os
+import sys
+
+# Tests import backend modules the way the server does (``import worker``).
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+# One quiet in-process worker; set before any test imports ``config``.
+os.environ.setdefault("TONESENSE_WORKERS", "1")
+os.environ.setdefault("TONESENSE_WARMUP", "0")
@@ -0,0 +1,19 @@
+import struct
+
+import cv2
+import numpy as np
+
+import worker
+
+with open(worker.WARMUP_IMAGE, "rb") as f:
+    FACE_JPEG = f.read()
+
+
+def oversized_jpeg(width: int = 15000, height: int = 15000) -> bytes:
+    """A tiny valid JPEG whose frame header claims *width* x *height*."""
+    ok, encoded = cv2.imencode(".jpg", np.full((16, 16, 3), 128, np.uint8))
+    data = bytearray(encoded.tobytes())
+    # SOF0: marker, length (2), precision (1), then height and width.
+    sof = data.index(b"\xff\xc0")
+    struct.pack_into(">HH", data, sof + 5, height, width)
+    return bytes(data)
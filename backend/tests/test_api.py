@@ -0,0 +1,158 @@
+import asyncio
+import io
+import json
+import zipfile
+
+import pytest
+from fastapi.testclient import TestClient
+
+import config
+import main
+import worker
+from tests.helpers import FACE_JPEG, oversized_jpeg
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(main.app) as client:
+        yield client
+
+
+def test_oversized_jpeg_header_is_a_decode_error(client):
+    response = client.post(
+        "/api/analyze?preview=none",
+        files={"file": ("huge.jpg", oversized_jpeg(), "image/jpeg")},
+    )
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Could not decode image"
+
+
+def test_non_image_upload_is_rejected(client):
+    response = client.post(
+        "/api/analyze", files={"file": ("notes.txt", b"just some text", "text/plain")}
+    )
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Please upload a valid image file"
+
+
+def test_upload_without_file_field_is_rejected(client):
+    response = client.post(
+        "/api/analyze", files={"photo": ("face.jpg", FACE_JPEG, "image/jpeg")}
+    )
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Missing file field 'file'"
+
+
+BOUNDARY = "tonesense-test-boundary"
+
+
+def _multipart_chunks(data: bytes, chunk_size: int = 64 * 1024):
+    """A multipart body with *data* as field ``file``, yielded in chunks."""
+    yield (
+        f"--{BOUNDARY}\r\n"
+        'Content-Disposition: form-data; name="file"; filename="big.jpg"\r\n'
+        "Content-Type: image/jpeg\r\n\r\n"
+    ).encode()
+    for start in range(0, len(data), chunk_size):
+        yield data[start:start + chunk_size]
+    yield f"\r\n--{BOUNDARY}--\r\n".encode()
+
+
+@pytest.mark.parametrize("declare_length", [True, False])
+def test_upload_over_size_limit_is_rejected(client, monkeypatch, declare_length):
+    monkeypatch.setattr(config, "MAX_UPLOAD_BYTES", 1024 * 1024)
+    data = b"\xff\xd8\xff\xe0" + bytes(2 * 1024 * 1024)
+    body = _multipart_chunks(data)
+    # A generator body is sent chunked, without a Content-Length header.
+    content = b"".join(body) if declare_length else body
+    response = client.post(
+        "/api/analyze",
+        content=content,
+        headers={"Content-Type": f"multipart/form-data; boundary={BOUNDARY}"},
+    )
+    assert response.status_code == 413
+    assert response.json()["detail"] == "Image must be under 1 MB"
+
+
+def _batch(client, *files, **params):
+    return client.post(
+        "/api/analyze-batch",
+        params=params,
+        files=[("files", file) for file in files],
+    )
+
+
+def test_batch_isolates_unexpected_failures(client, monkeypatch):
+    run_analysis = worker.run_analysis
+
+    def flaky(data, preview="inline", use_cache=True):
+        if bytes(data) == b"boom":
+            raise MemoryError("boom")
+        return run_analysis(data, preview, use_cache)
+
+    monkeypatch.setattr(worker, "run_analysis", flaky)
+    response = _batch(
+        client,
+        ("face.jpg", FACE_JPEG, "image/jpeg"),
+        ("boom.jpg", b"boom", "image/jpeg"),
+        ("huge.jpg", oversized_jpeg(), "image/jpeg"),
+    )
+    assert response.status_code == 200
+    statuses = [entry["status"] for entry in response.json()["results"]]
+    assert statuses == [200, 500, 400]
+
+
+def test_batch_upload_over_byte_limit_is_rejected(client, monkeypatch):
+    monkeypatch.setattr(config, "BATCH_MAX_BYTES", 1024 * 1024)
+    response = _batch(client, *[("photo.jpg", bytes(512 * 1024), "image/jpeg")] * 3)
+    assert response.status_code == 413
+    assert response.json()["detail"].startswith("Upload")
+
+
+def test_batch_archive_over_byte_limit_is_rejected(client, monkeypatch):
+    monkeypatch.setattr(config, "BATCH_MAX_BYTES", 1024 * 1024)
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w", zipfile.ZIP_DEFLATED) as zf:
+        for i in range(3):
+            zf.writestr(f"{i}.png", bytes(512 * 1024))
+    response = _batch(client, ("photos.zip", archive.getvalue(), "application/zip"))
+    assert response.status_code == 413
+    assert response.json()["detail"].startswith("Extracted images")
+
+
+def test_follower_gets_preview_when_coalesced_leader_is_cancelled(client):
+    main.preview_store.clear()
+    worker.result_cache.clear()
+
+    async def scenario():
+        leader = asyncio.create_task(main._analyze(FACE_JPEG, "url", "decode", "no face"))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(main._analyze(FACE_JPEG, "url", "decode", "no face"))
+        await asyncio.sleep(0)
+        assert main.inflight.stats()["in_flight"] == 1
+        leader.cancel()
+        return await follower
+
+    response = asyncio.run(scenario())
+    url = json.loads(response.body)["preview"]
+    preview = client.get(url)
+    assert preview.status_code == 200
+    assert preview.headers["content-type"] == "image/jpeg"
+
+
+def test_rendering_a_preview_leaves_the_cached_source_intact(client):
+    response = client.post(
+        "/api/analyze?preview=url",
+        files={"file": ("face.jpg", FACE_JPEG, "image/jpeg")},
+    )
+    url = response.json()["preview"]
+    key = url.rsplit("/", 1)[-1]
+    source = main.preview_store.get(key)
+    assert source.jpeg is None
+
+    assert client.get(url).status_code == 200
+    # A render still running on the old entry needs its image.
+    assert source.image is not None and source.jpeg is None
+    rendered = main.preview_store.get(key)
+    assert rendered is not source
+    assert rendered.image is None and rendered.jpeg is not None
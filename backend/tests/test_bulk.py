@@ -0,0 +1,58 @@
+import json
+
+import pytest
+
+from analysis import bulk
+from tests.helpers import FACE_JPEG
+
+
+class _ExplodingPipeline:
+    def run(self, data):
+        raise MemoryError("out of memory")
+
+
+def test_unexpected_failure_becomes_an_error_row(tmp_path, monkeypatch):
+    path = tmp_path / "face.jpg"
+    path.write_bytes(FACE_JPEG)
+    monkeypatch.setattr(bulk, "_pipeline", _ExplodingPipeline())
+    row = bulk.analyze_path(str(path))
+    assert row["status"] == "error"
+    assert row["detail"] == "MemoryError: out of memory"
+
+
+def test_resume_with_other_settings_is_refused(tmp_path):
+    source = tmp_path / "photos"
+    source.mkdir()
+    (source / "junk.png").write_bytes(b"not an image")
+    output = str(tmp_path / "results.jsonl")
+
+    summary = bulk.run(str(source), output, workers=1, color_mode="mean")
+    assert summary["statuses"] == {"decode_error": 1}
+    with open(output + ".checkpoint", encoding="utf-8") as f:
+        assert json.load(f)["settings"] == {"format": "jsonl", "max_dim": 1280, "color_mode": "mean"}
+
+    with pytest.raises(SystemExit, match="color_mode 'mean' -> 'dominant'"):
+        bulk.run(str(source), output, workers=1, color_mode="dominant")
+    assert bulk.run(str(source), output, workers=1, color_mode="mean")["resumed_from"] == 1
+
+
+def test_resume_without_the_checkpointed_output_is_refused(tmp_path):
+    source = tmp_path / "photos"
+    source.mkdir()
+    (source / "junk.png").write_bytes(b"not an image")
+    output = tmp_path / "results.jsonl"
+    bulk.run(str(source), str(output), workers=1)
+
+    output.unlink()
+    with pytest.raises(SystemExit, match="delete the checkpoint"):
+        bulk.run(str(source), str(output), workers=1)
+
+
+@pytest.mark.parametrize("option", [["--chunk-size", "0"], ["--workers", "-1"]])
+def test_cli_rejects_invalid_sizes(option, tmp_path, monkeypatch, capsys):
+    argv = ["bulk", str(tmp_path), "-o", str(tmp_path / "out.jsonl"), *option]
+    monkeypatch.setattr("sys.argv", argv)
+    with pytest.raises(SystemExit) as exit_info:
+        bulk.main()
+    assert exit_info.value.code == 2
+    assert option[0] in capsys.readouterr().err
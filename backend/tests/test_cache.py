@@ -0,0 +1,142 @@
+import os
+import pickle
+import time
+
+import numpy as np
+import pytest
+
+import worker
+from cache import DiskCodec, ResultCache, pack_arrays, unpack_arrays
+from tests.helpers import FACE_JPEG
+
+
+class _Exploit:
+    def __reduce__(self):
+        return (pytest.fail, ("pickle was loaded from the cache directory",))
+
+
+@pytest.fixture
+def disk_cache(tmp_path, monkeypatch):
+    cache = ResultCache(disk_dir=tmp_path, codec=worker.CACHED_ANALYSIS_CODEC)
+    monkeypatch.setattr(worker, "result_cache", cache)
+    return cache
+
+
+def test_disk_cache_requires_codec(tmp_path):
+    with pytest.raises(ValueError):
+        ResultCache(disk_dir=tmp_path)
+
+
+def test_unpack_arrays_refuses_pickles():
+    with pytest.raises(ValueError):
+        unpack_arrays(pickle.dumps({"a": np.arange(3)}))
+    object_array = pack_arrays({"a": np.array([_Exploit()], dtype=object)})
+    with pytest.raises(ValueError):
+        unpack_arrays(object_array)
+
+
+def test_planted_file_is_discarded(tmp_path):
+    codec = DiskCodec(pack_arrays, unpack_arrays)
+    cache = ResultCache(disk_dir=tmp_path, codec=codec)
+    path = cache._disk_path("key")
+    path.write_bytes(pickle.dumps(_Exploit()))
+    assert cache.get("key") is None
+    assert not path.exists()
+
+
+def test_disk_hit_keeps_inline_preview(disk_cache):
+    first = worker.run_analysis(FACE_JPEG, "inline")
+    disk_cache.clear()
+    second = worker.run_analysis(FACE_JPEG, "inline")
+    assert second.cache_hit
+    assert second.body == first.body
+    assert disk_cache.stats()["disk_hits"] == 1
+
+
+def test_disk_entry_round_trips_regions(disk_cache):
+    first = worker.run_analysis(FACE_JPEG, "none")
+    memory = disk_cache.get(first.key)
+    disk_cache.clear()
+    loaded = disk_cache.get(first.key)
+    assert loaded.analysis_json == memory.analysis_json
+    assert loaded.regions.keys() == memory.regions.keys()
+    for name, region in memory.regions.items():
+        assert (loaded.regions[name].x, loaded.regions[name].y) == (region.x, region.y)
+        assert np.array_equal(loaded.regions[name].mask, region.mask)
+
+
+def test_disk_paths_stay_in_the_directory(tmp_path):
+    cache = ResultCache(disk_dir=tmp_path, codec=worker.LIVE_ANALYSIS_CODEC)
+    assert cache._disk_path("../../etc/passwd").parent == tmp_path
+
+
+def test_without_memory_every_get_reads_the_latest_disk_copy(tmp_path):
+    codec = DiskCodec(pack_arrays, unpack_arrays)
+    mine = ResultCache(disk_dir=tmp_path, codec=codec, memory=False)
+    theirs = ResultCache(disk_dir=tmp_path, codec=codec, memory=False)
+    mine.put("k", {"v": np.array([1])})
+    theirs.put("k", {"v": np.array([2])})
+    assert mine.get("k")["v"].tolist() == [2]
+    assert mine.stats()["entries"] == 0
+
+
+def test_expired_disk_entries_are_pruned(tmp_path):
+    codec = DiskCodec(pack_arrays, unpack_arrays)
+    cache = ResultCache(ttl_seconds=60, disk_dir=tmp_path, codec=codec)
+    cache.put("old", {"v": np.array([1])})
+    old = cache._disk_path("old")
+    os.utime(old, (time.time() - 120, time.time() - 120))
+    cache._next_prune = 0.0
+    cache.put("new", {"v": np.array([2])})
+    assert not old.exists()
+    assert cache._disk_path("new").exists()
+
+
+def test_stale_temp_files_are_pruned(tmp_path):
+    codec = DiskCodec(pack_arrays, unpack_arrays)
+    cache = ResultCache(ttl_seconds=60, disk_dir=tmp_path, codec=codec)
+    stale, fresh = tmp_path / "stale.tmp", tmp_path / "fresh.tmp"
+    stale.write_bytes(b"partial")
+    fresh.write_bytes(b"partial")
+    os.utime(stale, (time.time() - 120, time.time() - 120))
+    cache._next_prune = 0.0
+    cache.put("new", {"v": np.array([2])})
+    assert not stale.exists()
+    assert fresh.exists()
+
+
+def test_failed_write_leaves_no_temp_file(tmp_path, monkeypatch):
+    codec = DiskCodec(pack_arrays, unpack_arrays)
+    cache = ResultCache(disk_dir=tmp_path, codec=codec)
+
+    def fail(src, dst):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(os, "replace", fail)
+    cache.put("key", {"v": np.array([1])})
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_preview_source_round_trips(tmp_path):
+    worker.init_worker()
+    output = worker.run_analysis(FACE_JPEG, "url", use_cache=False)
+    cache = ResultCache(disk_dir=tmp_path, codec=worker.PREVIEW_SOURCE_CODEC)
+    cache.put(output.key, output.preview_source)
+    cache.clear()
+    loaded = cache.get(output.key)
+    assert np.array_equal(loaded.image, output.preview_source.image)
+    assert worker.render_preview(loaded) == worker.render_preview(output.preview_source)
+
+
+def test_live_session_round_trips(tmp_path):
+    live = worker.LiveAnalysis()
+    for _ in range(3):
+        live.add(worker.extract_colors(FACE_JPEG)[0])
+    cache = ResultCache(disk_dir=tmp_path, codec=worker.LIVE_ANALYSIS_CODEC, memory=False)
+    cache.put("session", live)
+    loaded = cache.get("session")
+    assert loaded.response() == live.response()
+    sample = worker.extract_colors(FACE_JPEG)[0]
+    live.add(sample)
+    loaded.add(sample)
+    assert loaded.response() == live.response()
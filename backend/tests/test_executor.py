@@ -0,0 +1,62 @@
+import asyncio
+import os
+import time
+
+import pytest
+
+from executor import AnalysisExecutor, WorkerLostError
+
+
+def _slow_len(data) -> int:
+    time.sleep(0.5)
+    return len(data)
+
+
+def test_dead_worker_process_is_replaced():
+    executor = AnalysisExecutor("process", workers=1, shared_ring_bytes=1 << 20)
+    executor.start()
+
+    async def scenario():
+        first_pid = await executor.submit(os.getpid)
+        with pytest.raises(WorkerLostError):
+            await executor.submit(os._exit, 1)
+        assert executor.recovering
+        # Interactive jobs are turned away until the new worker is warm ...
+        with pytest.raises(WorkerLostError):
+            await executor.submit(os.getpid)
+        # ... while queued ones wait for it.
+        new_pid = await executor.submit(os.getpid, wait=True)
+        while executor.recovering:
+            await asyncio.sleep(0.05)
+        assert await executor.submit(len, b"x" * 200_000) == 200_000
+        return first_pid, new_pid
+
+    try:
+        first_pid, new_pid = asyncio.run(scenario())
+    finally:
+        executor.shutdown()
+    assert new_pid != first_pid
+    assert executor.restarts == 1
+    assert executor.pending == 0
+
+
+def test_ring_space_is_released_when_the_request_is_cancelled():
+    executor = AnalysisExecutor("process", workers=1, shared_ring_bytes=1 << 20)
+    executor.start()
+
+    async def scenario():
+        task = asyncio.create_task(executor.submit(_slow_len, bytes(200_000)))
+        await asyncio.sleep(0.1)
+        assert executor.stats()["shared_ring"]["in_use"] == 200_000
+        task.cancel()
+        # The job itself still runs to the end before its space is freed.
+        while executor.pending:
+            await asyncio.sleep(0.05)
+        return executor.stats()["shared_ring"]
+
+    try:
+        ring = asyncio.run(scenario())
+    finally:
+        executor.shutdown()
+    assert ring["in_use"] == 0
+    assert ring["shared"] == 1
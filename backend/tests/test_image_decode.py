@@ -0,0 +1,37 @@
+import struct
+
+import cv2
+import numpy as np
+import pytest
+
+from analysis.image_decode import PROBE_BYTES, decode_image, probe_image
+from tests.helpers import oversized_jpeg
+
+
+@pytest.mark.parametrize("max_dim", [1280, 0])
+def test_oversized_header_raises_value_error(max_dim):
+    # Past PIL's bomb limit (reduced decode) and OpenCV's pixel limit (full decode).
+    with pytest.raises(ValueError):
+        decode_image(oversized_jpeg(60000, 60000), max_dim)
+
+
+def _with_comments(jpeg: bytes, size: int) -> bytes:
+    """*jpeg* with *size* bytes of COM segments in front of its frame header."""
+    segments = b""
+    while size > 0:
+        chunk = min(size, 60000)
+        segments += b"\xff\xfe" + struct.pack(">H", chunk + 2) + bytes(chunk)
+        size -= chunk
+    return jpeg[:2] + segments + jpeg[2:]
+
+
+def test_probe_reads_a_view():
+    header = probe_image(memoryview(oversized_jpeg(4000, 3000)))
+    assert header == ("JPEG", 4000, 3000)
+
+
+def test_header_past_probe_window_falls_back_to_full_decode():
+    ok, encoded = cv2.imencode(".jpg", np.full((2000, 1000, 3), 128, np.uint8))
+    data = _with_comments(encoded.tobytes(), PROBE_BYTES)
+    assert probe_image(data) is None
+    assert decode_image(data, 500).shape == (500, 250, 3)
@@ -0,0 +1,32 @@
+import subprocess
+import sys
+
+from tests.conftest import BACKEND_DIR
+
+
+def _run(code: str) -> str:
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+    )
+    return result.stdout.strip()
+
+
+def test_analysis_import_leaves_import_system_alone():
+    out = _run(
+        "import importlib.util\n"
+        "from analysis import AnalysisPipeline\n"
+        "print(importlib.util.find_spec('matplotlib').name)\n"
+    )
+    assert out == "matplotlib"
+
+
+def test_server_defers_pyplot_with_a_real_spec():
+    out = _run(
+        "import importlib.util, sys\n"
+        "import main\n"
+        "pyplot = sys.modules['matplotlib.pyplot']\n"
+        "print('figure' in vars(pyplot), importlib.util.find_spec('matplotlib.pyplot').name)\n"
+        "import matplotlib.pyplot as plt\n"
+        "print(plt is pyplot, callable(plt.figure))\n"
+    )
+    assert out.splitlines() == ["False matplotlib.pyplot", "True True"]
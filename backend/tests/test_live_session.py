@@ -0,0 +1,78 @@
+import json
+
+from analysis.live_session import LiveSession
+
+SKIN = [205, 160, 135]
+
+
+def _frame(rgb: list, shift: int = 0) -> dict:
+    """Synthetic ``ColorExtractor.extract`` output for one frame."""
+    noisy = [min(255, max(0, c + shift)) for c in rgb]
+    return {
+        "regions": {
+            "forehead": {"rgb": noisy, "pixel_count": 900},
+            "left_cheek": {"rgb": [c - 10 for c in noisy], "pixel_count": 700},
+        },
+        "overall": {"rgb": noisy},
+    }
+
+
+def _converged_session(**settings) -> LiveSession:
+    session = LiveSession(**settings)
+    for i in range(session.min_frames):
+        session.update(_frame(SKIN, shift=(-1) ** i))
+    assert session.converged
+    return session
+
+
+def test_steady_frames_converge():
+    session = LiveSession(min_frames=5)
+    for i in range(4):
+        session.update(_frame(SKIN, shift=(-1) ** i))
+        assert not session.converged
+        assert session.needs_frame()
+    estimate = session.update(_frame(SKIN, shift=1))
+    assert session.converged
+    assert session.confidence == 1.0
+    assert all(abs(a - b) <= 1 for a, b in zip(estimate["overall"]["rgb"], SKIN))
+    assert estimate["overall"]["hex"].startswith("#")
+    assert estimate["regions"]["left_cheek"]["pixel_count"] == 700
+
+
+def test_noisy_frames_do_not_converge():
+    session = LiveSession(min_frames=3)
+    for i in range(10):
+        session.update(_frame(SKIN, shift=15 * (-1) ** i))
+    assert not session.converged
+    assert session.confidence < 1.0
+
+
+def test_large_jump_resets_a_converged_session():
+    session = _converged_session()
+    estimate = session.update(_frame([90, 60, 45]))
+    assert session.resets == 1
+    assert session.frames == 1
+    assert not session.converged
+    assert estimate["overall"]["rgb"] == [90, 60, 45]
+
+
+def test_converged_session_rechecks_periodically():
+    session = _converged_session(recheck_every=3)
+    assert not session.needs_frame()
+    session.skip()
+    assert not session.needs_frame()
+    session.skip()
+    assert session.needs_frame()
+    session.update(_frame(SKIN))
+    assert not session.needs_frame()
+    assert session.status()["skipped"] == 2
+
+
+def test_state_round_trips_through_json():
+    session = _converged_session()
+    session.skip()
+    restored = LiveSession()
+    restored.restore(json.loads(json.dumps(session.state())))
+    assert restored.status() == session.status()
+    assert restored.estimate() == session.estimate()
+    assert restored.needs_frame() == session.needs_frame()
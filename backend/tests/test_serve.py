@@ -0,0 +1,75 @@
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+import pytest
+
+from tests.conftest import BACKEND_DIR
+from tests.helpers import FACE_JPEG
+
+WORKERS = 2
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture(scope="module")
+def server():
+    port = _free_port()
+    env = dict(os.environ, TONESENSE_WARMUP="0")
+    env.pop("TONESENSE_SHARED_STATE_DIR", None)
+    process = subprocess.Popen(
+        [sys.executable, "serve.py", "--workers", str(WORKERS), "--host", "127.0.0.1",
+         "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env,
+    )
+    base = f"http://127.0.0.1:{port}"
+    try:
+        # The socket is bound before the fork, so this waits for a child.
+        deadline = time.monotonic() + 60
+        while True:
+            assert process.poll() is None and time.monotonic() < deadline, "serve.py did not start"
+            try:
+                if httpx.get(f"{base}/api/health").status_code == 200:
+                    break
+            except httpx.HTTPError:
+                time.sleep(0.2)
+        yield base
+    finally:
+        process.send_signal(signal.SIGTERM)
+        process.wait(timeout=30)
+
+
+def test_url_preview_is_served_by_every_worker(server):
+    response = httpx.post(
+        f"{server}/api/analyze",
+        params={"preview": "url"},
+        files={"file": ("face.jpg", FACE_JPEG, "image/jpeg")},
+    )
+    assert response.status_code == 200
+    url = response.json()["preview"]
+    # Fresh connection each time, so the kernel spreads them over the workers.
+    statuses = [httpx.get(server + url).status_code for _ in range(12)]
+    assert statuses == [200] * 12
+
+
+def test_live_session_continues_on_every_worker(server):
+    frames = []
+    for _ in range(6):
+        response = httpx.post(
+            f"{server}/api/analyze-frame",
+            params={"session_id": "shared-session"},
+            content=FACE_JPEG,
+            headers={"Content-Type": "image/jpeg"},
+        )
+        assert response.status_code == 200
+        session = response.json()["session"]
+        frames.append(session["frames"] + session["skipped"])
+    assert frames == [1, 2, 3, 4, 5, 6]
@@ -0,0 +1,65 @@
+import pytest
+
+import shared_ring
+from shared_ring import MIN_SHARED_BYTES, SharedRing, call_with_shared
+
+BLOCK = MIN_SHARED_BYTES
+
+
+@pytest.fixture
+def ring():
+    ring = SharedRing(4 * BLOCK)
+    yield ring
+    for shm in shared_ring._attached.values():
+        shm.close()
+    shared_ring._attached.clear()
+    ring.close()
+
+
+def test_small_payloads_are_not_shared(ring):
+    assert ring.put(b"x" * (BLOCK - 1)) is None
+    assert ring.stats()["fallbacks"] == 0
+
+
+def test_allocation_wraps_around(ring):
+    first, second, third = (ring.put(bytes(BLOCK)) for _ in range(3))
+    ring.release(first)
+    ring.release(second)
+    # Only one block is left at the end; a double block must wrap to 0.
+    wrapped = ring.put(b"w" * (2 * BLOCK))
+    assert wrapped.offset == 0
+    assert ring.stats()["in_use"] == 3 * BLOCK
+    ring.release(third)
+    ring.release(wrapped)
+    assert ring.stats()["in_use"] == 0
+    assert ring.put(bytes(4 * BLOCK)).offset == 0
+
+
+def test_space_is_reclaimed_in_allocation_order(ring):
+    first, second = ring.put(bytes(2 * BLOCK)), ring.put(bytes(2 * BLOCK))
+    ring.release(second)
+    # The older block still pins everything allocated after it.
+    assert ring.stats()["in_use"] == 4 * BLOCK
+    assert ring.put(bytes(BLOCK)) is None
+    ring.release(first)
+    assert ring.stats()["in_use"] == 0
+    assert ring.put(bytes(BLOCK)).offset == 0
+
+
+def test_full_ring_falls_back(ring):
+    refs = [ring.put(bytes(BLOCK)) for _ in range(4)]
+    assert None not in refs
+    assert ring.put(bytes(BLOCK)) is None
+    assert ring.put(bytes(5 * BLOCK)) is None
+    assert ring.stats()["fallbacks"] == 2
+    assert ring.stats()["shared"] == 4
+
+
+def test_call_with_shared_resolves_lists(ring):
+    payloads = [b"a" * BLOCK, b"b" * (BLOCK + 1)]
+    refs = [ring.put(data) for data in payloads]
+
+    def unwrap(items, label):
+        return [bytes(item) for item in items], label
+
+    assert call_with_shared(unwrap, refs, "plain") == (payloads, "plain")
@@ -0,0 +1,256 @@
+"""
+Request body readers that enforce the upload size limit while streaming.
+
+Bodies are consumed chunk by chunk and rejected with 413 as soon as they
+exceed the limit (or immediately, when ``Content-Length`` already says so),
+so an oversized upload is never buffered in full.  Multipart uploads are
+parsed incrementally instead of being spooled by the framework, and a single
+image upload is rejected as soon as its first bytes show it is not a JPEG or
+PNG.
+"""
+
+import multipart
+from fastapi import HTTPException, Request
+from multipart.exceptions import MultipartParseError
+from multipart.multipart import parse_options_header
+
+# File signatures accepted as image uploads.
+IMAGE_SIGNATURES = (
+    b"\xff\xd8\xff",  # JPEG
+    b"\x89PNG\r\n\x1a\n",  # PNG
+)
+SNIFF_BYTES = max(len(sig) for sig in IMAGE_SIGNATURES)
+# Room for boundaries, part headers and small form fields around the file.
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+def too_large(limit: int, what: str = "Image") -> HTTPException:
+    return HTTPException(
+        status_code=413,
+        detail=f"{what} must be under {limit // (1024 * 1024)} MB",
+    )
+
+
+def is_image(head: bytes) -> bool:
+    """Whether *head* starts with a JPEG or PNG signature."""
+    return head.startswith(IMAGE_SIGNATURES)
+
+
+def not_an_image() -> HTTPException:
+    return HTTPException(status_code=400, detail="Please upload a valid image file")
+
+
+async def read_body(request: Request, limit: int) -> bytes:
+    """
+    Read a raw request body of at most *limit* bytes.
+
+    The received chunks are joined once at the end, so the body is copied a
+    single time on its way to ``cv2.imdecode``.
+
+    Raises:
+        HTTPException: 413 if the body is larger than *limit*.
+    """
+    declared = request.headers.get("content-length")
+    if declared is not None and declared.isdigit() and int(declared) > limit:
+        raise too_large(limit)
+
+    chunks = []
+    size = 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > limit:
+            raise too_large(limit)
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+class _PartReader:
+    """python-multipart callbacks that track each part's headers."""
+
+    def __init__(self):
+        self._header_name = b""
+        self._header_value = b""
+        self._disposition = b""
+        self._content_type = b""
+
+    def callbacks(self) -> dict:
+        return {
+            "on_part_begin": self.on_part_begin,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+        }
+
+    def on_part_begin(self):
+        self._disposition = b""
+        self._content_type = b""
+
+    def on_header_field(self, data: bytes, start: int, end: int):
+        self._header_name += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def on_header_end(self):
+        name = self._header_name.lower()
+        if name == b"content-disposition":
+            self._disposition = self._header_value
+        elif name == b"content-type":
+            self._content_type = self._header_value
+        self._header_name = b""
+        self._header_value = b""
+
+    def on_headers_finished(self):
+        _, options = parse_options_header(self._disposition)
+        name = options.get(b"name", b"").decode("utf-8", errors="replace")
+        if b"filename" in options:
+            filename = options[b"filename"].decode("utf-8", errors="replace")
+            self.on_file(name, filename, self._content_type.decode("latin-1").strip())
+
+    def on_file(self, field: str, filename: str, content_type: str):
+        """A file part of form field *field* begins."""
+
+    def on_part_data(self, data: bytes, start: int, end: int):
+        pass
+
+    def on_part_end(self):
+        pass
+
+
+class _ImagePartReader(_PartReader):
+    """Keeps one file field and discards the rest."""
+
+    def __init__(self, field: str, limit: int):
+        super().__init__()
+        self.field = field
+        self.limit = limit
+        self.filename: str | None = None
+        self.chunks: list[bytes] = []
+        self.size = 0
+        self.found = False
+        self._sniffed = False
+        self._capturing = False
+
+    def on_part_begin(self):
+        super().on_part_begin()
+        self._capturing = False
+
+    def on_file(self, field: str, filename: str, content_type: str):
+        if field == self.field and not self.found:
+            self.found = True
+            self._capturing = True
+            self.filename = filename
+
+    def on_part_data(self, data: bytes, start: int, end: int):
+        if not self._capturing:
+            return
+        self.size += end - start
+        if self.size > self.limit:
+            raise too_large(self.limit)
+        self.chunks.append(data[start:end])
+        if not self._sniffed and self.size >= SNIFF_BYTES:
+            self._sniff()
+
+    def on_part_end(self):
+        if self._capturing and not self._sniffed:
+            self._sniff()
+        self._capturing = False
+
+    def _sniff(self):
+        self._sniffed = True
+        if not is_image(b"".join(self.chunks)[:SNIFF_BYTES]):
+            raise not_an_image()
+
+
+async def read_multipart_image(
+    request: Request, limit: int, field: str = "file"
+) -> tuple[str | None, bytes]:
+    """
+    Stream a multipart/form-data body and return the ``(filename, bytes)``
+    of its file field *field*.
+
+    Other parts are parsed and dropped.  The whole body may not exceed
+    *limit* plus ``MULTIPART_OVERHEAD``.
+
+    Raises:
+        HTTPException: 400 for a malformed body, a missing field or a file
+            that is not a JPEG / PNG; 413 when the file exceeds *limit*.
+    """
+    reader = _ImagePartReader(field, limit)
+    await _parse_multipart(request, reader, limit)
+    if not reader.found:
+        raise HTTPException(status_code=400, detail=f"Missing file field '{field}'")
+    if reader.size == 0:
+        raise not_an_image()
+    return reader.filename, b"".join(reader.chunks)
+
+
+class _FilePartsReader(_PartReader):
+    """Keeps every file of one form field, with its filename and content type."""
+
+    def __init__(self, field: str):
+        super().__init__()
+        self.field = field
+        self.files: list[tuple[str, str, list[bytes]]] = []
+        self._chunks: list[bytes] | None = None
+
+    def on_part_begin(self):
+        super().on_part_begin()
+        self._chunks = None
+
+    def on_file(self, field: str, filename: str, content_type: str):
+        if field == self.field:
+            self._chunks = []
+            self.files.append((filename, content_type, self._chunks))
+
+    def on_part_data(self, data: bytes, start: int, end: int):
+        if self._chunks is not None:
+            self._chunks.append(data[start:end])
+
+
+async def read_multipart_files(
+    request: Request, limit: int, field: str = "files"
+) -> list[tuple[str, str, bytes]]:
+    """
+    Stream a multipart/form-data body and return every file of field
+    *field* as ``(filename, content_type, bytes)``.
+
+    Unlike ``read_multipart_image`` the files are not sniffed: the caller
+    decides per file what to do with it.  *limit* caps the files together;
+    the whole body may not exceed it plus ``MULTIPART_OVERHEAD``.
+
+    Raises:
+        HTTPException: 400 for a malformed body; 413 when the body exceeds
+            the limit.
+    """
+    reader = _FilePartsReader(field)
+    await _parse_multipart(request, reader, limit, what="Upload")
+    return [(name, content_type, b"".join(chunks)) for name, content_type, chunks in reader.files]
+
+
+async def _parse_multipart(request: Request, reader: _PartReader, limit: int, what: str = "Image"):
+    """Feed the request body to *reader*, enforcing *limit* as it streams in."""
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    boundary = params.get(b"boundary")
+    if content_type != b"multipart/form-data" or not boundary:
+        raise HTTPException(status_code=400, detail="Expected a multipart/form-data upload")
+
+    body_limit = limit + MULTIPART_OVERHEAD
+    declared = request.headers.get("content-length")
+    if declared is not None and declared.isdigit() and int(declared) > body_limit:
+        raise too_large(limit, what)
+
+    parser = multipart.MultipartParser(boundary, reader.callbacks())
+    received = 0
+    try:
+        async for chunk in request.stream():
+            received += len(chunk)
+            if received > body_limit:
+                raise too_large(limit, what)
+            parser.write(chunk)
+        parser.finalize()
+    except MultipartParseError:
+        raise HTTPException(status_code=400, detail="Malformed multipart body")
@@ -0,0 +1,658 @@
+"""
+Analysis work unit executed off the event loop.
+
+Everything in this module runs inside an executor worker (a thread or a
+separate process).  Landmarkers live in a ``FaceDetectorPool`` created by
+``init_worker``: worker threads share one pool sized from config, while each
+worker process builds a private pool of one.  A detector is checked out for
+the duration of a single detection because MediaPipe task objects must not be
+called concurrently.
+
+The stages themselves are an ``AnalysisPipeline`` around that pool; this
+module adds the result cache, response serialisation and live sessions.
+"""
+
+import base64
+import cProfile
+import json
+import logging
+import os
+import pstats
+import time
+import uuid
+from dataclasses import dataclass, field
+
+import cv2
+import numpy as np
+
+import config
+from cache import DiskCodec, ResultCache, image_key, pack_arrays, unpack_arrays
+from analysis.face_detection import FaceDetector, FaceDetectorPool, RegionMask, search_window
+from analysis.color_extraction import ColorExtractor
+from analysis.live_session import LiveSession
+from analysis.pipeline import (
+    AnalysisError, AnalysisPipeline, DecodeError, Face, NoFaceError, StageTimer,
+)
+from analysis.preview import PreviewRenderer
+from analysis.tone_classifier import ToneClassifier
+from analysis.seasonal_palette import PaletteEntry, SeasonalPaletteClassifier
+
+logger = logging.getLogger("tonesense.worker")
+
+# Stateless stages are safe to share between threads.
+color_extractor = ColorExtractor(mode=config.COLOR_MODE)
+tone_classifier = ToneClassifier()
+palette_classifier = SeasonalPaletteClassifier()
+preview_renderer = PreviewRenderer(
+    quality=config.PREVIEW_JPEG_QUALITY,
+    max_dim=config.PREVIEW_MAX_DIM,
+    crop=config.PREVIEW_CROP,
+)
+
+detector_pool: FaceDetectorPool | None = None
+pipeline: AnalysisPipeline | None = None
+result_cache: ResultCache | None = None
+
+# How the annotated preview is delivered: not at all, as a base64 data URI in
+# the JSON body, or as a link rendered lazily on first GET.
+PREVIEW_MODES = ("none", "inline", "url")
+PREVIEW_URL = "/api/preview/{key}"
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+# Synthetic face (drawn from benchmarks/fixtures) that MediaPipe detects.
+WARMUP_IMAGE = os.path.join(BACKEND_DIR, "warmup_face.jpg")
+
+# Report of this process's warm-up, once it has run.
+warm_up_report: dict | None = None
+
+
+@dataclass
+class CachedAnalysis:
+    """What the result cache keeps per image."""
+
+    analysis_json: bytes
+    regions: dict[str, RegionMask]
+    preview_jpeg: bytes | None = None
+
+
+def _pack_regions(regions: dict[str, RegionMask], arrays: dict[str, np.ndarray]):
+    for name, region in regions.items():
+        arrays[f"mask.{name}"] = region.mask
+        arrays[f"origin.{name}"] = np.array([region.x, region.y])
+
+
+def _unpack_regions(arrays: dict[str, np.ndarray]) -> dict[str, RegionMask]:
+    regions = {}
+    for key, mask in arrays.items():
+        if key.startswith("mask."):
+            name = key[len("mask."):]
+            x, y = arrays["origin." + name]
+            regions[name] = RegionMask(int(x), int(y), mask)
+    return regions
+
+
+def _bytes_array(data: bytes) -> np.ndarray:
+    return np.frombuffer(data, dtype=np.uint8)
+
+
+def _encode_cached(entry: CachedAnalysis) -> bytes:
+    arrays = {"analysis_json": _bytes_array(entry.analysis_json)}
+    if entry.preview_jpeg is not None:
+        arrays["preview_jpeg"] = _bytes_array(entry.preview_jpeg)
+    _pack_regions(entry.regions, arrays)
+    return pack_arrays(arrays)
+
+
+def _decode_cached(data: bytes) -> CachedAnalysis:
+    arrays = unpack_arrays(data)
+    preview = arrays.get("preview_jpeg")
+    return CachedAnalysis(
+        analysis_json=arrays["analysis_json"].tobytes(),
+        regions=_unpack_regions(arrays),
+        preview_jpeg=preview.tobytes() if preview is not None else None,
+    )
+
+
+# Disk format of the result cache: an npz archive, never a pickle.
+CACHED_ANALYSIS_CODEC = DiskCodec(_encode_cached, _decode_cached)
+
+
+@dataclass
+class PreviewSource:
+    """Everything needed to render a preview after the request has finished."""
+
+    image: np.ndarray | None
+    regions: dict[str, RegionMask]
+    jpeg: bytes | None = None
+
+
+def _encode_preview(source: PreviewSource) -> bytes:
+    arrays = {}
+    if source.image is not None:
+        arrays["image"] = source.image
+    if source.jpeg is not None:
+        arrays["jpeg"] = _bytes_array(source.jpeg)
+    _pack_regions(source.regions, arrays)
+    return pack_arrays(arrays)
+
+
+def _decode_preview(data: bytes) -> PreviewSource:
+    arrays = unpack_arrays(data)
+    jpeg = arrays.get("jpeg")
+    if jpeg is None and "image" not in arrays:
+        raise ValueError("Preview entry has neither an image nor a JPEG")
+    return PreviewSource(
+        image=arrays.get("image"),
+        regions=_unpack_regions(arrays),
+        jpeg=jpeg.tobytes() if jpeg is not None else None,
+    )
+
+
+# Disk format of url-mode previews shared between API processes.
+PREVIEW_SOURCE_CODEC = DiskCodec(_encode_preview, _decode_preview)
+
+
+@dataclass
+class AnalysisOutput:
+    """Result of ``run_analysis``."""
+
+    body: bytes
+    key: str
+    # Only set in "url" mode, for the API process to hold until the GET.
+    preview_source: PreviewSource | None = None
+    # Seconds per pipeline stage, for the API process's metrics.
+    timings: dict[str, float] = field(default_factory=dict)
+    cache_hit: bool = False
+
+
+# ── Worker lifecycle ──────────────────────────────────────────
+
+def init_worker(pool_size: int = 1, warm: bool = False, cv_threads: int = 0):
+    """
+    Create this process's detector pool and result cache (idempotent).
+
+    Args:
+        pool_size: Landmarkers in the pool.
+        warm: Also run ``warm_up`` before returning.
+        cv_threads: Size of OpenCV's thread pool in this process; 0 keeps
+            OpenCV's default of one thread per CPU.
+    """
+    global detector_pool, pipeline, result_cache
+    if cv_threads:
+        cv2.setNumThreads(cv_threads)
+    if result_cache is None:
+        result_cache = ResultCache(
+            max_entries=config.CACHE_MAX_ENTRIES,
+            ttl_seconds=config.CACHE_TTL_SECONDS,
+            disk_dir=config.CACHE_DIR,
+            codec=CACHED_ANALYSIS_CODEC,
+        )
+    if detector_pool is None:
+        detector_pool = FaceDetectorPool(pool_size)
+        pipeline = AnalysisPipeline(
+            detector_pool,
+            color_extractor,
+            tone_classifier,
+            palette_classifier,
+            preview_renderer,
+            max_dim=config.MAX_IMAGE_DIM,
+        )
+    if warm:
+        warm_up()
+
+
+def warm_up() -> dict:
+    """
+    Push the bundled synthetic face through every pipeline stage (idempotent).
+
+    Every landmarker in the pool runs one detection, then one full analysis
+    with an inline preview runs uncached, so one-off setup costs (TFLite
+    delegates, OpenCV colour tables, the JPEG codecs, PIL) are paid before
+    real traffic arrives.
+
+    Returns:
+        ``{"pid", "detectors", "faces", "ms"}``; a synthetic face that is not
+        detected is logged but does not fail the warm-up.
+    """
+    global warm_up_report
+    if warm_up_report is not None:
+        return warm_up_report
+    if detector_pool is None:
+        init_worker()
+
+    started = time.perf_counter()
+    with open(WARMUP_IMAGE, "rb") as f:
+        data = f.read()
+    faces = detector_pool.warm_up(pipeline.decode(data))
+    try:
+        run_analysis(data, "inline", use_cache=False)
+    except NoFaceError:
+        logger.warning("Warm-up image %s: no face detected", WARMUP_IMAGE)
+
+    warm_up_report = {
+        "pid": os.getpid(),
+        "detectors": detector_pool.size,
+        "faces": faces,
+        "ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+    logger.info("Worker warmed up in %.1f ms", warm_up_report["ms"])
+    return warm_up_report
+
+
+def close_workers():
+    """Release every landmarker created in this process."""
+    global detector_pool, pipeline, warm_up_report
+    warm_up_report = None
+    if detector_pool is not None:
+        detector_pool.close()
+        detector_pool = None
+        pipeline = None
+
+
+def pool_stats() -> dict | None:
+    """Detector pool usage for this process, or None before ``init_worker``."""
+    return detector_pool.stats() if detector_pool is not None else None
+
+
+def cache_stats() -> dict | None:
+    """Result cache hit / miss counters for this process."""
+    return result_cache.stats() if result_cache is not None else None
+
+
+# ── Helpers ───────────────────────────────────────────────────
+
+def _pipeline() -> AnalysisPipeline:
+    """This worker's pipeline, initialising the worker on first use."""
+    if pipeline is None:
+        init_worker()
+    return pipeline
+
+
+def _data_uri(jpeg: bytes) -> str:
+    b64 = base64.b64encode(jpeg).decode("utf-8")
+    return f"data:image/jpeg;base64,{b64}"
+
+
+def _json_bytes(value) -> bytes:
+    """Serialise like FastAPI's JSONResponse."""
+    return json.dumps(
+        value, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def _render_analysis(color_data: dict, tone_data: dict, palette: PaletteEntry) -> bytes:
+    """Serialise the "analysis" object, splicing in the pre-serialised palette."""
+    measured = _json_bytes({
+        "skin_color": color_data["overall"],
+        "regions": color_data["regions"],
+        "undertone": tone_data["undertone"],
+        "depth": tone_data["depth"],
+        "contrast": tone_data["contrast"],
+    })
+    return b"".join((measured[:-1], b",", palette.json_fragment, b"}"))
+
+
+def _render_response(analysis_json: bytes, preview: str | None) -> bytes:
+    """Wrap the serialised analysis in the API response envelope."""
+    return b"".join((
+        b'{"success":true,"analysis":',
+        analysis_json,
+        b',"preview":',
+        _json_bytes(preview),
+        b"}",
+    ))
+
+
+# ── Work unit ─────────────────────────────────────────────────
+
+def run_analysis(data: bytes, preview: str = "inline", use_cache: bool = True) -> AnalysisOutput:
+    """
+    Run the full pipeline on encoded image bytes.
+
+    Args:
+        data: Encoded JPEG / PNG bytes.
+        preview: One of ``PREVIEW_MODES``.
+        use_cache: Look the image up in the result cache first.
+
+    Returns:
+        The JSON response body, the image's cache key and, in "url" mode,
+        the data needed to render the preview later.
+
+    Raises:
+        DecodeError: The bytes could not be decoded.
+        NoFaceError: No face was detected.
+        AnalysisError: Skin color could not be extracted.
+    """
+    timer = StageTimer()
+    image = _pipeline().decode(data)
+    timer.lap("decode")
+
+    cache_key = image_key(image)
+    cached = result_cache.get(cache_key) if use_cache else None
+    cache_hit = cached is not None
+    timer.lap("cache")
+    # Store the entry only once it is complete, so the disk copy has the
+    # preview too.
+    store = cached is None
+    if store:
+        cached = _analyze_image(image, timer)
+
+    if preview == "inline":
+        if cached.preview_jpeg is None:
+            cached.preview_jpeg = pipeline.preview(image, cached.regions)
+            store = True
+        preview_value = _data_uri(cached.preview_jpeg)
+    elif preview == "url":
+        preview_value = PREVIEW_URL.format(key=cache_key)
+    else:
+        preview_value = None
+    timer.lap("preview")
+    if store:
+        result_cache.put(cache_key, cached)
+        timer.lap("cache")
+
+    output = AnalysisOutput(
+        body=_render_response(cached.analysis_json, preview_value),
+        key=cache_key,
+        cache_hit=cache_hit,
+    )
+    timer.lap("serialize")
+    if preview == "url":
+        if cached.preview_jpeg is not None:
+            output.preview_source = PreviewSource(None, cached.regions, cached.preview_jpeg)
+        else:
+            # Keep only the face area alive until the preview is fetched.
+            crop, regions = preview_renderer.crop_to_face(image, cached.regions)
+            output.preview_source = PreviewSource(crop, regions)
+        timer.lap("preview")
+    output.timings = timer.timings
+    return output
+
+
+def profile_analysis(data: bytes, preview: str = "inline") -> AnalysisOutput:
+    """
+    ``run_analysis`` under cProfile, bypassing the result cache.
+
+    A ``"profile"`` object (stage timings and the most expensive functions)
+    is appended to the response body.  If ``config.PROFILE_DIR`` is set, the
+    raw profile is also written there, even when the analysis fails.
+    """
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        output = run_analysis(data, preview, use_cache=False)
+    finally:
+        profiler.disable()
+        artifact = _dump_profile(profiler)
+
+    summary = {
+        "stages_ms": {stage: round(s * 1000, 3) for stage, s in output.timings.items()},
+        "top": _top_functions(profiler, config.PROFILE_TOP_FUNCTIONS),
+        "artifact": artifact,
+    }
+    output.body = b"".join((output.body[:-1], b',"profile":', _json_bytes(summary), b"}"))
+    return output
+
+
+def _top_functions(profiler: cProfile.Profile, limit: int) -> list[dict]:
+    """The *limit* functions with the highest cumulative time."""
+    stats = pstats.Stats(profiler).stats
+    ranked = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)
+    return [
+        {
+            "function": _function_label(func),
+            "calls": calls,
+            "own_ms": round(own * 1000, 3),
+            "cumulative_ms": round(cumulative * 1000, 3),
+        }
+        for func, (_, calls, own, cumulative, _) in ranked[:limit]
+    ]
+
+
+def _function_label(func: tuple) -> str:
+    """``file:line(name)`` with the file relative to the backend or site-packages."""
+    filename, line, name = func
+    if filename.startswith(BACKEND_DIR):
+        filename = os.path.relpath(filename, BACKEND_DIR)
+    elif "site-packages" in filename:
+        filename = filename.split("site-packages" + os.sep, 1)[-1]
+    return pstats.func_std_string((filename, line, name))
+
+
+def _dump_profile(profiler: cProfile.Profile) -> str | None:
+    """Write the profile to ``PROFILE_DIR``; returns the file name."""
+    if not config.PROFILE_DIR:
+        return None
+    name = f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}.prof"
+    try:
+        os.makedirs(config.PROFILE_DIR, exist_ok=True)
+        profiler.dump_stats(os.path.join(config.PROFILE_DIR, name))
+    except OSError:
+        logger.warning("Could not write profile %s", name, exc_info=True)
+        return None
+    return name
+
+
+def run_batch(items: list[bytes], preview: str = "none") -> list[AnalysisOutput | Exception]:
+    """
+    Analyse several images in one job.
+
+    Shipping a chunk of images per job amortises executor dispatch (and, in
+    process mode, IPC) across the chunk.  Per-image failures are returned in
+    place of the output instead of aborting the rest of the chunk.
+    """
+    results = []
+    for data in items:
+        try:
+            results.append(run_analysis(data, preview))
+        except AnalysisError as e:
+            results.append(e)
+        except Exception as e:
+            logger.exception("Batch image failed")
+            # Only the message: not every exception survives the trip back
+            # from a worker process.
+            results.append(RuntimeError(f"{type(e).__name__}: {e}"))
+    return results
+
+
+def render_preview(source: PreviewSource) -> bytes:
+    """Render (or return the already rendered) preview JPEG for *source*."""
+    if source.jpeg is None:
+        return preview_renderer.render(source.image, source.regions)
+    return source.jpeg
+
+
+def _analyze_image(image: np.ndarray, timer: StageTimer | None = None) -> CachedAnalysis:
+    """Pipeline stages after decoding, serialised for the result cache."""
+    timer = timer or StageTimer()
+    result = pipeline.analyze(image, timer=timer)
+    analysis_json = _render_analysis(result.colors, result.tone, result.palette)
+    timer.lap("serialize")
+    return CachedAnalysis(analysis_json=analysis_json, regions=result.face.regions)
+
+
+# ── Live analysis ─────────────────────────────────────────────
+
+def extract_colors(
+    data: bytes, window: tuple[int, int, int, int] | None = None
+) -> tuple[dict, tuple[int, int, int, int]]:
+    """
+    Decode, detect and extract colours without classifying.
+
+    Used for live-session frames, whose colours are folded into a
+    ``LiveAnalysis`` held by the API process.
+
+    Args:
+        window: Where the session's previous frame had its face.  Only that
+            area is landmarked, which also finds faces too small for a
+            whole-frame search; the whole frame is searched if it misses.
+
+    Returns:
+        The colour data and the window to search in the next frame.
+
+    Raises:
+        DecodeError, NoFaceError, AnalysisError: As ``run_analysis``.
+    """
+    pipe = _pipeline()
+    image = pipe.decode(data)
+    face = pipe.detect(image, roi=window) if window is not None else None
+    if face is None:
+        face = pipe.detect(image)
+    color_data = _frame_colors(pipe, image, face)
+    return color_data, search_window(face.bbox, image.shape, current=window)
+
+
+def _frame_colors(pipe: AnalysisPipeline, image: np.ndarray, face: Face | None) -> dict:
+    if face is None:
+        raise NoFaceError("No face detected in frame.")
+    return pipe.extract(image, face)
+
+
+class LiveAnalysis:
+    """
+    A ``LiveSession`` plus the analysis rendered from its current estimate.
+
+    Tone and palette are only re-derived when the estimate changes, and
+    frames skipped after convergence reuse the last rendering.
+    Cheap enough to run on the event loop.
+    """
+
+    def __init__(self):
+        self.session = LiveSession(
+            alpha=config.LIVE_SMOOTHING,
+            tolerance=config.LIVE_TOLERANCE,
+            min_frames=config.LIVE_MIN_FRAMES,
+            recheck_every=config.LIVE_RECHECK_FRAMES,
+        )
+        self.analysis_json: bytes | None = None
+        # Where the next frame is searched for the face (see extract_colors).
+        self.window: tuple[int, int, int, int] | None = None
+        self._estimate: dict | None = None
+
+    def needs_frame(self) -> bool:
+        return self.analysis_json is None or self.session.needs_frame()
+
+    def skip(self):
+        self.session.skip()
+
+    def add(self, color_data: dict):
+        """Fold one frame's colours in and refresh the analysis if it moved."""
+        estimate = self.session.update(color_data)
+        if estimate != self._estimate:
+            tone_data = tone_classifier.classify(estimate)
+            palette = palette_classifier.lookup(tone_data)
+            self.analysis_json = _render_analysis(estimate, tone_data, palette)
+            self._estimate = estimate
+
+    def state(self) -> dict:
+        """JSON-serialisable snapshot, for ``from_state``."""
+        return {
+            "session": self.session.state(),
+            "analysis": (
+                self.analysis_json.decode("utf-8") if self.analysis_json is not None else None
+            ),
+            "window": self.window,
+            "estimate": self._estimate,
+        }
+
+    @classmethod
+    def from_state(cls, state: dict) -> "LiveAnalysis":
+        """
+        Rebuild a session from ``state()``, with the current settings.
+
+        Raises:
+            KeyError, TypeError, ValueError: *state* is not such a snapshot.
+        """
+        live = cls()
+        live.session.restore(state["session"])
+        analysis = state["analysis"]
+        live.analysis_json = analysis.encode("utf-8") if analysis is not None else None
+        window = state["window"]
+        live.window = tuple(int(v) for v in window) if window is not None else None
+        live._estimate = state["estimate"]
+        return live
+
+    def response(self) -> bytes:
+        """``analyze-base64`` response body, with the session status attached."""
+        return b"".join((
+            b'{"success":true,"analysis":', self.analysis_json,
+            b',"preview":null,"session":', _json_bytes(self.session.status()), b"}",
+        ))
+
+
+def _encode_live(live: LiveAnalysis) -> bytes:
+    return _json_bytes(live.state())
+
+
+def _decode_live(data: bytes) -> LiveAnalysis:
+    try:
+        return LiveAnalysis.from_state(json.loads(data))
+    except (TypeError, AttributeError) as e:
+        raise ValueError(f"Not a live session: {e}") from e
+
+
+# Disk format of live sessions shared between API processes.
+LIVE_ANALYSIS_CODEC = DiskCodec(_encode_live, _decode_live, suffix=".json")
+
+
+class StreamTracker:
+    """
+    Per-connection state for ``/api/stream``.
+
+    Owns a pipeline around a VIDEO-mode landmarker, which tracks the face across frames rather
+    than running full detection on each one, and a ``LiveAnalysis`` so the
+    reported colours change gradually and frames after convergence are
+    answered without being decoded.  A tracker serves a single stream;
+    ``process`` must not be called concurrently.
+    """
+
+    def __init__(self):
+        self.detector = FaceDetector(video=True)
+        self.pipeline = AnalysisPipeline(
+            self.detector,
+            color_extractor,
+            tone_classifier,
+            palette_classifier,
+            max_dim=config.STREAM_MAX_DIM,
+        )
+        self.live = LiveAnalysis()
+        self.frames = 0
+        self.dropped = 0
+        self._started = time.monotonic()
+        self._last_timestamp = -1
+
+    def process(self, data: bytes) -> bytes:
+        """Analyse one encoded frame and return the JSON message to send back."""
+        self.frames += 1
+        header = b"".join((
+            b'"frame":', str(self.frames).encode(),
+            b',"dropped":', str(self.dropped).encode(),
+        ))
+        if self.live.needs_frame():
+            try:
+                self.live.add(self._frame_colors(data))
+            except AnalysisError as e:
+                kind = "no_face" if isinstance(e, NoFaceError) else "error"
+                return b"".join((
+                    b'{"type":"', kind.encode(), b'",', header,
+                    b',"detail":', _json_bytes(e.detail), b"}",
+                ))
+        else:
+            self.live.skip()
+        return b"".join((
+            b'{"type":"result",', header,
+            b',"session":', _json_bytes(self.live.session.status()),
+            b',"analysis":', self.live.analysis_json, b"}",
+        ))
+
+    def close(self):
+        self.detector.close()
+
+    def _frame_colors(self, data: bytes) -> dict:
+        image = self.pipeline.decode(data)
+
+        # VIDEO mode needs strictly increasing timestamps.
+        elapsed_ms = int((time.monotonic() - self._started) * 1000)
+        self._last_timestamp = max(elapsed_ms, self._last_timestamp + 1)
+        face = self.pipeline.detect(image, timestamp_ms=self._last_timestamp)
+        return _frame_colors(self.pipeline, image, face)
@@ -1,5 +1,9 @@
 const API_BASE = '/api';
 
+// The annotated preview is fetched by the <img> tag on demand instead of being
+// inlined into the JSON response as base64.
+const PREVIEW_MODE = 'url';
+
 /**
  * Analyze an uploaded image file.
  */
@@ -7,7 +11,7 @@ export async function analyzeImage(file) {
   const formData = new FormData();
   formData.append('file', file);
 
-  const response = await fetch(`${API_BASE}/analyze`, {
+  const response = await fetch(`${API_BASE}/analyze?preview=${PREVIEW_MODE}`, {
     method: 'POST',
     body: formData,
   });
@@ -21,13 +25,28 @@ export async function analyzeImage(file) {
 }
 
 /**
- * Analyze a base64-encoded image (from camera capture).
+ * Analyze a camera capture, given as a base64 data URL or as a Blob.
+ *
+ * Blobs (e.g. from `canvas.toBlob`) are sent as the raw request body, which
+ * avoids base64 inflation and JSON parsing on both ends.
  */
-export async function analyzeBase64(imageDataUrl) {
-  const response = await fetch(`${API_BASE}/analyze-base64`, {
+export async function analyzeBase64(image) {
+  const request = image instanceof Blob
+    ? {
+        url: `${API_BASE}/analyze-frame?preview=${PREVIEW_MODE}`,
+        headers: { 'Content-Type': image.type || 'image/jpeg' },
+        body: image,
+      }
+    : {
+        url: `${API_BASE}/analyze-base64?preview=${PREVIEW_MODE}`,
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ image }),
+      };
+
+  const response = await fetch(request.url, {
     method: 'POST',
-    headers: { 'Content-Type': 'application/json' },
-    body: JSON.stringify({ image: imageDataUrl }),
+    headers: request.headers,
+    body: request.body,
   });
 
   if (!response.ok) {
@@ -38,6 +57,22 @@ export async function analyzeBase64(imageDataUrl) {
   return response.json();
 }
 
+/**
+ * Open a live analysis stream over WebSocket.
+ *
+ * Send camera frames as JPEG Blobs with `stream.send(blob)`; every analysed
+ * frame produces a message of type `result`, `no_face` or `error`. The server
+ * only analyses the newest frame, so sending faster than it can keep up is
+ * harmless. Close with `stream.close()`.
+ */
+export function openAnalysisStream(onMessage) {
+  const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
+  const socket = new WebSocket(`${protocol}//${window.location.host}${API_BASE}/stream`);
+  socket.binaryType = 'arraybuffer';
+  socket.onmessage = (event) => onMessage(JSON.parse(event.data));
+  return socket;
+}
+
 /**
  * Health check.
  */